@@ -1,23 +1,39 @@
 """The Sun on Window integration."""
+import asyncio
 import logging
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import ConfigEntryError
 from homeassistant.const import CONF_SCAN_INTERVAL
 from datetime import timedelta
 from homeassistant.helpers.typing import ConfigType
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .const import DOMAIN, CONF_HORIZON_PROFILE, CONF_WINDOWS
+from .const import (
+    DOMAIN,
+    CONF_HORIZON_PROFILE,
+    CONF_HORIZON_STORE,
+    CONF_HORIZON_CHECKSUM,
+    CONF_WINDOWS,
+    CONF_POSITION_CACHE_SIZE,
+    CONF_ATTRIBUTE_REFRESH,
+    DEFAULT_POSITION_CACHE_SIZE,
+)
+from .coordinator import SunOnWindowCoordinator
+from .registry import async_get_registry, entry_location
+from .services import async_setup_services
+from .storage import HorizonStorageError, async_release_horizon, async_save_horizon
 
 _LOGGER = logging.getLogger(__name__)
 
-PLATFORMS = ["binary_sensor", "button"]
+PLATFORMS = ["binary_sensor", "sensor", "button"]
 
 
 async def async_setup(hass: HomeAssistant, config):
     """Set up this integration using YAML."""
     # Cette fonction est appelée si le composant est configuré via configuration.yaml
+    async_setup_services(hass)
     return True
 
 
@@ -25,13 +41,43 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Set up this integration using UI."""
     # Convertir les données de configuration en structures appropriées
     config = dict(entry.data)
-    
-    # Stocker la configuration dans le hass.data
-    hass.data.setdefault(DOMAIN, {})
-    hass.data[DOMAIN][entry.entry_id] = config
-    
-    # Configurer les plateformes
-    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+
+    # Le profil d'horizon est lu et compilé hors de la boucle d'événements, une
+    # seule fois pour toutes les entrées qui partagent le même profil
+    registry = async_get_registry(hass)
+    await registry.async_load_schedules()
+    try:
+        horizon_table = await registry.async_acquire_horizon(config)
+    except HorizonStorageError as err:
+        raise ConfigEntryError(str(err)) from err
+
+    # Un seul coordinateur par entrée, partagé par toutes les fenêtres ; la
+    # position du soleil est partagée par toutes les entrées du même lieu
+    latitude, longitude, _ = entry_location(hass, config)
+    site = registry.async_acquire_site(latitude, longitude)
+    try:
+        registry.async_set_cache_size(
+            entry.entry_id, config.get(CONF_POSITION_CACHE_SIZE, DEFAULT_POSITION_CACHE_SIZE)
+        )
+        coordinator = SunOnWindowCoordinator(hass, config, horizon_table, site, registry)
+        hass.data[DOMAIN][entry.entry_id] = coordinator
+        # Prévision du dernier démarrage, tant que la nouvelle n'est pas calculée
+        coordinator.async_restore_forecast()
+
+        # Configurer les plateformes
+        await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+
+        # Calculer la prévision des jours à venir, puis chaque jour
+        coordinator.async_start_forecast()
+        entry.async_on_unload(coordinator.async_stop_forecast)
+    except BaseException:
+        # Échec après l'acquisition : relâcher la table et le site partagés,
+        # sinon leurs compteurs ne redescendraient jamais
+        hass.data[DOMAIN].pop(entry.entry_id, None)
+        registry.async_release_horizon(config.get(CONF_HORIZON_CHECKSUM))
+        registry.async_release_site(site)
+        registry.async_clear_cache_size(entry.entry_id)
+        raise
 
     # Enregistrer les fonctions de mise à jour et de suppression
     entry.async_on_unload(entry.add_update_listener(update_listener))
@@ -39,9 +85,61 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     return True
 
 
+async def async_migrate_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """Migrate an old config entry."""
+    if entry.version == 1:
+        # Version 2 : le profil d'horizon quitte les données de l'entrée pour un
+        # fichier compact, l'entrée n'en garde que la référence et l'empreinte
+        data = dict(entry.data)
+        data.update(await async_save_horizon(hass, data.pop(CONF_HORIZON_PROFILE, [])))
+        hass.config_entries.async_update_entry(entry, data=data, version=2)
+        _LOGGER.debug("Entrée %s migrée vers la version 2", entry.entry_id)
+
+    if entry.version == 2:
+        # Version 3 : le rafraîchissement des attributs (minutes) a sa propre clé
+        # au lieu de réutiliser scan_interval, qui est une durée pour Home Assistant
+        data = dict(entry.data)
+        if CONF_SCAN_INTERVAL in data:
+            data[CONF_ATTRIBUTE_REFRESH] = data.pop(CONF_SCAN_INTERVAL)
+        hass.config_entries.async_update_entry(entry, data=data, version=3)
+        _LOGGER.debug("Entrée %s migrée vers la version 3", entry.entry_id)
+
+    return True
+
+
 async def update_listener(hass: HomeAssistant, entry: ConfigEntry):
-    """Handle options update."""
-    await hass.config_entries.async_reload(entry.entry_id)
+    """Apply options changes to the running entry, reloading only as a last resort."""
+    coordinator = hass.data[DOMAIN].get(entry.entry_id)
+    if coordinator is None:
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+
+    # Ne relire et recompiler le profil d'horizon que s'il a changé
+    config = dict(entry.data)
+    registry = async_get_registry(hass)
+    horizon_table = coordinator.horizon_table
+    previous_checksum = coordinator.config.get(CONF_HORIZON_CHECKSUM)
+    changed = config.get(CONF_HORIZON_CHECKSUM) != previous_checksum
+    if changed:
+        try:
+            horizon_table = await registry.async_acquire_horizon(config)
+        except HorizonStorageError as err:
+            _LOGGER.warning("Rechargement de l'entrée %s : %s", entry.entry_id, err)
+            await hass.config_entries.async_reload(entry.entry_id)
+            return
+
+    # Changer de site seulement si le lieu de l'entrée a changé
+    previous_site = coordinator.site
+    latitude, longitude, _ = entry_location(hass, config)
+    site = registry.async_acquire_site(latitude, longitude)
+    registry.async_set_cache_size(
+        entry.entry_id, config.get(CONF_POSITION_CACHE_SIZE, DEFAULT_POSITION_CACHE_SIZE)
+    )
+
+    coordinator.async_update_config(config, horizon_table, site)
+    if changed:
+        registry.async_release_horizon(previous_checksum)
+    registry.async_release_site(previous_site)
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
@@ -56,8 +154,18 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
         )
     )
     
-    # Supprimer les données de configuration
+    # Supprimer le coordinateur et relâcher les ressources partagées
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
+        coordinator = hass.data[DOMAIN].pop(entry.entry_id)
+        registry = async_get_registry(hass)
+        registry.async_release_horizon(coordinator.config.get(CONF_HORIZON_CHECKSUM))
+        registry.async_release_site(coordinator.site)
+        registry.async_clear_cache_size(entry.entry_id)
     
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """Remove the stored horizon profile of a deleted config entry."""
+    if entry.data.get(CONF_HORIZON_STORE):
+        await async_release_horizon(hass, entry.data[CONF_HORIZON_STORE], entry)
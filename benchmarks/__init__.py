@@ -0,0 +1,29 @@
+"""
+Suite de benchmarks du chemin d'évaluation, sans instance Home Assistant.
+
+Depuis le dossier de configuration de Home Assistant :
+
+    python -m custom_components.sun_on_window.benchmarks
+    python -m custom_components.sun_on_window.benchmarks --compare
+    python -m custom_components.sun_on_window.benchmarks --update-baseline
+
+Chaque cas est mesuré opération par opération, chaque mesure étant la plus
+courte de plusieurs séries ; le rapport donne les opérations par seconde et
+les latences p50/p99.
+
+Avec --compare, les p50 sont comparées à baseline.json. Un cas d'étalonnage,
+indépendant du composant, est mesuré à chaque lancement : son rapport à la
+référence donne la vitesse de la machine, par laquelle les références sont
+multipliées. Un cas plus lent que sa référence étalonnée au-delà de la
+tolérance (--tolerance, 30 % par défaut) est mesuré à nouveau, puis signalé
+comme régression s'il le reste, et la commande se termine en erreur. Sans
+--compare, la suite ne fait que mesurer.
+
+--update-baseline garde la médiane de trois passes de toute la suite,
+étalonnage compris ; avec --filter, les cas mis à jour sont ramenés à
+l'étalonnage déjà enregistré.
+
+Les cas du profil d'horizon calculé sur un modèle de terrain synthétique
+(grille de 10 000 × 10 000 cellules, 400 Mo écrits dans un dossier
+temporaire) ne sont lancés qu'avec --dem.
+"""
@@ -0,0 +1,426 @@
+"""Exécution de la suite de benchmarks et comparaison à la référence."""
+import argparse
+import itertools
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from ..const import MEASUREMENT_HEAT_GAIN, MEASUREMENT_SUNLIT
+from ..coordinator import SunOnWindowCoordinator
+from ..dem import compute_horizon
+from ..engine import WindowBatch
+from ..ephemeris import SolarEphemeris
+from ..horizon import HorizonTable
+from ..scheduler import find_transitions
+from .stubs import StubHass, StubMeasurementSensor, StubSensor
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+PROFILE_SIZES = (4, 36, 360, 3600, 36000)
+WINDOW_COUNTS = (1, 10, 100, 1000, 10000)
+# Profil utilisé par les cas qui font varier le nombre de fenêtres
+DEFAULT_PROFILE_SIZE = 360
+
+START = datetime(2024, 6, 21, 4, 0, tzinfo=timezone.utc)
+DAY = 86400
+
+# Modèle de terrain synthétique des cas --dem : côté en cellules, taille des
+# cellules (m), pas des azimuts (°) et mesures par cas, chacune de plusieurs secondes
+DEM_SIZE = 10000
+DEM_CELL_SIZE = 5.0
+DEM_RESOLUTION = 0.1
+DEM_SAMPLES = 3
+
+# Passes de la suite pour une nouvelle référence, et nouvelles mesures d'un
+# cas plus lent que la référence avant de le déclarer en régression
+BASELINE_RUNS = 3
+CONFIRM_ATTEMPTS = 2
+
+# Cas d'étalonnage, indépendant du composant : son rapport à la référence
+# mesure la vitesse de la machine, par laquelle les références sont mises à
+# l'échelle avant la comparaison
+CALIBRATION = "calibration"
+
+
+def make_profile(size, seed=0):
+    """Profil d'horizon régulier de size points, élévations aléatoires."""
+    rng = np.random.default_rng(seed)
+    azimuths = np.linspace(0, 360, size, endpoint=False)
+    return [
+        {"azimuth": float(azimuth), "elevation": float(elevation)}
+        for azimuth, elevation in zip(azimuths, rng.uniform(0, 15, size))
+    ]
+
+
+def make_windows(count, seed=0, shading=False):
+    """
+    Fenêtres aléatoires reproductibles, façades verticales. Avec shading,
+    chaque fenêtre a ses dimensions, un avant-toit et des joues.
+    """
+    rng = np.random.default_rng(seed)
+    facades = rng.uniform(0, 360, count)
+    widths = rng.uniform(60, 180, count)
+    windows = [
+        {
+            "name": f"w{index}",
+            "start_azimuth": float((facade - width / 2) % 360),
+            "end_azimuth": float((facade + width / 2) % 360),
+            "max_elevation": float(max_elevation),
+        }
+        for index, (facade, width, max_elevation) in enumerate(
+            zip(facades, widths, rng.uniform(30, 90, count))
+        )
+    ]
+    if shading:
+        for window, overhang, fin in zip(
+            windows, rng.uniform(0.2, 1.0, count), rng.uniform(0.0, 0.5, count)
+        ):
+            window.update({
+                "window_height": 1.5,
+                "window_width": 1.2,
+                "overhang_depth": float(overhang),
+                "fin_depth": float(fin),
+            })
+    return windows
+
+
+def make_coordinator(profile_size, window_count):
+    """
+    Coordinateur sur un substitut de hass, avec un capteur par fenêtre
+    enregistré comme le ferait la plateforme.
+    """
+    hass = StubHass()
+    coordinator = SunOnWindowCoordinator(
+        hass,
+        {"windows": make_windows(window_count)},
+        HorizonTable.from_profile(make_profile(profile_size)),
+    )
+    for name in coordinator.batch.names:
+        coordinator.async_register(StubSensor(hass, name))
+    return coordinator
+
+
+def make_dem(directory, size=DEM_SIZE, cell_size=DEM_CELL_SIZE, seed=0):
+    """
+    Écrit une grille d'altitudes synthétique (.npy float32 et en-tête .hdr) :
+    collines régulières et bruit, écrites par blocs de lignes sans tout
+    charger en mémoire. Retourne le chemin de la grille.
+    """
+    path = os.path.join(directory, "dem.npy")
+    data = np.lib.format.open_memmap(path, mode="w+", dtype="<f4", shape=(size, size))
+    rng = np.random.default_rng(seed)
+    columns = np.arange(size) * cell_size
+    for first in range(0, size, 1000):
+        rows = np.arange(first, min(first + 1000, size))[:, None] * cell_size
+        data[first:first + len(rows)] = (
+            400
+            + 300 * np.sin(columns / 3100) * np.cos(rows / 4700)
+            + 150 * np.sin((columns + rows) / 1900)
+            + rng.normal(0, 2, (len(rows), size))
+        )
+    data.flush()
+    del data
+    with open(os.path.join(directory, "dem.hdr"), "w", encoding="utf-8") as file:
+        file.write(
+            f"ncols {size}\nnrows {size}\nxllcorner 0\nyllcorner 0\ncellsize {cell_size}\n"
+        )
+    return path
+
+
+def day_positions(ephemeris, step=60):
+    """Positions du soleil sur une journée, au pas donné."""
+    return ephemeris.positions(START.timestamp() + np.arange(0, DAY, step))
+
+
+def calibration():
+    """
+    Travail fixe qui ne dépend pas du composant : boucle Python sur des
+    flottants et tri NumPy, les deux coûts du chemin d'évaluation.
+    """
+    values = np.random.default_rng(2).uniform(0, 360, 10000)
+    head = values[:2000].tolist()
+
+    def operation():
+        total = 0.0
+        for value in head:
+            total += math.sin(math.radians(value))
+        np.sort(values)
+        return total
+
+    return operation
+
+
+def build_cases(dem=False):
+    """
+    Retourne les cas : nom -> (préparation, opération, répétitions par mesure
+    [, mesures minimales, tours par mesure]). La préparation n'est pas
+    chronométrée ; elle retourne l'opération à mesurer. Avec dem, ajoute les cas du profil
+    d'horizon calculé sur un modèle de terrain de 400 Mo.
+    """
+    cases = {CALIBRATION: (calibration, 1)}
+    rng = np.random.default_rng(1)
+
+    for size in PROFILE_SIZES:
+        def lookup(size=size):
+            table = HorizonTable.from_profile(make_profile(size))
+            azimuths = itertools.cycle(rng.uniform(0, 360, 10000).tolist())
+            return lambda: table.elevation_at(next(azimuths))
+
+        def lookup_day(size=size):
+            table = HorizonTable.from_profile(make_profile(size))
+            azimuths = rng.uniform(0, 360, 1440)
+            return lambda: table.elevations_at(azimuths)
+
+        cases[f"horizon.lookup/profile={size}"] = (lookup, 100)
+        cases[f"horizon.lookup_day/profile={size}"] = (lookup_day, 1)
+
+    for count in WINDOW_COUNTS:
+        def tick(count=count, force=False):
+            coordinator = make_coordinator(DEFAULT_PROFILE_SIZE, count)
+            moments = (START + timedelta(minutes=minute) for minute in range(10**6))
+            coordinator.async_refresh(next(moments))
+            return lambda: coordinator.async_refresh(next(moments), force=force)
+
+        def day_sweep(count=count):
+            batch = WindowBatch(
+                make_windows(count), HorizonTable.from_profile(make_profile(DEFAULT_PROFILE_SIZE))
+            )
+            azimuth, elevation = day_positions(SolarEphemeris(46.52, 6.63))
+            return lambda: batch.evaluate(azimuth, elevation)
+
+        def day_transitions(count=count):
+            batch = WindowBatch(
+                make_windows(count), HorizonTable.from_profile(make_profile(DEFAULT_PROFILE_SIZE))
+            )
+            ephemeris = SolarEphemeris(46.52, 6.63)
+            start = START.timestamp()
+            return lambda: find_transitions(batch, ephemeris, start, start + DAY)
+
+        cases[f"tick/windows={count}"] = (tick, 1)
+        cases[f"tick.write_all/windows={count}"] = (
+            lambda count=count: tick(count, force=True), 1
+        )
+        cases[f"day.evaluate/windows={count}"] = (day_sweep, 1)
+        cases[f"day.transitions/windows={count}"] = (day_transitions, 1)
+
+    # Cas extrême : plus grand profil et nombreuses fenêtres sur une journée
+    def day_sweep_large():
+        batch = WindowBatch(make_windows(1000), HorizonTable.from_profile(make_profile(36000)))
+        azimuth, elevation = day_positions(SolarEphemeris(46.52, 6.63))
+        return lambda: batch.evaluate(azimuth, elevation)
+
+    cases["day.evaluate/profile=36000,windows=1000"] = (day_sweep_large, 1)
+
+    # Rafraîchissement à la minute des parts éclairées et des apports solaires
+    # de 1000 fenêtres protégées, un capteur de chaque mesure par fenêtre
+    def measurements():
+        hass = StubHass()
+        coordinator = SunOnWindowCoordinator(
+            hass,
+            {"windows": make_windows(1000, shading=True)},
+            HorizonTable.from_profile(make_profile(DEFAULT_PROFILE_SIZE)),
+        )
+        for name in [*coordinator.batch.names, None]:
+            if name is not None:
+                coordinator.async_register_measurement(
+                    StubMeasurementSensor(hass, MEASUREMENT_SUNLIT, name)
+                )
+            coordinator.async_register_measurement(
+                StubMeasurementSensor(hass, MEASUREMENT_HEAT_GAIN, name)
+            )
+        # Journée : la minute suivante, sans le raccourci de nuit
+        moments = itertools.cycle(START + timedelta(minutes=minute) for minute in range(240, 960))
+        return lambda: coordinator._handle_measurement_refresh(next(moments))
+
+    cases["measurements/windows=1000"] = (measurements, 1)
+
+    if dem:
+        # Grille écrite une fois pour les deux cas, supprimée à la sortie
+        directory = tempfile.TemporaryDirectory()
+        grids = []
+
+        def horizon(workers):
+            if not grids:
+                grids.append(make_dem(directory.name))
+            # Observateur au centre, rayons jusqu'au coin le plus éloigné
+            center = DEM_SIZE * DEM_CELL_SIZE / 2
+            return lambda: compute_horizon(
+                grids[0], center, center, 2.0, DEM_RESOLUTION, workers=workers
+            )
+
+        name = f"dem.horizon/grid={DEM_SIZE}"
+        cases[f"{name},workers=1"] = (lambda: horizon(1), 1, DEM_SAMPLES, 1)
+        cases[f"{name},workers=pool"] = (
+            lambda: horizon(max(os.cpu_count() or 1, 2)), 1, DEM_SAMPLES, 1
+        )
+    return cases
+
+
+def measure(setup, inner, budget, min_samples=15, rounds=3, max_samples=2000):
+    """
+    Chronométrer une opération ; retourne ops/s, p50 et p99 en microsecondes.
+
+    Chaque mesure est la plus courte de rounds séries de inner opérations :
+    une interruption du système ne fausse qu'une série, pas la mesure. Le
+    p50 est pris sur au moins min_samples mesures.
+    """
+    operation = setup()
+    for _ in range(rounds):
+        operation()
+
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < max_samples and (
+        len(samples) < min_samples or time.perf_counter() - started < budget
+    ):
+        best = math.inf
+        for _ in range(rounds):
+            before = time.perf_counter()
+            for _ in range(inner):
+                operation()
+            best = min(best, time.perf_counter() - before)
+        samples.append(best / inner)
+
+    samples = np.array(samples)
+    return {
+        "ops_per_s": round(float(1 / samples.mean()), 1),
+        "p50_us": round(float(np.percentile(samples, 50)) * 1e6, 2),
+        "p99_us": round(float(np.percentile(samples, 99)) * 1e6, 2),
+    }
+
+
+def main(argv=None):
+    """Point d'entrée de la ligne de commande."""
+    parser = argparse.ArgumentParser(
+        prog="python -m custom_components.sun_on_window.benchmarks",
+        description="Benchmarks du chemin d'évaluation de Sun on Window.",
+    )
+    parser.add_argument("--filter", default="", help="ne lancer que les cas contenant ce texte")
+    parser.add_argument(
+        "--dem", action="store_true", help="ajouter les cas du modèle de terrain (400 Mo, lents)"
+    )
+    parser.add_argument("--budget", type=float, default=0.5, help="durée de mesure par cas (s)")
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="comparer à la référence étalonnée, erreur en cas de régression",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.3,
+        help="ralentissement toléré du p50 après étalonnage (défaut : 0.3)",
+    )
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument(
+        "--runs",
+        type=int,
+        help=f"passes de toute la suite, la médiane est gardée "
+             f"(défaut : 1, {BASELINE_RUNS} avec --update-baseline)",
+    )
+    args = parser.parse_args(argv)
+    runs = args.runs or (BASELINE_RUNS if args.update_baseline else 1)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+
+    # L'étalonnage est toujours mesuré : il accompagne chaque référence
+    cases = {
+        name: case
+        for name, case in build_cases(args.dem).items()
+        if name == CALIBRATION or args.filter in name
+    }
+
+    # Passes successives de toute la suite plutôt que d'un cas à la fois : la
+    # vitesse d'une machine partagée varie d'une minute à l'autre
+    passes = {name: [] for name in cases}
+    for _ in range(runs):
+        for name, (setup, inner, *options) in cases.items():
+            passes[name].append(measure(setup, inner, args.budget, *options))
+    results = {
+        name: sorted(measured, key=lambda result: result["p50_us"])[len(measured) // 2]
+        for name, measured in passes.items()
+    }
+
+    # Vitesse de la machine rapportée à celle de la référence
+    scale = None
+    if args.compare and CALIBRATION in baseline:
+        scale = results[CALIBRATION]["p50_us"] / baseline[CALIBRATION]["p50_us"]
+        print(f"Étalonnage : machine {scale:.2f}x la référence")
+
+    regressions = []
+    header = f"{'cas':<45} {'ops/s':>12} {'p50 µs':>12} {'p99 µs':>12}"
+    print(f"{header}  référence" if args.compare else header)
+    for name, (setup, inner, *options) in cases.items():
+        result = results[name]
+        line = (
+            f"{name:<45} {result['ops_per_s']:>12.1f} {result['p50_us']:>12.2f} "
+            f"{result['p99_us']:>12.2f}"
+        )
+        if not args.compare or name == CALIBRATION:
+            print(line)
+            continue
+        reference = baseline.get(name)
+        if reference is None or scale is None:
+            print(f"{line}  {'nouveau' if reference is None else 'non étalonné'}")
+            continue
+        expected = reference["p50_us"] * scale
+        # Un ralentissement n'est retenu que s'il se confirme à nouvelle mesure
+        for _ in range(CONFIRM_ATTEMPTS):
+            if result["p50_us"] <= expected * (1 + args.tolerance):
+                break
+            result = min(
+                result,
+                measure(setup, inner, args.budget, *options),
+                key=lambda result: result["p50_us"],
+            )
+        ratio = result["p50_us"] / expected
+        verdict = f"{ratio:.2f}x"
+        if ratio > 1 + args.tolerance:
+            verdict += "  RÉGRESSION"
+            regressions.append((name, expected, result["p50_us"]))
+        elif ratio < 1 / (1 + args.tolerance):
+            verdict += "  référence à régénérer"
+        print(
+            f"{name:<45} {result['ops_per_s']:>12.1f} {result['p50_us']:>12.2f} "
+            f"{result['p99_us']:>12.2f}  {verdict}"
+        )
+
+    if args.update_baseline:
+        if args.filter and CALIBRATION in baseline:
+            # Mise à jour partielle : les nouvelles mesures sont ramenées à la
+            # vitesse de l'étalonnage déjà enregistré avec les autres cas
+            factor = baseline[CALIBRATION]["p50_us"] / results.pop(CALIBRATION)["p50_us"]
+            results = {
+                name: {
+                    "ops_per_s": round(result["ops_per_s"] / factor, 1),
+                    "p50_us": round(result["p50_us"] * factor, 2),
+                    "p99_us": round(result["p99_us"] * factor, 2),
+                }
+                for name, result in results.items()
+            }
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(dict(sorted(baseline.items())), file, indent=2)
+            file.write("\n")
+        print(f"Référence mise à jour : {args.baseline}")
+
+    if regressions:
+        print(f"\n{len(regressions)} RÉGRESSION(S) au-delà de {args.tolerance:.0%} :", file=sys.stderr)
+        for name, expected, after in regressions:
+            print(f"  {name} : p50 attendu {expected:.2f} µs, mesuré {after:.2f} µs", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
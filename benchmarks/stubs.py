@@ -0,0 +1,79 @@
+"""Substituts minimaux de Home Assistant pour les benchmarks."""
+import asyncio
+from types import SimpleNamespace
+
+
+class StubStates:
+    """Registre d'états réduit à un dictionnaire, comme hass.states."""
+
+    def __init__(self):
+        """Initialiser le registre vide."""
+        self._states = {}
+        self.writes = 0
+
+    def async_set(self, entity_id, state, attributes=None):
+        """Enregistrer l'état d'une entité."""
+        self._states[entity_id] = (state, dict(attributes or {}))
+        self.writes += 1
+
+    def get(self, entity_id):
+        """Retourne l'état d'une entité, ou None."""
+        return self._states.get(entity_id)
+
+
+class StubHass:
+    """Instance réduite : configuration du site, registre d'états et boucle."""
+
+    def __init__(self, latitude=46.52, longitude=6.63, elevation=400):
+        """Initialiser la configuration du site."""
+        self.config = SimpleNamespace(latitude=latitude, longitude=longitude, elevation=elevation)
+        self.states = StubStates()
+        # Boucle jamais lancée : les minuteurs s'arment sans jamais se déclencher
+        self.loop = asyncio.new_event_loop()
+
+    def async_create_task(self, target):
+        """Ne pas lancer la tâche : la planification des bascules n'est pas mesurée."""
+        target.close()
+        return self.loop.create_future()
+
+
+class StubSensor:
+    """Capteur de fenêtre dont l'écriture d'état va dans le registre du substitut."""
+
+    def __init__(self, hass, name):
+        """Initialiser le capteur."""
+        self.hass = hass
+        self.window_name = name
+        self.entity_id = f"binary_sensor.soleil_sur_{name}"
+        self._is_on = None
+        self._attributes = {}
+
+    def async_update_from_result(self, result, azimuth, elevation, horizon_elevation):
+        """Appliquer le résultat comme SunOnWindowSensor, puis écrire l'état."""
+        self._attributes.update({
+            "current_azimuth": azimuth,
+            "current_elevation": elevation,
+            "horizon_elevation_at_current_azimuth": horizon_elevation,
+        })
+        self._is_on = result["is_on"]
+        self._attributes.update({key: value for key, value in result.items() if key != "is_on"})
+        self.async_write_ha_state()
+
+    def async_write_ha_state(self):
+        """Écrire l'état dans le registre du substitut."""
+        self.hass.states.async_set(self.entity_id, "on" if self._is_on else "off", self._attributes)
+
+
+class StubMeasurementSensor:
+    """Capteur de mesure dont l'écriture d'état va dans le registre du substitut."""
+
+    def __init__(self, hass, measurement, name):
+        """Initialiser le capteur (name None : total de l'entrée)."""
+        self.hass = hass
+        self.measurement = measurement
+        self.window_name = name
+        self.entity_id = f"sensor.{measurement}_{name or 'total'}"
+
+    def async_update_measurement(self, value):
+        """Écrire la valeur dans le registre du substitut."""
+        self.hass.states.async_set(self.entity_id, value)
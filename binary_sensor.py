@@ -1,7 +1,5 @@
-"""Capteur binaire pour déterminer quand le soleil tape sur une fenêtre."""
+"""Capteurs binaires pour déterminer quand le soleil tape sur une fenêtre ou un groupe de fenêtres."""
 import logging
-import math
-from datetime import datetime, timedelta
 
 from homeassistant.components.binary_sensor import (
     BinarySensorEntity,
@@ -9,22 +7,22 @@ from homeassistant.components.binary_sensor import (
 )
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.typing import ConfigType, DiscoveryInfoType
 from homeassistant.util import dt as dt_util
-from homeassistant.helpers.event import async_track_state_change_event
 
 from .const import (
     DOMAIN,
-    CONF_HORIZON_PROFILE,
-    CONF_WINDOWS,
-    CONF_AZIMUTH,
-    CONF_ELEVATION,
-    CONF_START_AZIMUTH, 
+    CONF_START_AZIMUTH,
     CONF_END_AZIMUTH,
     CONF_MAX_ELEVATION,
     CONF_NAME,
+    CONF_HORIZON_PROFILE,
+    GROUP_LABELS,
 )
+from .coordinator import SunOnWindowCoordinator
+from .horizon import HorizonTable
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -35,25 +33,70 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up the sensor(s) from a config entry."""
-    config = hass.data[DOMAIN][config_entry.entry_id]
-    
-    horizon_profile = config[CONF_HORIZON_PROFILE]
-    windows = config[CONF_WINDOWS]
-        
-    entities = []
-    for window_conf in windows:
-        entities.append(
-            SunOnWindowSensor(
-                window_conf[CONF_NAME],
-                horizon_profile,
-                window_conf[CONF_START_AZIMUTH],
-                window_conf[CONF_END_AZIMUTH],
-                window_conf[CONF_MAX_ELEVATION],
-                config_entry.entry_id,
-            )
-        )
-    
-    async_add_entities(entities, True)
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+
+    # Capteur de chaque fenêtre, par nom, pour les changements de configuration
+    entities = {
+        window_conf[CONF_NAME]: _window_sensor(coordinator, window_conf, config_entry.entry_id)
+        for window_conf in coordinator.windows
+    }
+    # Capteur de chaque groupe de fenêtres, par (sorte, valeur)
+    group_entities = {}
+
+    @callback
+    def _async_update_groups():
+        """Retirer les capteurs des groupes disparus et retourner ceux des nouveaux groupes."""
+        registry = er.async_get(hass)
+        for key in [key for key in group_entities if key not in coordinator.groups.index]:
+            entity = group_entities.pop(key)
+            if entity.entity_id:
+                registry.async_remove(entity.entity_id)
+
+        new_entities = [
+            SunOnWindowGroupSensor(coordinator, key, config_entry.entry_id)
+            for key in coordinator.groups.keys
+            if key not in group_entities
+        ]
+        group_entities.update((entity.group_key, entity) for entity in new_entities)
+        return new_entities
+
+    @callback
+    def _async_update_windows(added, removed, changed):
+        """Créer, retirer ou mettre à jour les capteurs des fenêtres modifiées."""
+        registry = er.async_get(hass)
+        for name in removed:
+            entity = entities.pop(name, None)
+            if entity is not None and entity.entity_id:
+                registry.async_remove(entity.entity_id)
+        for window_conf in changed:
+            entities[window_conf[CONF_NAME]].update_window(window_conf)
+
+        new_entities = [
+            _window_sensor(coordinator, window_conf, config_entry.entry_id)
+            for window_conf in added
+        ]
+        entities.update((entity.window_name, entity) for entity in new_entities)
+        # Les groupes changent avec les fenêtres
+        new_entities.extend(_async_update_groups())
+        if new_entities:
+            async_add_entities(new_entities)
+
+    config_entry.async_on_unload(coordinator.async_add_window_listener(_async_update_windows))
+    # Tous les capteurs en un seul lot, sans mise à jour préalable : le
+    # coordinateur leur pousse leur état à l'enregistrement
+    async_add_entities([*entities.values(), *_async_update_groups()])
+
+
+def _window_sensor(coordinator, window_conf, config_entry_id):
+    """Créer le capteur binaire d'une fenêtre configurée."""
+    return SunOnWindowSensor(
+        coordinator,
+        window_conf[CONF_NAME],
+        window_conf[CONF_START_AZIMUTH],
+        window_conf[CONF_END_AZIMUTH],
+        window_conf[CONF_MAX_ELEVATION],
+        config_entry_id,
+    )
 
 
 # Le support YAML est maintenu pour la rétrocompatibilité
@@ -64,23 +107,19 @@ async def async_setup_platform(
     discovery_info: DiscoveryInfoType | None = None,
 ) -> None:
     """Set up the sensor from YAML configuration."""
-    horizon_profile = config[CONF_HORIZON_PROFILE]
-    windows = config[CONF_WINDOWS]
-    
+    coordinator = SunOnWindowCoordinator(
+        hass, config, HorizonTable.from_profile(config.get(CONF_HORIZON_PROFILE))
+    )
+
     entities = []
-    for window_conf in windows:
+    for window_conf in coordinator.windows:
         entities.append(
-            SunOnWindowSensor(
-                window_conf[CONF_NAME],
-                horizon_profile,
-                window_conf[CONF_START_AZIMUTH],
-                window_conf[CONF_END_AZIMUTH],
-                window_conf[CONF_MAX_ELEVATION],
-                None,  # Pas d'ID d'entrée de configuration pour YAML
-            )
+            # Pas d'ID d'entrée de configuration pour YAML
+            _window_sensor(coordinator, window_conf, None)
         )
     
-    async_add_entities(entities, True)
+    # Sans mise à jour préalable : le coordinateur pousse l'état à l'enregistrement
+    async_add_entities(entities)
 
 
 class SunOnWindowSensor(BinarySensorEntity):
@@ -88,30 +127,32 @@ class SunOnWindowSensor(BinarySensorEntity):
     
     _attr_has_entity_name = True
     _attr_device_class = BinarySensorDeviceClass.LIGHT
+    _attr_should_poll = False
+    # La configuration statique n'est pas enregistrée à chaque changement d'état
+    _unrecorded_attributes = frozenset({"start_azimuth", "end_azimuth", "max_elevation"})
 
     def __init__(
         self,
+        coordinator,
         name,
-        horizon_profile,
         start_azimuth,
         end_azimuth,
         max_elevation,
         config_entry_id,
     ):
         """Initialiser le capteur."""
+        self._coordinator = coordinator
         self._name = name
-        self._horizon_profile = horizon_profile
         self._start_azimuth = start_azimuth
         self._end_azimuth = end_azimuth
         self._max_elevation = max_elevation
         self._config_entry_id = config_entry_id
+        self._registered = False
         self._attr_is_on = None
-        self._unsub_update = None
         self._attr_extra_state_attributes = {
             "start_azimuth": start_azimuth,
             "end_azimuth": end_azimuth,
             "max_elevation": max_elevation,
-            "horizon_profile": horizon_profile,
         }
         
         # Identifiants uniques pour l'entité
@@ -126,127 +167,99 @@ class SunOnWindowSensor(BinarySensorEntity):
         """Retourne le nom du capteur."""
         return f"Soleil sur {self._name}"
 
+    @property
+    def window_name(self):
+        """Retourne le nom de la fenêtre surveillée."""
+        return self._name
+
+    def update_window(self, window_conf):
+        """Reprendre la plage d'une fenêtre modifiée, écrite à la prochaine notification."""
+        self._start_azimuth = window_conf[CONF_START_AZIMUTH]
+        self._end_azimuth = window_conf[CONF_END_AZIMUTH]
+        self._max_elevation = window_conf[CONF_MAX_ELEVATION]
+        self._attr_extra_state_attributes.update({
+            "start_azimuth": self._start_azimuth,
+            "end_azimuth": self._end_azimuth,
+            "max_elevation": self._max_elevation,
+        })
+
     async def async_added_to_hass(self):
         """Appelé lorsque l'entité est ajoutée à Home Assistant."""
-        # S'abonner aux changements d'état de l'entité sun.sun
-        self.async_on_remove(
-            async_track_state_change_event(self.hass, "sun.sun", self._handle_sun_update_event)
-        )
-        # Effectuer une mise à jour initiale
-        await self._update_sun_position()
-
-    async def _handle_sun_update_event(self, event):
-        """Gérer les mises à jour de l'entité sun.sun."""
-        new_state = event.data.get("new_state")
-        if new_state is not None:
-            await self._update_sun_position()
-
-    async def async_will_remove_from_hass(self):
-        """Appelé lorsque l'entité est supprimée de Home Assistant."""
-        if self._unsub_update is not None:
-            self._unsub_update()
-
-    async def _update_sun_position(self, now=None):
-        """Met à jour la position du soleil et détermine si le soleil tape sur la fenêtre."""
-        # Récupération des informations sur le soleil depuis Home Assistant
-        sun_data = self.hass.states.get("sun.sun")
-        if sun_data is None:
-            _LOGGER.error("Impossible de récupérer les données du soleil")
-            return
-
-        # Extraction de l'azimut et de l'élévation actuels du soleil
-        azimuth = float(sun_data.attributes.get("azimuth", 0))
-        elevation = float(sun_data.attributes.get("elevation", 0))
+        # S'enregistrer auprès du coordinateur, qui pousse l'état initial,
+        # écrit par Home Assistant à la fin de l'ajout
+        self.async_on_remove(self._coordinator.async_register(self))
+        self._registered = True
 
+    @callback
+    def async_update_from_result(self, result, azimuth, elevation, horizon_elevation):
+        """Appliquer le résultat d'évaluation calculé par le coordinateur."""
         # Mise à jour des attributs avec les valeurs actuelles
         self._attr_extra_state_attributes.update({
             "current_azimuth": azimuth,
             "current_elevation": elevation,
         })
+        if elevation > 0 and horizon_elevation is not None:
+            self._attr_extra_state_attributes["horizon_elevation_at_current_azimuth"] = horizon_elevation
 
-        # Vérifier si le soleil est au-dessus de l'horizon
-        if elevation <= 0:
-            self._attr_is_on = False
-            self._attr_extra_state_attributes["sun_position"] = "below_horizon"
-        else:
-            # Vérifier si l'azimut du soleil est dans la plage de la fenêtre
-            in_azimuth_range = False
-            
-            # Gestion du cas où la plage traverse 0°/360°
-            if self._start_azimuth > self._end_azimuth:
-                in_azimuth_range = azimuth >= self._start_azimuth or azimuth <= self._end_azimuth
-            else:
-                in_azimuth_range = self._start_azimuth <= azimuth <= self._end_azimuth
-            
-            # Vérifier si l'élévation est inférieure à l'élévation maximale pour la fenêtre
-            below_max_elevation = elevation < self._max_elevation
-            
-            # Vérifier si le soleil est au-dessus du profil d'horizon à cet azimut
-            above_horizon = True
-            horizon_elevation = self._get_horizon_elevation(azimuth)
-            if horizon_elevation is not None:
-                above_horizon = elevation > horizon_elevation
-                self._attr_extra_state_attributes["horizon_elevation_at_current_azimuth"] = horizon_elevation
-            
-            # Déterminer l'état final
-            self._attr_is_on = in_azimuth_range and below_max_elevation and above_horizon
-            
-            # Mise à jour des attributs avec les raisons
-            self._attr_extra_state_attributes.update({
-                "in_azimuth_range": in_azimuth_range,
-                "below_max_elevation": below_max_elevation,
-                "above_horizon": above_horizon,
-                "sun_position": "hitting_window" if self._attr_is_on else "not_hitting_window",
-            })
+        # Déterminer l'état final et les raisons
+        self._attr_is_on = result["is_on"]
+        self._attr_extra_state_attributes.update(
+            {key: value for key, value in result.items() if key != "is_on"}
+        )
 
         # Notifier Home Assistant de la mise à jour de l'état
-        self.async_write_ha_state()
-
-    def _get_horizon_elevation(self, current_azimuth):
-        """
-        Calcule l'élévation du profil d'horizon à un azimut donné par interpolation linéaire.
-        Retourne None si le profil d'horizon n'est pas défini ou ne contient pas assez de points.
-        """
-        if not self._horizon_profile or len(self._horizon_profile) < 2:
-            return None
-        
-        # Trier le profil d'horizon par azimut
-        sorted_profile = sorted(self._horizon_profile, key=lambda x: x[CONF_AZIMUTH])
-        
-        # Trouver les points d'horizon qui encadrent l'azimut actuel
-        for i in range(len(sorted_profile)):
-            if sorted_profile[i][CONF_AZIMUTH] > current_azimuth:
-                if i == 0:
-                    # Cas particulier: l'azimut est avant le premier point
-                    # On considère le dernier et le premier point pour l'interpolation
-                    point1 = sorted_profile[-1]
-                    point1_azimuth = point1[CONF_AZIMUTH] - 360  # Ajuster pour la continuité
-                    point2 = sorted_profile[0]
-                else:
-                    point1 = sorted_profile[i-1]
-                    point1_azimuth = point1[CONF_AZIMUTH]
-                    point2 = sorted_profile[i]
-                
-                # Interpolation linéaire
-                point2_azimuth = point2[CONF_AZIMUTH]
-                elevation1 = point1[CONF_ELEVATION]
-                elevation2 = point2[CONF_ELEVATION]
-                
-                # Calcul de l'élévation interpolée
-                if point2_azimuth == point1_azimuth:
-                    return elevation1
-                
-                ratio = (current_azimuth - point1_azimuth) / (point2_azimuth - point1_azimuth)
-                return elevation1 + ratio * (elevation2 - elevation1)
-        
-        # Si nous sommes ici, l'azimut est après le dernier point
-        # On considère le dernier et le premier point pour l'interpolation
-        point1 = sorted_profile[-1]
-        point2 = sorted_profile[0]
-        point2_azimuth = point2[CONF_AZIMUTH] + 360  # Ajuster pour la continuité
-        
-        # Interpolation linéaire
-        elevation1 = point1[CONF_ELEVATION]
-        elevation2 = point2[CONF_ELEVATION]
-        ratio = (current_azimuth - point1[CONF_AZIMUTH]) / (point2_azimuth - point1[CONF_AZIMUTH])
-        return elevation1 + ratio * (elevation2 - elevation1)
+        if self._registered:
+            self.async_write_ha_state()
+
+
+class SunOnWindowGroupSensor(BinarySensorEntity):
+    """Capteur indiquant si le soleil tape sur au moins une fenêtre d'un groupe."""
+
+    _attr_has_entity_name = True
+    _attr_device_class = BinarySensorDeviceClass.LIGHT
+    _attr_should_poll = False
+
+    def __init__(self, coordinator, group_key, config_entry_id):
+        """Initialiser le capteur."""
+        self._coordinator = coordinator
+        self._group_key = group_key
+        self._state = None
+        self._registered = False
+        self._attr_is_on = None
+        kind, value = group_key
+        self._attr_unique_id = f"{config_entry_id}_group_{kind}_{value}"
+
+    @property
+    def name(self):
+        """Retourne le nom du capteur."""
+        kind, value = self._group_key
+        return f"Soleil sur {GROUP_LABELS[kind]} {value}"
+
+    @property
+    def group_key(self):
+        """Retourne la sorte et la valeur du groupe surveillé."""
+        return self._group_key
+
+    async def async_added_to_hass(self):
+        """Appelé lorsque l'entité est ajoutée à Home Assistant."""
+        self.async_on_remove(self._coordinator.async_register_group(self))
+        self._registered = True
+
+    @callback
+    def async_update_group(self, state):
+        """Appliquer l'état du groupe tenu à jour par le coordinateur."""
+        if state == self._state:
+            return
+
+        self._state = state
+        self._attr_is_on = state.sunlit_count > 0
+        self._attr_extra_state_attributes = {
+            "sunlit_count": state.sunlit_count,
+            "window_count": state.window_count,
+            "sunlit_windows": state.sunlit_windows,
+            "next_transition": None if state.next_transition is None else (
+                dt_util.utc_from_timestamp(state.next_transition).isoformat(timespec="seconds")
+            ),
+        }
+        if self._registered:
+            self.async_write_ha_state()
@@ -1,4 +1,7 @@
 """Config flow pour le composant Sun on Window."""
+import json
+import logging
+
 import voluptuous as vol
 from typing import Any, Dict, Optional
 
@@ -9,7 +12,7 @@ import homeassistant.helpers.config_validation as cv
 
 from .const import (
     DOMAIN,
-    CONF_HORIZON_PROFILE,
+    CONF_HORIZON_STORE,
     CONF_WINDOWS,
     CONF_AZIMUTH,
     CONF_ELEVATION,
@@ -17,7 +20,69 @@ from .const import (
     CONF_END_AZIMUTH,
     CONF_MAX_ELEVATION,
     CONF_NAME,
+    CONF_ELEVATION_DEADBAND,
+    CONF_AZIMUTH_DEADBAND,
+    CONF_MIN_DWELL,
+    CONF_WRITE_MODE,
+    CONF_ATTRIBUTE_REFRESH,
+    CONF_LATENCY_BUDGET,
+    DEFAULT_ELEVATION_DEADBAND,
+    DEFAULT_AZIMUTH_DEADBAND,
+    DEFAULT_MIN_DWELL,
+    DEFAULT_WRITE_MODE,
+    DEFAULT_ATTRIBUTE_REFRESH,
+    DEFAULT_LATENCY_BUDGET,
+    WRITE_MODE_CHANGES,
+    WRITE_MODE_TRANSITIONS,
+    CONF_HORIZON_FILE,
+    CONF_MAX_ERROR,
+    CONF_DEM_FILE,
+    CONF_OBSERVER_X,
+    CONF_OBSERVER_Y,
+    CONF_OBSERVER_HEIGHT,
+    CONF_DEM_RESOLUTION,
+    DEFAULT_OBSERVER_HEIGHT,
+    DEFAULT_DEM_RESOLUTION,
+    CONF_SURFACE_AZIMUTH,
+    CONF_WINDOW_HEIGHT,
+    CONF_WINDOW_WIDTH,
+    CONF_OVERHANG_DEPTH,
+    CONF_FIN_DEPTH,
+    CONF_OBSTRUCTIONS,
+    CONF_TILT,
+    CONF_MAX_INCIDENCE,
+    CONF_GLAZING_AREA,
+    CONF_G_VALUE,
+    CONF_FACADE,
+    CONF_ROOM,
+    CONF_FLOOR,
+    CONF_WINDOWS_FILE,
+    CONF_LATITUDE,
+    CONF_LONGITUDE,
+    CONF_SITE_ELEVATION,
+    CONF_POSITION_CACHE_SIZE,
+    DEFAULT_POSITION_CACHE_SIZE,
+)
+from .dem import DemError, compute_horizon
+from .horizon_import import HorizonImportError, load_horizon_file
+from .storage import (
+    HorizonStorageError,
+    async_load_horizon_summary,
+    async_release_horizon,
+    async_save_horizon,
+    async_summarize_horizon,
 )
+from .window_import import (
+    NUMERIC_FIELDS,
+    WindowImportError,
+    load_windows_file,
+    upsert_windows,
+    window_from_input,
+    window_input_complete,
+    window_input_given,
+)
+
+_LOGGER = logging.getLogger(__name__)
 
 
 async def validate_input(hass: HomeAssistant, data: Dict[str, Any]) -> Dict[str, Any]:
@@ -26,16 +91,119 @@ async def validate_input(hass: HomeAssistant, data: Dict[str, Any]) -> Dict[str,
     return {"title": "Sun on Window"}
 
 
+async def async_import_horizon_file(hass: HomeAssistant, path: str, max_error: float):
+    """Import a horizon file off the event loop. Return (profile, error key)."""
+    # Seuls les dossiers autorisés (allowlist_external_dirs) peuvent être lus
+    if not hass.config.is_allowed_path(path):
+        return None, "path_not_allowed"
+
+    try:
+        profile = await hass.async_add_executor_job(load_horizon_file, path, max_error)
+    except HorizonImportError as err:
+        return None, err.error_key
+    except OSError:
+        return None, "file_not_found"
+
+    return profile, None
+
+
+async def async_compute_dem_horizon(hass: HomeAssistant, user_input: Dict[str, Any]):
+    """Compute a horizon profile from a DEM off the event loop. Return (profile, error key)."""
+    path = user_input[CONF_DEM_FILE]
+    if not hass.config.is_allowed_path(path):
+        return None, "path_not_allowed"
+
+    try:
+        profile = await hass.async_add_executor_job(
+            compute_horizon,
+            path,
+            user_input[CONF_OBSERVER_X],
+            user_input[CONF_OBSERVER_Y],
+            user_input.get(CONF_OBSERVER_HEIGHT, DEFAULT_OBSERVER_HEIGHT),
+            user_input.get(CONF_DEM_RESOLUTION, DEFAULT_DEM_RESOLUTION),
+            None,
+            user_input.get(CONF_MAX_ERROR, 0.0),
+        )
+    except DemError:
+        return None, "invalid_dem"
+    except OSError:
+        return None, "file_not_found"
+
+    return profile, None
+
+
+async def async_import_windows_file(hass: HomeAssistant, path: str):
+    """Import and validate a windows file off the event loop. Return (windows, error key)."""
+    if not hass.config.is_allowed_path(path):
+        return None, "path_not_allowed"
+
+    try:
+        windows = await hass.async_add_executor_job(load_windows_file, path)
+    except WindowImportError as err:
+        _LOGGER.warning("Import des fenêtres depuis %s impossible : %s", path, err)
+        return None, err.error_key
+    except OSError:
+        return None, "file_not_found"
+
+    return windows, None
+
+
+def _horizon_summary_text(summary: Optional[Dict[str, Any]]) -> str:
+    """Describe a horizon profile by its summary instead of listing its points."""
+    if summary is None:
+        return "Aucun point défini"
+    return (
+        f"{summary['count']} points, azimut {summary['azimuth_min']:g}° à "
+        f"{summary['azimuth_max']:g}°, élévation {summary['elevation_min']:g}° à "
+        f"{summary['elevation_max']:g}°, somme de contrôle {summary['checksum'][:16]}"
+    )
+
+
+def _numeric_schema(*keys):
+    """Champs numériques optionnels d'une fenêtre, bornés comme à l'import."""
+    return {
+        vol.Optional(key): vol.All(
+            vol.Coerce(float), vol.Range(min=NUMERIC_FIELDS[key][0], max=NUMERIC_FIELDS[key][1])
+        )
+        for key in keys
+    }
+
+
+# Plage d'azimut et élévation maximale, communes aux formulaires de fenêtre
+WINDOW_RANGE_SCHEMA = _numeric_schema(CONF_START_AZIMUTH, CONF_END_AZIMUTH, CONF_MAX_ELEVATION)
+
+# Champs optionnels de géométrie et de vitrage, communs aux formulaires de fenêtre
+WINDOW_GEOMETRY_SCHEMA = {
+    **_numeric_schema(
+        CONF_SURFACE_AZIMUTH,
+        CONF_WINDOW_HEIGHT,
+        CONF_WINDOW_WIDTH,
+        CONF_OVERHANG_DEPTH,
+        CONF_FIN_DEPTH,
+    ),
+    vol.Optional(CONF_OBSTRUCTIONS): str,
+    **_numeric_schema(CONF_TILT, CONF_MAX_INCIDENCE, CONF_GLAZING_AREA, CONF_G_VALUE),
+}
+
+# Groupes optionnels d'une fenêtre, chacun donnant une entité de groupe
+WINDOW_GROUP_SCHEMA = {
+    vol.Optional(CONF_FACADE): str,
+    vol.Optional(CONF_ROOM): str,
+    vol.Optional(CONF_FLOOR): str,
+}
+
+
 class SunOnWindowConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Sun on Window."""
 
-    VERSION = 1
+    VERSION = 3
     CONNECTION_CLASS = config_entries.CONN_CLASS_LOCAL_PUSH
 
     def __init__(self):
         """Initialize the config flow."""
         self._horizon_profile = []
-        self._windows = []
+        # Fenêtres par nom : ajout ou remplacement en temps constant
+        self._windows = {}
 
     async def async_step_user(self, user_input=None) -> FlowResult:
         """Redirect immediately to horizon step."""
@@ -46,11 +214,22 @@ class SunOnWindowConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         errors = {}
 
         if user_input is not None:
+            # Import d'un fichier de relevé, prioritaire sur le JSON saisi
+            if user_input.get(CONF_HORIZON_FILE):
+                profile, error = await async_import_horizon_file(
+                    self.hass,
+                    user_input[CONF_HORIZON_FILE],
+                    user_input.get(CONF_MAX_ERROR, 0.0),
+                )
+                if error:
+                    errors[CONF_HORIZON_FILE] = error
+                else:
+                    self._horizon_profile = profile
+
             # Traitement de l'entrée JSON du profil d'horizon
-            if "horizon_profile_json" in user_input and user_input["horizon_profile_json"]:
+            elif "horizon_profile_json" in user_input and user_input["horizon_profile_json"]:
                 try:
                     # Analyser la chaîne JSON
-                    import json
                     horizon_data = json.loads(user_input["horizon_profile_json"])
                     
                     # Vérifier que c'est un dictionnaire
@@ -58,7 +237,7 @@ class SunOnWindowConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                         errors["horizon_profile_json"] = "invalid_json_format"
                     else:
                         # Convertir le dictionnaire en liste de points
-                        self._horizon_profile = []
+                        profile = []
                         for azimuth_str, elevation in horizon_data.items():
                             try:
                                 azimuth = float(azimuth_str)
@@ -70,13 +249,15 @@ class SunOnWindowConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                                     errors["horizon_profile_json"] = "invalid_elevation_range"
                                     break
                                 
-                                self._horizon_profile.append({
+                                profile.append({
                                     CONF_AZIMUTH: azimuth,
                                     CONF_ELEVATION: float(elevation),
                                 })
                             except ValueError:
                                 errors["horizon_profile_json"] = "invalid_number_format"
                                 break
+                        else:
+                            self._horizon_profile = profile
                 
                 except json.JSONDecodeError:
                     errors["horizon_profile_json"] = "invalid_json"
@@ -88,26 +269,27 @@ class SunOnWindowConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 else:
                     return await self.async_step_window()
 
-        # Formater les points d'horizon actuels pour l'affichage
-        horizon_points_str = ", ".join(
-            f"Azimut: {point[CONF_AZIMUTH]}°, Élévation: {point[CONF_ELEVATION]}°"
-            for point in self._horizon_profile
-        )
-        
-        # Convertir les points actuels en format JSON pour l'affichage
-        current_json = {}
-        for point in self._horizon_profile:
-            current_json[str(point[CONF_AZIMUTH])] = point[CONF_ELEVATION]
-        
-        horizon_json_str = json.dumps(current_json, indent=2) if current_json else ""
+        # Résumé du profil plutôt que ses points : un relevé en compte des milliers
+        summary = None
+        if self._horizon_profile:
+            summary = await async_summarize_horizon(self.hass, self._horizon_profile)
+
+        # Le JSON saisi n'est repris que pour être corrigé
+        horizon_json_str = ""
+        if errors and user_input is not None:
+            horizon_json_str = user_input.get("horizon_profile_json", "")
 
         return self.async_show_form(
             step_id="horizon",
             data_schema=vol.Schema({
                 vol.Optional("horizon_profile_json", default=horizon_json_str): cv.string,
+                vol.Optional(CONF_HORIZON_FILE): cv.string,
+                vol.Optional(CONF_MAX_ERROR, default=0.0): vol.All(
+                    vol.Coerce(float), vol.Range(min=0, max=10)
+                ),
             }),
             description_placeholders={
-                "current_points": horizon_points_str or "Aucun point défini",
+                "current_points": _horizon_summary_text(summary),
                 "description": "Définissez le profil d'horizon global au format JSON où les clés sont les azimuts (0-360°) "
                                "et les valeurs sont les élévations (-90° à 90°). "
                                "Exemple: {\"0\": 5, \"90\": 3, \"180\": 10, \"270\": 7}. "
@@ -121,38 +303,36 @@ class SunOnWindowConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         errors = {}
 
         if user_input is not None:
-            # Si une fenêtre est configurée, l'ajouter à la liste
-            if all(k in user_input for k in [CONF_NAME, CONF_START_AZIMUTH, CONF_END_AZIMUTH, CONF_MAX_ELEVATION]):
-                name = user_input[CONF_NAME]
-                # Vérifier si une fenêtre avec ce nom existe déjà
-                for i, window in enumerate(self._windows):
-                    if window[CONF_NAME] == name:
-                        # Mettre à jour la fenêtre existante
-                        self._windows[i] = {
-                            CONF_NAME: name,
-                            CONF_START_AZIMUTH: user_input[CONF_START_AZIMUTH],
-                            CONF_END_AZIMUTH: user_input[CONF_END_AZIMUTH],
-                            CONF_MAX_ELEVATION: user_input[CONF_MAX_ELEVATION],
-                        }
-                        break
+            # Un fichier et une fenêtre saisie ensemble : ne rien ignorer en silence
+            if user_input.get(CONF_WINDOWS_FILE) and window_input_given(user_input):
+                errors["base"] = "file_with_window_fields"
+
+            # Import en masse d'un fichier de fenêtres, validé hors de la boucle d'événements
+            elif user_input.get(CONF_WINDOWS_FILE):
+                windows, error = await async_import_windows_file(
+                    self.hass, user_input[CONF_WINDOWS_FILE]
+                )
+                if error:
+                    errors[CONF_WINDOWS_FILE] = error
                 else:
-                    # Ajouter une nouvelle fenêtre
-                    self._windows.append({
-                        CONF_NAME: name,
-                        CONF_START_AZIMUTH: user_input[CONF_START_AZIMUTH],
-                        CONF_END_AZIMUTH: user_input[CONF_END_AZIMUTH],
-                        CONF_MAX_ELEVATION: user_input[CONF_MAX_ELEVATION],
-                    })
+                    upsert_windows(self._windows, windows)
+
+            # Si une fenêtre est configurée, l'ajouter ou remplacer celle du même nom
+            elif window_input_complete(user_input):
+                new_window, errors = window_from_input(user_input)
+                if not errors:
+                    self._windows[new_window[CONF_NAME]] = new_window
 
             # Si l'utilisateur a terminé d'ajouter des fenêtres
-            if user_input.get("next_step", False):
+            if user_input.get("next_step", False) and not errors:
                 if not self._windows:
                     errors["base"] = "no_windows"
                 else:
                     # Créer l'entrée de configuration finale
+                    # Le profil est enregistré à part, l'entrée n'en garde que la référence
                     data = {
-                        CONF_HORIZON_PROFILE: self._horizon_profile,
-                        CONF_WINDOWS: self._windows,
+                        **await async_save_horizon(self.hass, self._horizon_profile),
+                        CONF_WINDOWS: list(self._windows.values()),
                     }
 
                     return self.async_create_entry(
@@ -164,22 +344,17 @@ class SunOnWindowConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         windows_str = "\n".join(
             f"- {window[CONF_NAME]}: Azimut {window[CONF_START_AZIMUTH]}° à {window[CONF_END_AZIMUTH]}°, "
             f"Élévation max: {window[CONF_MAX_ELEVATION]}°"
-            for window in self._windows
+            for window in self._windows.values()
         )
 
         return self.async_show_form(
             step_id="window",
             data_schema=vol.Schema({
                 vol.Optional(CONF_NAME): str,
-                vol.Optional(CONF_START_AZIMUTH): vol.All(
-                    vol.Coerce(float), vol.Range(min=0, max=360)
-                ),
-                vol.Optional(CONF_END_AZIMUTH): vol.All(
-                    vol.Coerce(float), vol.Range(min=0, max=360)
-                ),
-                vol.Optional(CONF_MAX_ELEVATION): vol.All(
-                    vol.Coerce(float), vol.Range(min=0, max=90)
-                ),
+                **WINDOW_RANGE_SCHEMA,
+                **WINDOW_GEOMETRY_SCHEMA,
+                **WINDOW_GROUP_SCHEMA,
+                vol.Optional(CONF_WINDOWS_FILE): cv.string,
                 vol.Optional("next_step", default=False): bool,
             }),
             description_placeholders={
@@ -204,8 +379,13 @@ class SunOnWindowOptionsFlow(config_entries.OptionsFlow):
     def __init__(self, config_entry):
         """Initialize options flow."""
         self.config_entry = config_entry
-        self._horizon_profile = list(config_entry.data.get(CONF_HORIZON_PROFILE, []))
-        self._windows = list(config_entry.data.get(CONF_WINDOWS, []))
+        # Nouveau profil d'horizon saisi (None : profil enregistré inchangé) et
+        # résumé affiché, lu à la première ouverture du formulaire
+        self._horizon_profile = None
+        self._horizon_summary = None
+        self._windows = {
+            window[CONF_NAME]: window for window in config_entry.data.get(CONF_WINDOWS, [])
+        }
 
     async def async_step_init(self, user_input=None) -> FlowResult:
         """Manage the options for the custom component."""
@@ -219,6 +399,10 @@ class SunOnWindowOptionsFlow(config_entries.OptionsFlow):
                 return await self.async_step_edit_horizon()
             elif menu_option == "windows":
                 return await self.async_step_edit_windows()
+            elif menu_option == "settings":
+                return await self.async_step_edit_settings()
+            elif menu_option == "site":
+                return await self.async_step_edit_site()
 
         return self.async_show_form(
             step_id="menu",
@@ -226,6 +410,8 @@ class SunOnWindowOptionsFlow(config_entries.OptionsFlow):
                 vol.Required("menu_option", default="horizon"): vol.In({
                     "horizon": "Modifier le profil d'horizon",
                     "windows": "Gérer les fenêtres",
+                    "settings": "Réglages anti-battement et d'écriture",
+                    "site": "Lieu du bâtiment",
                 }),
             }),
         )
@@ -233,11 +419,20 @@ class SunOnWindowOptionsFlow(config_entries.OptionsFlow):
     async def async_step_edit_horizon(self, user_input=None) -> FlowResult:
         """Edit horizon profile."""
         errors = {}
-        import json
+
+        if self._horizon_profile is None and self._horizon_summary is None:
+            # Seul le résumé du profil enregistré est lu, pas la liste de ses points
+            try:
+                self._horizon_summary = await async_load_horizon_summary(
+                    self.hass, self.config_entry.data
+                )
+            except HorizonStorageError as err:
+                _LOGGER.warning("Profil d'horizon enregistré illisible : %s", err)
 
         if user_input is not None:
             if "action" in user_input:
                 action = user_input["action"]
+                profile = None
                 
                 if action == "edit_json" and "horizon_profile_json" in user_input:
                     # Traiter l'entrée JSON du profil d'horizon
@@ -248,7 +443,7 @@ class SunOnWindowOptionsFlow(config_entries.OptionsFlow):
                             errors["horizon_profile_json"] = "invalid_json_format"
                         else:
                             # Convertir le dictionnaire en liste de points
-                            self._horizon_profile = []
+                            points = []
                             for azimuth_str, elevation in horizon_data.items():
                                 try:
                                     azimuth = float(azimuth_str)
@@ -260,42 +455,75 @@ class SunOnWindowOptionsFlow(config_entries.OptionsFlow):
                                         errors["horizon_profile_json"] = "invalid_elevation_range"
                                         break
                                     
-                                    self._horizon_profile.append({
+                                    points.append({
                                         CONF_AZIMUTH: azimuth,
                                         CONF_ELEVATION: float(elevation),
                                     })
                                 except ValueError:
                                     errors["horizon_profile_json"] = "invalid_number_format"
                                     break
+                            else:
+                                profile = points
                     
                     except json.JSONDecodeError:
                         errors["horizon_profile_json"] = "invalid_json"
+
+                elif action == "import_file":
+                    # Importer un fichier de relevé hors de la boucle d'événements
+                    if not user_input.get(CONF_HORIZON_FILE):
+                        errors[CONF_HORIZON_FILE] = "file_not_found"
+                    else:
+                        profile, error = await async_import_horizon_file(
+                            self.hass,
+                            user_input[CONF_HORIZON_FILE],
+                            user_input.get(CONF_MAX_ERROR, 0.0),
+                        )
+                        if error:
+                            errors[CONF_HORIZON_FILE] = error
+
+                elif action == "compute_dem":
+                    # Calculer l'horizon par lancer de rayons sur le modèle de terrain
+                    if not user_input.get(CONF_DEM_FILE):
+                        errors[CONF_DEM_FILE] = "file_not_found"
+                    elif CONF_OBSERVER_X not in user_input or CONF_OBSERVER_Y not in user_input:
+                        errors[CONF_OBSERVER_X] = "observer_required"
+                    else:
+                        profile, error = await async_compute_dem_horizon(self.hass, user_input)
+                        if error:
+                            errors[CONF_DEM_FILE] = error
                 
                 elif action == "save":
                     # Sauvegarder les modifications et revenir au menu
-                    if len(self._horizon_profile) < 2:
+                    if self._horizon_profile is None and self._horizon_summary is not None:
+                        # Profil enregistré inchangé : rien à réécrire
+                        return await self.async_step_menu()
+                    if self._horizon_profile is None or len(self._horizon_profile) < 2:
                         errors["horizon_profile_json"] = "minimum_horizon_points"
                     else:
                         # Mettre à jour l'entrée de configuration
+                        previous = self.config_entry.data.get(CONF_HORIZON_STORE)
                         new_data = dict(self.config_entry.data)
-                        new_data[CONF_HORIZON_PROFILE] = self._horizon_profile
+                        new_data.update(
+                            await async_save_horizon(self.hass, self._horizon_profile)
+                        )
                         self.hass.config_entries.async_update_entry(
                             self.config_entry, data=new_data
                         )
+                        if previous and previous != new_data[CONF_HORIZON_STORE]:
+                            await async_release_horizon(self.hass, previous)
                         return await self.async_step_menu()
 
-        # Convertir les points actuels en format JSON pour l'affichage
-        current_json = {}
-        for point in self._horizon_profile:
-            current_json[str(point[CONF_AZIMUTH])] = point[CONF_ELEVATION]
-        
-        horizon_json_str = json.dumps(current_json, indent=2) if current_json else ""
+                # Nouveau profil retenu jusqu'à l'enregistrement, affiché par son résumé
+                if profile is not None and not errors:
+                    self._horizon_profile = profile
+                    self._horizon_summary = (
+                        await async_summarize_horizon(self.hass, profile) if profile else None
+                    )
 
-        # Préparer les points pour l'affichage
-        horizon_points_display = "\n".join(
-            f"- Azimut: {point[CONF_AZIMUTH]}°, Élévation: {point[CONF_ELEVATION]}°"
-            for point in sorted(self._horizon_profile, key=lambda x: x[CONF_AZIMUTH])
-        ) or "Aucun point défini"
+        # Le JSON saisi n'est repris que pour être corrigé
+        horizon_json_str = ""
+        if errors and user_input is not None:
+            horizon_json_str = user_input.get("horizon_profile_json", "")
 
         # Afficher le formulaire
         return self.async_show_form(
@@ -303,15 +531,31 @@ class SunOnWindowOptionsFlow(config_entries.OptionsFlow):
             data_schema=vol.Schema({
                 vol.Required("action", default="edit_json"): vol.In({
                     "edit_json": "Éditer le profil d'horizon (JSON)",
+                    "import_file": "Importer un fichier de relevé",
+                    "compute_dem": "Calculer depuis un modèle numérique de terrain",
                     "save": "Enregistrer et revenir au menu",
                 }),
                 vol.Optional("horizon_profile_json", default=horizon_json_str): str,
+                vol.Optional(CONF_HORIZON_FILE): str,
+                vol.Optional(CONF_MAX_ERROR, default=0.0): vol.All(
+                    vol.Coerce(float), vol.Range(min=0, max=10)
+                ),
+                vol.Optional(CONF_DEM_FILE): str,
+                vol.Optional(CONF_OBSERVER_X): vol.Coerce(float),
+                vol.Optional(CONF_OBSERVER_Y): vol.Coerce(float),
+                vol.Optional(CONF_OBSERVER_HEIGHT, default=DEFAULT_OBSERVER_HEIGHT): vol.All(
+                    vol.Coerce(float), vol.Range(min=0, max=1000)
+                ),
+                vol.Optional(CONF_DEM_RESOLUTION, default=DEFAULT_DEM_RESOLUTION): vol.All(
+                    vol.Coerce(float), vol.Range(min=0.01, max=10)
+                ),
             }),
             description_placeholders={
-                "current_points": horizon_points_display,
-                "description": "Modifiez le profil d'horizon global au format JSON où les clés sont les azimuts (0-360°) "
-                               "et les valeurs sont les élévations (-90° à 90°). "
-                               "Exemple: {\"0\": 5, \"90\": 3, \"180\": 10, \"270\": 7}.",
+                "current_points": _horizon_summary_text(self._horizon_summary),
+                "description": "Remplacez le profil d'horizon global par un nouveau profil au format JSON où les clés "
+                               "sont les azimuts (0-360°) et les valeurs sont les élévations (-90° à 90°). "
+                               "Exemple: {\"0\": 5, \"90\": 3, \"180\": 10, \"270\": 7}. "
+                               "Le profil enregistré est conservé tant qu'aucun nouveau profil n'est enregistré.",
             },
             errors=errors,
         )
@@ -326,31 +570,29 @@ class SunOnWindowOptionsFlow(config_entries.OptionsFlow):
                 
                 if action == "add":
                     # Ajouter ou mettre à jour une fenêtre
-                    if all(k in user_input for k in [CONF_NAME, CONF_START_AZIMUTH, CONF_END_AZIMUTH, CONF_MAX_ELEVATION]):
-                        name = user_input[CONF_NAME]
-                        
-                        # Vérifier si une fenêtre avec ce nom existe déjà
-                        for i, window in enumerate(self._windows):
-                            if window[CONF_NAME] == name:
-                                self._windows[i] = {
-                                    CONF_NAME: name,
-                                    CONF_START_AZIMUTH: user_input[CONF_START_AZIMUTH],
-                                    CONF_END_AZIMUTH: user_input[CONF_END_AZIMUTH],
-                                    CONF_MAX_ELEVATION: user_input[CONF_MAX_ELEVATION],
-                                }
-                                break
+                    if window_input_complete(user_input):
+                        new_window, errors = window_from_input(user_input)
+                        if not errors:
+                            self._windows[new_window[CONF_NAME]] = new_window
+
+                elif action == "import_file":
+                    # Ajouter ou mettre à jour en masse les fenêtres d'un fichier
+                    if not user_input.get(CONF_WINDOWS_FILE):
+                        errors[CONF_WINDOWS_FILE] = "file_not_found"
+                    elif window_input_given(user_input):
+                        errors["base"] = "file_with_window_fields"
+                    else:
+                        windows, error = await async_import_windows_file(
+                            self.hass, user_input[CONF_WINDOWS_FILE]
+                        )
+                        if error:
+                            errors[CONF_WINDOWS_FILE] = error
                         else:
-                            self._windows.append({
-                                CONF_NAME: name,
-                                CONF_START_AZIMUTH: user_input[CONF_START_AZIMUTH],
-                                CONF_END_AZIMUTH: user_input[CONF_END_AZIMUTH],
-                                CONF_MAX_ELEVATION: user_input[CONF_MAX_ELEVATION],
-                            })
-                
+                            upsert_windows(self._windows, windows)
+
                 elif action == "delete" and "delete_window" in user_input:
                     # Supprimer une fenêtre
-                    window_name = user_input["delete_window"]
-                    self._windows = [w for w in self._windows if w[CONF_NAME] != window_name]
+                    self._windows.pop(user_input["delete_window"], None)
                 
                 elif action == "save":
                     # Sauvegarder les modifications et revenir au menu
@@ -359,17 +601,14 @@ class SunOnWindowOptionsFlow(config_entries.OptionsFlow):
                     else:
                         # Mettre à jour l'entrée de configuration
                         new_data = dict(self.config_entry.data)
-                        new_data[CONF_WINDOWS] = self._windows
+                        new_data[CONF_WINDOWS] = list(self._windows.values())
                         self.hass.config_entries.async_update_entry(
                             self.config_entry, data=new_data
                         )
                         return await self.async_step_menu()
 
         # Préparer les options de suppression
-        delete_options = {
-            window[CONF_NAME]: window[CONF_NAME] 
-            for window in self._windows
-        }
+        delete_options = {name: name for name in self._windows}
 
         # Afficher le formulaire
         return self.async_show_form(
@@ -377,27 +616,116 @@ class SunOnWindowOptionsFlow(config_entries.OptionsFlow):
             data_schema=vol.Schema({
                 vol.Required("action", default="add"): vol.In({
                     "add": "Ajouter/Modifier une fenêtre",
+                    "import_file": "Importer un fichier de fenêtres (CSV ou JSON)",
                     "delete": "Supprimer une fenêtre",
                     "save": "Enregistrer et revenir au menu",
                 }),
                 vol.Optional(CONF_NAME): str,
-                vol.Optional(CONF_START_AZIMUTH): vol.All(
-                    vol.Coerce(float), vol.Range(min=0, max=360)
-                ),
-                vol.Optional(CONF_END_AZIMUTH): vol.All(
-                    vol.Coerce(float), vol.Range(min=0, max=360)
-                ),
-                vol.Optional(CONF_MAX_ELEVATION): vol.All(
-                    vol.Coerce(float), vol.Range(min=0, max=90)
-                ),
+                **WINDOW_RANGE_SCHEMA,
+                **WINDOW_GEOMETRY_SCHEMA,
+                **WINDOW_GROUP_SCHEMA,
+                vol.Optional(CONF_WINDOWS_FILE): cv.string,
                 vol.Optional("delete_window"): vol.In(delete_options if delete_options else {"none": "Aucune fenêtre à supprimer"}),
             }),
             description_placeholders={
                 "current_windows": "\n".join(
                     f"- {window[CONF_NAME]}: Azimut {window[CONF_START_AZIMUTH]}° à {window[CONF_END_AZIMUTH]}°, "
                     f"Élévation max: {window[CONF_MAX_ELEVATION]}°"
-                    for window in self._windows
+                    for window in self._windows.values()
                 ) or "Aucune fenêtre définie",
             },
             errors=errors,
         )
+
+    async def async_step_edit_settings(self, user_input=None) -> FlowResult:
+        """Edit deadband, dwell time, state write and diagnostic settings."""
+        data = self.config_entry.data
+
+        if user_input is not None:
+            # Mettre à jour l'entrée de configuration
+            new_data = dict(data)
+            new_data.update(user_input)
+            self.hass.config_entries.async_update_entry(
+                self.config_entry, data=new_data
+            )
+            return await self.async_step_menu()
+
+        return self.async_show_form(
+            step_id="edit_settings",
+            data_schema=vol.Schema({
+                vol.Required(
+                    CONF_ELEVATION_DEADBAND,
+                    default=data.get(CONF_ELEVATION_DEADBAND, DEFAULT_ELEVATION_DEADBAND),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0, max=10)),
+                vol.Required(
+                    CONF_AZIMUTH_DEADBAND,
+                    default=data.get(CONF_AZIMUTH_DEADBAND, DEFAULT_AZIMUTH_DEADBAND),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0, max=10)),
+                vol.Required(
+                    CONF_MIN_DWELL,
+                    default=data.get(CONF_MIN_DWELL, DEFAULT_MIN_DWELL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=3600)),
+                vol.Required(
+                    CONF_WRITE_MODE,
+                    default=data.get(CONF_WRITE_MODE, DEFAULT_WRITE_MODE),
+                ): vol.In({
+                    WRITE_MODE_CHANGES: "À chaque changement d'état ou de raison",
+                    WRITE_MODE_TRANSITIONS: "Uniquement aux bascules d'état",
+                }),
+                vol.Required(
+                    CONF_ATTRIBUTE_REFRESH,
+                    default=data.get(CONF_ATTRIBUTE_REFRESH, DEFAULT_ATTRIBUTE_REFRESH),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=1440)),
+                vol.Required(
+                    CONF_LATENCY_BUDGET,
+                    default=data.get(CONF_LATENCY_BUDGET, DEFAULT_LATENCY_BUDGET),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0, max=1000)),
+            }),
+        )
+
+    async def async_step_edit_site(self, user_input=None) -> FlowResult:
+        """Edit the entry's own location and the sun position cache size."""
+        data = self.config_entry.data
+        errors = {}
+
+        if user_input is not None:
+            # Latitude et longitude vont ensemble ; sans elles, le lieu de Home Assistant
+            if (CONF_LATITUDE in user_input) != (CONF_LONGITUDE in user_input):
+                errors["base"] = "incomplete_site"
+            else:
+                new_data = dict(data)
+                for key in (CONF_LATITUDE, CONF_LONGITUDE, CONF_SITE_ELEVATION):
+                    if key in user_input:
+                        new_data[key] = user_input[key]
+                    else:
+                        new_data.pop(key, None)
+                new_data[CONF_POSITION_CACHE_SIZE] = user_input[CONF_POSITION_CACHE_SIZE]
+                self.hass.config_entries.async_update_entry(
+                    self.config_entry, data=new_data
+                )
+                return await self.async_step_menu()
+
+        return self.async_show_form(
+            step_id="edit_site",
+            data_schema=vol.Schema({
+                vol.Optional(
+                    CONF_LATITUDE, description={"suggested_value": data.get(CONF_LATITUDE)}
+                ): vol.All(vol.Coerce(float), vol.Range(min=-90, max=90)),
+                vol.Optional(
+                    CONF_LONGITUDE, description={"suggested_value": data.get(CONF_LONGITUDE)}
+                ): vol.All(vol.Coerce(float), vol.Range(min=-180, max=180)),
+                vol.Optional(
+                    CONF_SITE_ELEVATION,
+                    description={"suggested_value": data.get(CONF_SITE_ELEVATION)},
+                ): vol.All(vol.Coerce(float), vol.Range(min=-500, max=9000)),
+                vol.Required(
+                    CONF_POSITION_CACHE_SIZE,
+                    default=data.get(CONF_POSITION_CACHE_SIZE, DEFAULT_POSITION_CACHE_SIZE),
+                ): vol.All(vol.Coerce(int), vol.Range(min=16, max=1048576)),
+            }),
+            description_placeholders={
+                "home_latitude": str(self.hass.config.latitude),
+                "home_longitude": str(self.hass.config.longitude),
+            },
+            errors=errors,
+        )
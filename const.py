@@ -3,20 +3,121 @@ from datetime import timedelta
 
 DOMAIN = "sun_on_window"
 
+# Clé du registre des ressources partagées entre entrées, dans hass.data[DOMAIN]
+DATA_REGISTRY = "engine_registry"
+
+# Période sur laquelle les bascules des fenêtres sont prédites à l'avance
+TRANSITION_PLAN_HORIZON = timedelta(hours=24)
+
+# Mesures continues par fenêtre et cadence de leur recalcul, soleil levé
+MEASUREMENT_SUNLIT = "sunlit"
+MEASUREMENT_HEAT_GAIN = "heat_gain"
+MEASUREMENT_REFRESH_INTERVAL = timedelta(minutes=1)
+
+# Lieu propre à une entrée (à défaut, celui de Home Assistant)
+CONF_LATITUDE = "latitude"
+CONF_LONGITUDE = "longitude"
+CONF_SITE_ELEVATION = "site_elevation"
+# Nombre de positions du soleil à la minute gardées en cache, tous sites confondus
+CONF_POSITION_CACHE_SIZE = "position_cache_size"
+DEFAULT_POSITION_CACHE_SIZE = 4096
+
 # Configuration pour le profil d'horizon global
 CONF_HORIZON_PROFILE = "horizon_profile"
 CONF_AZIMUTH = "azimuth"
 CONF_ELEVATION = "elevation"
+# Référence au profil enregistré hors de l'entrée (fichier .storage) et son empreinte
+CONF_HORIZON_STORE = "horizon_store"
+CONF_HORIZON_CHECKSUM = "horizon_checksum"
+
+# Import d'un profil d'horizon depuis un fichier de relevé
+CONF_HORIZON_FILE = "horizon_file"
+CONF_MAX_ERROR = "max_error"
+
+# Calcul d'un profil d'horizon depuis un modèle numérique de terrain
+CONF_DEM_FILE = "dem_file"
+CONF_OBSERVER_X = "observer_x"
+CONF_OBSERVER_Y = "observer_y"
+CONF_OBSERVER_HEIGHT = "observer_height"
+CONF_DEM_RESOLUTION = "dem_resolution"
+
+DEFAULT_OBSERVER_HEIGHT = 1.5
+DEFAULT_DEM_RESOLUTION = 1.0
 
 # Configuration pour chaque fenêtre
 CONF_WINDOWS = "windows"
+# Import de fenêtres en masse depuis un fichier CSV ou JSON
+CONF_WINDOWS_FILE = "windows_file"
 CONF_START_AZIMUTH = "start_azimuth"
 CONF_END_AZIMUTH = "end_azimuth"
 CONF_MAX_ELEVATION = "max_elevation"
 CONF_NAME = "name"
-CONF_SCAN_INTERVAL = "scan_interval"
 
-DEFAULT_SCAN_INTERVAL = timedelta(minutes=5)
+# Géométrie d'ombrage optionnelle de chaque fenêtre (mètres, degrés)
+CONF_SURFACE_AZIMUTH = "surface_azimuth"
+CONF_WINDOW_HEIGHT = "window_height"
+CONF_WINDOW_WIDTH = "window_width"
+CONF_OVERHANG_DEPTH = "overhang_depth"
+CONF_FIN_DEPTH = "fin_depth"
+CONF_OBSTRUCTIONS = "obstructions"
+
+# Fenêtres inclinées et de toit : inclinaison depuis l'horizontale (90° :
+# façade verticale, 0° : vitrage horizontal) et angle d'incidence maximal
+CONF_TILT = "tilt"
+CONF_MAX_INCIDENCE = "max_incidence"
+
+DEFAULT_MAX_INCIDENCE = 90.0
+
+# Apports solaires : surface vitrée (m², à défaut hauteur × largeur) et
+# facteur solaire g du vitrage
+CONF_GLAZING_AREA = "glazing_area"
+CONF_G_VALUE = "g_value"
+
+DEFAULT_G_VALUE = 0.6
+
+# Regroupement optionnel des fenêtres par façade, pièce et étage : une entité
+# de groupe est créée pour chaque valeur rencontrée
+CONF_FACADE = "facade"
+CONF_ROOM = "room"
+CONF_FLOOR = "floor"
+
+GROUP_KINDS = (CONF_FACADE, CONF_ROOM, CONF_FLOOR)
+# Libellé de chaque sorte de groupe dans le nom des entités
+GROUP_LABELS = {CONF_FACADE: "façade", CONF_ROOM: "pièce", CONF_FLOOR: "étage"}
+
+# Réglages anti-battement et d'écriture des états
+CONF_ELEVATION_DEADBAND = "elevation_deadband"
+CONF_AZIMUTH_DEADBAND = "azimuth_deadband"
+CONF_MIN_DWELL = "min_dwell"
+CONF_WRITE_MODE = "write_mode"
+
+WRITE_MODE_CHANGES = "changes"
+WRITE_MODE_TRANSITIONS = "transitions"
+
+DEFAULT_ELEVATION_DEADBAND = 0.0
+DEFAULT_AZIMUTH_DEADBAND = 0.0
+DEFAULT_MIN_DWELL = 0
+DEFAULT_WRITE_MODE = WRITE_MODE_CHANGES
+# Rafraîchissement périodique des attributs en minutes (0 : désactivé)
+CONF_ATTRIBUTE_REFRESH = "attribute_refresh"
+DEFAULT_ATTRIBUTE_REFRESH = 0
+
+# Diagnostic des performances
+CONF_LATENCY_BUDGET = "latency_budget"
+# Budget de latence d'une évaluation en millisecondes (0 : désactivé)
+DEFAULT_LATENCY_BUDGET = 0.0
+# Bornes supérieures (ms) des cases de l'histogramme des durées d'évaluation
+EVALUATION_HISTOGRAM_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100)
+
+# Service de calcul des intervalles de soleil sur une période
+SERVICE_GET_SCHEDULE = "get_schedule"
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_START_DATE = "start_date"
+ATTR_END_DATE = "end_date"
+# Plus longue période d'un appel, en jours
+SCHEDULE_MAX_DAYS = 366
+# Journées calculées gardées en cache, toutes entrées confondues
+SCHEDULE_CACHE_DAYS = 732
 
 # Messages d'erreur
 ERROR_MIN_HORIZON_POINTS = "minimum_horizon_points"
@@ -0,0 +1,856 @@
+"""Coordinateur unique par entrée de configuration pour le composant Sun on Window."""
+import logging
+import math
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import (
+    async_track_point_in_utc_time,
+    async_track_time_change,
+    async_track_time_interval,
+)
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    CONF_NAME,
+    CONF_WINDOWS,
+    CONF_ELEVATION_DEADBAND,
+    CONF_AZIMUTH_DEADBAND,
+    CONF_MIN_DWELL,
+    CONF_WRITE_MODE,
+    CONF_ATTRIBUTE_REFRESH,
+    CONF_LATENCY_BUDGET,
+    DEFAULT_ELEVATION_DEADBAND,
+    DEFAULT_AZIMUTH_DEADBAND,
+    DEFAULT_MIN_DWELL,
+    DEFAULT_WRITE_MODE,
+    DEFAULT_ATTRIBUTE_REFRESH,
+    DEFAULT_LATENCY_BUDGET,
+    EVALUATION_HISTOGRAM_BUCKETS,
+    TRANSITION_PLAN_HORIZON,
+    MEASUREMENT_SUNLIT,
+    MEASUREMENT_HEAT_GAIN,
+    WRITE_MODE_TRANSITIONS,
+)
+from .engine import CODE_IS_ON, WindowBatch
+from .forecast import FORECAST_DAYS, compute_forecast, merge_packed
+from .groups import WindowGroups
+from .registry import SunSite, entry_location, local_days, schedule_hash
+from .scheduler import find_transitions
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class SunOnWindowCoordinator:
+    """
+    Évalue toutes les fenêtres d'une entrée de configuration.
+
+    La position du soleil est calculée localement par l'éphéméride, sans
+    dépendre de la cadence de publication de sun.sun. Les instants de bascule
+    de toutes les fenêtres sont prédits à l'avance sur la trajectoire du
+    soleil, et un seul minuteur par entrée réveille le coordinateur
+    exactement à la prochaine bascule. Toutes les fenêtres sont alors
+    évaluées en un seul appel vectorisé et seuls les capteurs dont l'état a
+    réellement changé sont notifiés.
+
+    Pour éviter les battements, l'évaluation applique l'hystérésis du lot et
+    une durée minimale entre deux bascules d'une même fenêtre. Selon le mode
+    d'écriture, un capteur est notifié quand son état ou ses raisons changent,
+    ou seulement quand son état bascule ; les attributs peuvent en plus être
+    rafraîchis à intervalle régulier.
+
+    La part éclairée du vitrage et les apports solaires varient continûment :
+    ils sont recalculés pour toutes les fenêtres en un appel vectorisé à chaque
+    évaluation, et chaque minute tant que le soleil est levé.
+
+    Les groupes de fenêtres (façade, pièce, étage) suivent les bascules de
+    l'état publié dans la même évaluation : seuls les groupes d'une fenêtre
+    qui a basculé sont recomptés et notifiés.
+    """
+
+    def __init__(self, hass: HomeAssistant, config, horizon_table, site=None, registry=None):
+        """
+        Initialiser le coordinateur avec le profil d'horizon déjà compilé. Le
+        site, partagé avec les autres entrées du même lieu, fournit la position
+        du soleil ; sans site, le coordinateur a le sien, au lieu de l'entrée.
+        Avec le registre, la prévision et les bascules du jour passent par son
+        cache de journées, enregistré d'un démarrage à l'autre.
+        """
+        self.hass = hass
+        self.config = config
+        self.windows = config[CONF_WINDOWS]
+
+        # Profil d'horizon compilé une seule fois pour toutes les fenêtres
+        self.horizon_table = horizon_table
+        self.batch = WindowBatch(
+            self.windows,
+            self.horizon_table,
+            config.get(CONF_ELEVATION_DEADBAND, DEFAULT_ELEVATION_DEADBAND),
+            config.get(CONF_AZIMUTH_DEADBAND, DEFAULT_AZIMUTH_DEADBAND),
+        )
+        latitude, longitude, self.site_elevation = entry_location(hass, config)
+        self.site = site or SunSite(hass, latitude, longitude)
+        self.ephemeris = self.site.ephemeris
+        self._registry = registry
+        # Clé des journées de l'entrée dans le cache du registre
+        self.schedule_hash = schedule_hash(config, self.site)
+
+        # Réglages anti-battement et d'écriture des états
+        self.min_dwell = config.get(CONF_MIN_DWELL, DEFAULT_MIN_DWELL)
+        self.write_mode = config.get(CONF_WRITE_MODE, DEFAULT_WRITE_MODE)
+        self.attribute_refresh = config.get(CONF_ATTRIBUTE_REFRESH, DEFAULT_ATTRIBUTE_REFRESH)
+
+        self._sensors = {}
+        self._evaluation = None
+        self._current_codes = None
+        # Dernier code d'état poussé par fenêtre (-1 : jamais poussé)
+        self._codes = np.full(len(self.batch), -1)
+        # État publié de chaque fenêtre et instant de sa dernière bascule
+        self._states = None
+        self._last_change = np.full(len(self.batch), -np.inf)
+        # Fin de la plus proche durée minimale qui retient une bascule
+        self._dwell_until = None
+        self._unsub_refresh = None
+        self.azimuth = None
+        self.elevation = None
+        self.horizon_elevation = None
+
+        # Bascules prévues (horodatages POSIX triés), leurs fenêtres et fin de la période planifiée
+        self._transition_times = np.empty(0)
+        self._transition_windows = np.empty(0, dtype=np.intp)
+        self._plan_end = None
+        self._plan_task = None
+        self._unsub_timer = None
+        self.next_wakeup = None
+
+        # Mesures publiées par fenêtre (-1 : jamais publiée) : part éclairée en
+        # pourcentage et apports solaires en watts, plus le total de l'entrée
+        self._measurement_sensors = {}
+        self._measurements = {
+            MEASUREMENT_SUNLIT: np.full(len(self.batch), -1.0),
+            MEASUREMENT_HEAT_GAIN: np.full(len(self.batch), -1.0),
+        }
+        self._total_heat_gain = None
+        # Dernières valeurs calculées pour toutes les fenêtres, et leur total
+        self._measurement_values = None
+        self._measurement_total = None
+        # Capteurs d'apports solaires enregistrés : avec eux ou une protection,
+        # les mesures varient entre deux bascules et suivent le minuteur du site
+        self._heat_gain_sensor_count = 0
+        self._unsub_measurements = None
+
+        # Prévision des intervalles de soleil par fenêtre, recalculée chaque jour
+        self.forecast = {}
+        self._forecast_listeners = {}
+        # Bornes prévues (horodatages POSIX triés), leurs fenêtres, et instant
+        # jusqu'où les capteurs de prévision ont été notifiés
+        self._forecast_times = np.empty(0)
+        self._forecast_windows = []
+        self._forecast_checked = 0.0
+        self._forecast_task = None
+        self._unsub_forecast_timer = None
+
+        # Fonctions appelées quand des fenêtres sont ajoutées, supprimées ou modifiées
+        self._window_listeners = []
+
+        # Groupes de fenêtres et leurs capteurs par (sorte, valeur) ; tous les
+        # groupes sont notifiés à la prochaine évaluation tant qu'ils sont périmés
+        self.groups = WindowGroups(self.windows)
+        self._group_sensors = {}
+        self._groups_stale = True
+
+        # Mesures du temps d'évaluation par réveil
+        self.evaluation_count = 0
+        self.last_evaluation_duration = None
+        self.max_evaluation_duration = 0.0
+        self.total_evaluation_duration = 0.0
+        # Histogramme des durées (ms), une case de plus pour les dépassements
+        self.evaluation_histogram = [0] * (len(EVALUATION_HISTOGRAM_BUCKETS) + 1)
+        # Écritures d'état émises et évitées faute de changement
+        self.writes_issued = 0
+        self.writes_suppressed = 0
+        # Budget de latence en ms au-delà duquel une évaluation est signalée (0 : désactivé)
+        self.latency_budget = config.get(CONF_LATENCY_BUDGET, DEFAULT_LATENCY_BUDGET)
+
+    @callback
+    def async_register(self, sensor):
+        """
+        Enregistrer un capteur et lui pousser son état initial.
+        Retourne la fonction de désenregistrement.
+        """
+        name = sensor.window_name
+        self._sensors[name] = sensor
+
+        index = self.batch.index[name]
+        self._codes[index] = -1
+        if self._evaluation is None:
+            # Premier capteur : évaluer maintenant puis planifier les bascules
+            self.async_refresh()
+            self._async_start_planning()
+            if self.attribute_refresh:
+                self._unsub_refresh = async_track_time_interval(
+                    self.hass,
+                    self._handle_attribute_refresh,
+                    timedelta(minutes=self.attribute_refresh),
+                )
+        else:
+            self._async_push(index)
+
+        @callback
+        def _unregister():
+            self._sensors.pop(name, None)
+            # L'index a pu changer depuis, si la configuration a été modifiée
+            if name in self.batch.index:
+                self._codes[self.batch.index[name]] = -1
+            if not self._sensors:
+                self._async_stop()
+
+        return _unregister
+
+    @callback
+    def async_add_window_listener(self, update_callback):
+        """
+        Enregistrer une fonction appelée avec les fenêtres ajoutées, les noms des
+        fenêtres supprimées et les fenêtres modifiées lors d'un changement de
+        configuration. Retourne la fonction de désenregistrement.
+        """
+        self._window_listeners.append(update_callback)
+
+        @callback
+        def _remove():
+            self._window_listeners.remove(update_callback)
+
+        return _remove
+
+    @callback
+    def async_update_config(self, config, horizon_table, site=None):
+        """
+        Appliquer une nouvelle configuration sans recharger l'entrée. Un site
+        n'est donné que si le lieu de l'entrée a changé.
+
+        Seul ce qui a changé est reconstruit : le profil compilé et les bandes
+        mortes sont remplacés dans le lot, qui n'est reconstruit que si des
+        fenêtres changent (les masques inchangés sont repris du cache). L'état
+        publié de chaque fenêtre est conservé par nom ; les fenêtres modifiées
+        sont notifiées à nouveau, et les capteurs des fenêtres ajoutées ou
+        supprimées sont créés ou retirés par les plateformes.
+        """
+        old_windows = {window[CONF_NAME]: window for window in self.windows}
+        new_windows = {window[CONF_NAME]: window for window in config[CONF_WINDOWS]}
+        added = [window for name, window in new_windows.items() if name not in old_windows]
+        removed = [name for name in old_windows if name not in new_windows]
+        changed = [
+            window for name, window in new_windows.items()
+            if name in old_windows and old_windows[name] != window
+        ]
+
+        self.config = config
+        self.windows = config[CONF_WINDOWS]
+        self.horizon_table = horizon_table
+        elevation_deadband = config.get(CONF_ELEVATION_DEADBAND, DEFAULT_ELEVATION_DEADBAND)
+        azimuth_deadband = config.get(CONF_AZIMUTH_DEADBAND, DEFAULT_AZIMUTH_DEADBAND)
+
+        if added or removed or changed or [w[CONF_NAME] for w in self.windows] != self.batch.names:
+            self._async_rebuild_batch(
+                WindowBatch(self.windows, horizon_table, elevation_deadband, azimuth_deadband),
+                {window[CONF_NAME] for window in changed},
+            )
+        else:
+            self.batch.horizon_table = horizon_table
+            self.batch.elevation_deadband = float(elevation_deadband)
+            self.batch.azimuth_deadband = float(azimuth_deadband)
+
+        self.site_elevation = entry_location(self.hass, config)[2]
+        if site is not None and site is not self.site:
+            self.site = site
+            self.ephemeris = site.ephemeris
+            # Le minuteur des mesures est celui du site
+            if self._unsub_measurements is not None:
+                self._unsub_measurements()
+                self._unsub_measurements = None
+        self._async_arm_measurements()
+
+        self.schedule_hash = schedule_hash(config, self.site)
+
+        self.min_dwell = config.get(CONF_MIN_DWELL, DEFAULT_MIN_DWELL)
+        self.latency_budget = config.get(CONF_LATENCY_BUDGET, DEFAULT_LATENCY_BUDGET)
+        write_mode = config.get(CONF_WRITE_MODE, DEFAULT_WRITE_MODE)
+        if write_mode != self.write_mode:
+            # Les codes comparés changent de nature : tout notifier à nouveau
+            self.write_mode = write_mode
+            self._codes[:] = -1
+        attribute_refresh = config.get(CONF_ATTRIBUTE_REFRESH, DEFAULT_ATTRIBUTE_REFRESH)
+        if attribute_refresh != self.attribute_refresh:
+            self.attribute_refresh = attribute_refresh
+            if self._unsub_refresh is not None:
+                self._unsub_refresh()
+                self._unsub_refresh = None
+            if attribute_refresh and self._evaluation is not None:
+                self._unsub_refresh = async_track_time_interval(
+                    self.hass,
+                    self._handle_attribute_refresh,
+                    timedelta(minutes=attribute_refresh),
+                )
+
+        # Les plateformes ajoutent ou retirent les capteurs avant la réévaluation
+        for update_callback in list(self._window_listeners):
+            update_callback(added, removed, changed)
+
+        # Réévaluer maintenant, puis replanifier les bascules et la prévision
+        if self._evaluation is not None:
+            self.async_refresh()
+            if self._plan_task is not None:
+                self._plan_task.cancel()
+                self._plan_task = None
+            self._async_start_planning()
+        if self._unsub_forecast_timer is not None:
+            if self._forecast_task is not None:
+                self._forecast_task.cancel()
+                self._forecast_task = None
+            self._handle_forecast_timer(dt_util.now())
+
+        _LOGGER.debug(
+            "Configuration appliquée : %d fenêtres ajoutées, %d supprimées, %d modifiées",
+            len(added), len(removed), len(changed),
+        )
+
+    def _async_rebuild_batch(self, batch, changed):
+        """Remplacer le lot en reportant par nom l'état publié de chaque fenêtre."""
+        previous = np.array([self.batch.index.get(name, -1) for name in batch.names], dtype=np.intp)
+        kept = previous >= 0
+        # Une fenêtre modifiée garde son état pour l'hystérésis, mais sera notifiée à nouveau
+        unchanged = kept & np.array([name not in changed for name in batch.names], dtype=bool)
+
+        def carry(values, fill, mask):
+            carried = np.full(len(batch), fill, dtype=values.dtype)
+            carried[mask] = values[previous[mask]]
+            return carried
+
+        self._codes = carry(self._codes, -1, unchanged)
+        self._last_change = carry(self._last_change, -np.inf, unchanged)
+        if self._states is not None:
+            self._states = carry(self._states, False, kept)
+        self._measurements = {
+            measurement: carry(values, -1.0, unchanged)
+            for measurement, values in self._measurements.items()
+        }
+        self._total_heat_gain = None
+        self._measurement_values = None
+        self.batch = batch
+
+        # Les groupes sont relevés à nouveau et les bascules prévues, indexées
+        # sur l'ancien lot, sont oubliées jusqu'à la replanification
+        self.groups = WindowGroups(self.windows)
+        self._groups_stale = True
+        self._transition_times = np.empty(0)
+        self._transition_windows = np.empty(0, dtype=np.intp)
+
+    @callback
+    def async_register_measurement(self, sensor):
+        """
+        Enregistrer un capteur de mesure (part éclairée, apports solaires) et lui
+        pousser sa valeur initiale. Un capteur sans fenêtre reçoit le total de
+        l'entrée. Retourne la fonction de désenregistrement.
+        """
+        key = (sensor.measurement, sensor.window_name)
+        if key not in self._measurement_sensors and sensor.measurement == MEASUREMENT_HEAT_GAIN:
+            self._heat_gain_sensor_count += 1
+        self._measurement_sensors[key] = sensor
+        if sensor.window_name is None:
+            self._total_heat_gain = None
+        else:
+            self._measurements[sensor.measurement][self.batch.index[sensor.window_name]] = -1
+        self._async_arm_measurements()
+        if self._measurement_values is None:
+            self._handle_measurement_refresh(dt_util.utcnow(), force=True)
+        else:
+            # Valeurs déjà calculées pour les autres capteurs : ne pousser que
+            # celle-ci, pour que l'ajout de milliers de capteurs reste linéaire
+            self._async_push_measurement(key)
+
+        @callback
+        def _unregister():
+            removed = self._measurement_sensors.pop(key, None)
+            if removed is not None and removed.measurement == MEASUREMENT_HEAT_GAIN:
+                self._heat_gain_sensor_count -= 1
+            self._async_arm_measurements()
+
+        return _unregister
+
+    @callback
+    def _async_arm_measurements(self):
+        """
+        Suivre le minuteur du site tant que des mesures varient entre deux
+        bascules : apports solaires, ou part éclairée d'une fenêtre protégée.
+        Sinon la part éclairée vaut 0 ou 100 % et n'est publiée qu'aux bascules.
+        """
+        needed = bool(self._measurement_sensors) and (
+            self._heat_gain_sensor_count > 0 or bool(self.batch.geometry.protected.any())
+        )
+        if needed and self._unsub_measurements is None:
+            self._unsub_measurements = self.site.async_add_tick_listener(
+                self._handle_measurement_refresh
+            )
+        elif not needed and self._unsub_measurements is not None:
+            self._unsub_measurements()
+            self._unsub_measurements = None
+
+    @callback
+    def _async_push_measurement(self, key):
+        """Pousser à un capteur de mesure la dernière valeur calculée."""
+        measurement, name = key
+        sensor = self._measurement_sensors[key]
+        if name is None:
+            self._total_heat_gain = self._measurement_total
+            sensor.async_update_measurement(self._measurement_total)
+            return
+
+        index = self.batch.index[name]
+        value = self._measurements[measurement][index] = self._measurement_values[measurement][index]
+        sensor.async_update_measurement(int(value))
+
+    @callback
+    def _handle_measurement_refresh(self, now: datetime, force=False):
+        """Recalculer les mesures, sauf de nuit quand toutes sont déjà nulles."""
+        # Position à la minute, lue dans le cache commun à toutes les entrées
+        azimuth, elevation = self.ephemeris.position(now)
+        if (
+            not force
+            and elevation <= 0
+            and not self._total_heat_gain
+            and all((values <= 0).all() for values in self._measurements.values())
+        ):
+            return
+        if self._evaluation is None:
+            is_on = self.batch.evaluate(azimuth, elevation).is_on
+        else:
+            is_on = self._states
+        self._async_update_measurements(azimuth, elevation, is_on)
+
+    @callback
+    def _async_update_measurements(self, azimuth, elevation, is_on):
+        """Publier les mesures des fenêtres dont la valeur arrondie a changé."""
+        if not self._measurement_sensors:
+            return
+
+        # Un seul passage vectorisé pour toutes les fenêtres de l'entrée
+        sunlit = self.batch.sunlit_fraction(azimuth, elevation, is_on)
+        heat_gain = self.batch.heat_gain(
+            azimuth, elevation, is_on, self.site_elevation, sunlit
+        )
+        values = {
+            MEASUREMENT_SUNLIT: np.round(sunlit * 100),
+            MEASUREMENT_HEAT_GAIN: np.round(heat_gain),
+        }
+        total = int(values[MEASUREMENT_HEAT_GAIN].sum())
+        self._measurement_values = values
+        self._measurement_total = total
+
+        issued = 0
+        for measurement, current in values.items():
+            published = self._measurements[measurement]
+            for index in np.flatnonzero(current != published):
+                sensor = self._measurement_sensors.get((measurement, self.batch.names[index]))
+                if sensor is not None:
+                    published[index] = current[index]
+                    sensor.async_update_measurement(int(current[index]))
+                    issued += 1
+
+        sensor = self._measurement_sensors.get((MEASUREMENT_HEAT_GAIN, None))
+        if sensor is not None and total != self._total_heat_gain:
+            self._total_heat_gain = total
+            sensor.async_update_measurement(total)
+            issued += 1
+
+        self.writes_issued += issued
+        self.writes_suppressed += len(self._measurement_sensors) - issued
+
+    @callback
+    def async_register_group(self, sensor):
+        """
+        Enregistrer un capteur de groupe de fenêtres et lui pousser son état,
+        s'il est déjà connu. Retourne la fonction de désenregistrement.
+        """
+        key = sensor.group_key
+        self._group_sensors.setdefault(key, []).append(sensor)
+        if self._states is not None and not self._groups_stale and key in self.groups.index:
+            sensor.async_update_group(self.groups.state(self.groups.index[key]))
+
+        @callback
+        def _unregister():
+            sensors = self._group_sensors.get(key, [])
+            if sensor in sensors:
+                sensors.remove(sensor)
+            if not sensors:
+                self._group_sensors.pop(key, None)
+
+        return _unregister
+
+    @callback
+    def _async_update_groups(self, now: datetime):
+        """
+        Reporter dans les groupes les bascules de l'état publié et la prochaine
+        bascule prévue, puis notifier les capteurs des seuls groupes modifiés.
+        """
+        if not len(self.groups) or self._states is None:
+            return
+
+        changed = self.groups.update(self._states)
+        changed |= self.groups.advance(now.timestamp())
+        if self._groups_stale:
+            self._groups_stale = False
+            changed = range(len(self.groups))
+
+        for group in changed:
+            sensors = self._group_sensors.get(self.groups.keys[group])
+            if sensors:
+                state = self.groups.state(group)
+                for sensor in sensors:
+                    sensor.async_update_group(state)
+
+    @callback
+    def _async_start_planning(self):
+        """Lancer le calcul des prochaines bascules hors de la boucle d'événements."""
+        if self._plan_task is None:
+            self._plan_task = self.hass.async_create_task(self._async_plan())
+
+    async def _async_plan(self):
+        """Prédire les bascules sur la prochaine période et armer le minuteur."""
+        start = dt_util.utcnow()
+        end = start + TRANSITION_PLAN_HORIZON
+        transitions = self._cached_transitions(start, end)
+        if transitions is None:
+            transitions = await self.hass.async_add_executor_job(
+                find_transitions,
+                self.batch,
+                self.ephemeris,
+                start.timestamp(),
+                end.timestamp(),
+                None if self._states is None else self._states.copy(),
+            )
+        self._plan_task = None
+        if not self._sensors:
+            return
+
+        times, windows = transitions[0], transitions[1]
+        order = np.argsort(times, kind="stable")
+        self._transition_times = times[order]
+        self._transition_windows = windows[order]
+        self.groups.set_plan(self._transition_times, self._transition_windows)
+        self._plan_end = end
+        _LOGGER.debug(
+            "%d bascules prévues d'ici %s", len(self._transition_times), end.isoformat()
+        )
+        self._async_schedule_next(start)
+
+    def _cached_transitions(self, start: datetime, end: datetime):
+        """
+        Bascules de la période tirées des journées en cache (aujourd'hui et
+        demain), sans calcul, et leurs fenêtres. Les bornes des intervalles sont
+        les bascules sans hystérésis : avec une bande morte, ou si une journée
+        manque, retourne None.
+        """
+        if self._registry is None or self.batch.has_deadband:
+            return None
+        today = dt_util.as_local(start).date()
+        days = local_days(today, today + timedelta(days=1))
+        packed_days = self._registry.async_cached_schedule_days(self.schedule_hash, days)
+        if len(packed_days) < len(days):
+            return None
+
+        times = np.concatenate([bounds.ravel() for _, bounds in packed_days])
+        # Deux bornes par intervalle, rangés fenêtre par fenêtre
+        windows = np.concatenate([
+            np.repeat(np.arange(len(offsets) - 1), 2 * np.diff(offsets))
+            for offsets, _ in packed_days
+        ])
+        # Les bornes à minuit ne sont que la coupure des journées
+        midnights = [day_start for _, day_start, _ in days] + [days[-1][2]]
+        kept = (
+            (times > start.timestamp())
+            & (times <= end.timestamp())
+            & ~np.isin(times, midnights)
+        )
+        return times[kept], windows[kept]
+
+    @callback
+    def _async_schedule_next(self, now: datetime):
+        """Armer l'unique minuteur sur la prochaine bascule prévue."""
+        if self._unsub_timer is not None:
+            self._unsub_timer()
+            self._unsub_timer = None
+
+        # Ignorer les bascules déjà passées
+        position = np.searchsorted(self._transition_times, now.timestamp(), side="right")
+        self._transition_times = self._transition_times[position:]
+        self._transition_windows = self._transition_windows[position:]
+        # Prochaine bascule des groupes, recherchée à nouveau après une replanification
+        self._async_update_groups(now)
+
+        next_time = self._plan_end.timestamp()
+        if len(self._transition_times):
+            next_time = min(next_time, float(self._transition_times[0]))
+        # Réveil à la fin d'une durée minimale qui retient une bascule
+        if self._dwell_until is not None:
+            next_time = min(next_time, self._dwell_until)
+        self.next_wakeup = dt_util.utc_from_timestamp(next_time)
+
+        self._unsub_timer = async_track_point_in_utc_time(
+            self.hass, self._handle_timer, self.next_wakeup
+        )
+
+    @callback
+    def _handle_timer(self, now: datetime):
+        """Réveil à l'instant exact d'une bascule ou en fin de période planifiée."""
+        self._unsub_timer = None
+        # Fenêtres dont une bascule prévue vient de passer, avant la réévaluation
+        position = np.searchsorted(self._transition_times, now.timestamp(), side="right")
+        fired = {self.batch.names[index] for index in self._transition_windows[:position].tolist()}
+        self.async_refresh(now)
+        # Les prochains début et fin de soleil ne changent qu'aux bornes de leur fenêtre
+        self._async_notify_forecast(fired | self._passed_forecast_windows(now))
+        # Une bascule retenue invalide les prévisions qui la supposaient faite
+        if now >= self._plan_end or self._dwell_until is not None:
+            self._async_start_planning()
+        else:
+            self._async_schedule_next(now)
+
+    @callback
+    def _handle_attribute_refresh(self, now: datetime):
+        """Rafraîchir les attributs de tous les capteurs à intervalle régulier."""
+        self.async_refresh(now, force=True)
+
+    @callback
+    def _async_stop(self):
+        """Arrêter le minuteur et la planification en cours."""
+        if self._unsub_timer is not None:
+            self._unsub_timer()
+            self._unsub_timer = None
+        if self._unsub_refresh is not None:
+            self._unsub_refresh()
+            self._unsub_refresh = None
+        if self._plan_task is not None:
+            self._plan_task.cancel()
+            self._plan_task = None
+        self._evaluation = None
+        self.next_wakeup = None
+
+    @callback
+    def async_start_forecast(self):
+        """Calculer la prévision maintenant puis chaque jour à minuit."""
+        self._unsub_forecast_timer = async_track_time_change(
+            self.hass, self._handle_forecast_timer, hour=0, minute=0, second=0
+        )
+        self._handle_forecast_timer(dt_util.now())
+
+    @callback
+    def async_stop_forecast(self):
+        """Arrêter le recalcul quotidien de la prévision."""
+        if self._unsub_forecast_timer is not None:
+            self._unsub_forecast_timer()
+            self._unsub_forecast_timer = None
+        if self._forecast_task is not None:
+            self._forecast_task.cancel()
+            self._forecast_task = None
+
+    @callback
+    def _handle_forecast_timer(self, now: datetime):
+        """Lancer le calcul de la prévision hors de la boucle d'événements."""
+        if self._forecast_task is None:
+            self._forecast_task = self.hass.async_create_task(
+                self._async_update_forecast(dt_util.start_of_local_day(now))
+            )
+
+    async def _async_update_forecast(self, day_start: datetime):
+        """Calculer la prévision à partir du début du jour et notifier les capteurs."""
+        batch = self.batch
+        if self._registry is None:
+            intervals = await self.hass.async_add_executor_job(
+                compute_forecast, batch, self.ephemeris, day_start.timestamp()
+            )
+        else:
+            # Journée par journée, reprises du cache quand elles y sont déjà
+            first = day_start.date()
+            packed_days = await self._registry.async_get_schedule_days(
+                self.schedule_hash,
+                batch,
+                self.ephemeris,
+                local_days(first, first + timedelta(days=FORECAST_DAYS - 1)),
+            )
+            intervals = merge_packed(packed_days, range(len(batch)))
+        self._forecast_task = None
+        self._set_forecast(batch, intervals)
+        self._async_notify_forecast()
+
+    @callback
+    def async_restore_forecast(self):
+        """
+        Reprendre sans calcul la prévision des journées déjà en cache, avant
+        l'ajout des capteurs : ils ont ainsi une valeur dès le démarrage.
+        """
+        if self._registry is None:
+            return
+        today = dt_util.now().date()
+        packed_days = self._registry.async_cached_schedule_days(
+            self.schedule_hash, local_days(today, today + timedelta(days=FORECAST_DAYS - 1))
+        )
+        if packed_days:
+            self._set_forecast(self.batch, merge_packed(packed_days, range(len(self.batch))))
+
+    def _set_forecast(self, batch, intervals):
+        """
+        Ranger par fenêtre les intervalles prévus, en dates UTC, et toutes
+        leurs bornes dans l'ordre du temps.
+        """
+        self.forecast = {
+            name: [
+                (dt_util.utc_from_timestamp(start), dt_util.utc_from_timestamp(end))
+                for start, end in window_intervals
+            ]
+            for name, window_intervals in zip(batch.names, intervals)
+        }
+        times = np.array(
+            [
+                bound
+                for window_intervals in intervals
+                for interval in window_intervals
+                for bound in interval
+            ],
+            dtype=float,
+        )
+        windows = np.repeat(
+            np.arange(len(batch.names)),
+            [2 * len(window_intervals) for window_intervals in intervals],
+        )
+        order = np.argsort(times, kind="stable")
+        self._forecast_times = times[order]
+        self._forecast_windows = [batch.names[index] for index in windows[order].tolist()]
+        self._forecast_checked = dt_util.utcnow().timestamp()
+
+    def _passed_forecast_windows(self, now: datetime):
+        """
+        Fenêtres dont une borne prévue est passée depuis la dernière notification.
+        Une borne qui suit de peu la bascule prévue est ainsi reprise au réveil suivant.
+        """
+        timestamp = now.timestamp()
+        start, end = np.searchsorted(
+            self._forecast_times, [self._forecast_checked, timestamp], side="right"
+        )
+        self._forecast_checked = max(self._forecast_checked, timestamp)
+        return set(self._forecast_windows[start:end])
+
+    @callback
+    def async_add_forecast_listener(self, name, update_callback):
+        """
+        Enregistrer une fonction appelée quand la prévision ou les prochaines
+        bascules de la fenêtre changent. Retourne la fonction de désenregistrement.
+        """
+        self._forecast_listeners.setdefault(name, []).append(update_callback)
+
+        @callback
+        def _remove():
+            callbacks = self._forecast_listeners[name]
+            callbacks.remove(update_callback)
+            if not callbacks:
+                del self._forecast_listeners[name]
+
+        return _remove
+
+    @callback
+    def _async_notify_forecast(self, names=None):
+        """Notifier les capteurs de prévision des fenêtres données, ou de toutes."""
+        if names is None:
+            names = list(self._forecast_listeners)
+        for name in names:
+            for update_callback in list(self._forecast_listeners.get(name, ())):
+                update_callback()
+
+    @callback
+    def async_refresh(self, now=None, force=False):
+        """
+        Évaluer toutes les fenêtres pour la position du soleil à un instant donné.
+        Avec force, tous les capteurs sont notifiés, même sans changement.
+        """
+        started = time.perf_counter()
+
+        # Position exacte du soleil, partagée par les entrées réveillées au même instant
+        now = now or dt_util.utcnow()
+        azimuth, elevation = self.site.position(now.timestamp())
+        self.azimuth = round(float(azimuth), 2)
+        self.elevation = round(float(elevation), 2)
+
+        evaluation = self.batch.evaluate(azimuth, elevation, self._states)
+        self._evaluation = self._apply_min_dwell(evaluation, now.timestamp())
+        horizon_elevation = float(self._evaluation.horizon_elevation)
+        self.horizon_elevation = None if math.isnan(horizon_elevation) else horizon_elevation
+
+        # Notifier uniquement les fenêtres dont l'état (ou les raisons) a changé
+        codes = self._current_codes = self._state_codes()
+        notify = np.ones(len(codes), dtype=bool) if force else codes != self._codes
+        issued = sum(self._async_push(index, codes[index]) for index in np.flatnonzero(notify))
+        self.writes_issued += issued
+        self.writes_suppressed += len(self._sensors) - issued
+        self._async_update_measurements(azimuth, elevation, self._states)
+        self._async_update_groups(now)
+
+        duration = time.perf_counter() - started
+        self.evaluation_count += 1
+        self.last_evaluation_duration = duration
+        self.total_evaluation_duration += duration
+        self.max_evaluation_duration = max(self.max_evaluation_duration, duration)
+        self.evaluation_histogram[
+            bisect_left(EVALUATION_HISTOGRAM_BUCKETS, duration * 1000)
+        ] += 1
+        if self.latency_budget and duration * 1000 > self.latency_budget:
+            _LOGGER.warning(
+                "Évaluation de %d fenêtres en %.3f ms, au-delà du budget de %.3f ms",
+                len(self.batch), duration * 1000, self.latency_budget,
+            )
+        else:
+            _LOGGER.debug(
+                "%d fenêtres évaluées en %.3f ms", len(self.batch), duration * 1000
+            )
+
+    def _async_push(self, index, code=None):
+        """
+        Notifier le capteur d'une fenêtre de son nouvel état.
+        Retourne False si la fenêtre n'a pas de capteur enregistré.
+        """
+        sensor = self._sensors.get(self.batch.names[index])
+        if sensor is None:
+            return False
+
+        self._codes[index] = self._current_codes[index] if code is None else code
+        sensor.async_update_from_result(
+            self._evaluation.result(index),
+            self.azimuth,
+            self.elevation,
+            self.horizon_elevation,
+        )
+        return True
+
+    def _apply_min_dwell(self, evaluation, now):
+        """Retenir les bascules trop proches de la précédente bascule de la fenêtre."""
+        is_on = evaluation.is_on
+        self._dwell_until = None
+        if self._states is not None:
+            changed = is_on != self._states
+            blocked = changed & (now - self._last_change < self.min_dwell)
+            if blocked.any():
+                is_on = np.where(blocked, self._states, is_on)
+                evaluation = evaluation._replace(is_on=is_on)
+                self._dwell_until = float((self._last_change[blocked] + self.min_dwell).min())
+            self._last_change[changed & ~blocked] = now
+
+        self._states = np.array(is_on, dtype=bool)
+        return evaluation
+
+    def _state_codes(self):
+        """Codes comparés pour décider de notifier un capteur, selon le mode d'écriture."""
+        if self.write_mode == WRITE_MODE_TRANSITIONS:
+            return self._evaluation.is_on * CODE_IS_ON
+        return self._evaluation.codes()
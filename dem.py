@@ -0,0 +1,164 @@
+"""Calcul du profil d'horizon à partir d'un modèle numérique de terrain local."""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .const import CONF_AZIMUTH, CONF_ELEVATION
+from .horizon_import import simplify_profile
+
+# Rayon terrestre et coefficient de réfraction pour la courbure apparente
+EARTH_RADIUS = 6371000.0
+REFRACTION_COEFFICIENT = 0.13
+
+# Nombre d'azimuts lancés ensemble dans un même calcul vectorisé
+AZIMUTH_CHUNK = 32
+
+
+class DemError(Exception):
+    """Erreur de lecture d'un modèle numérique de terrain."""
+
+
+class DemGrid:
+    """
+    Grille d'altitudes projetée en mètres, ouverte en mémoire mappée.
+
+    La grille est décrite par un en-tête ESRI (.hdr) à côté du fichier de
+    données : ncols, nrows, xllcorner, yllcorner, cellsize, et en option
+    nodata_value et byteorder. Les données sont un raster binaire float32
+    (.flt, .bil) ou un tableau NumPy (.npy). La ligne 0 est au nord.
+    La grille n'est jamais chargée entièrement en mémoire.
+    """
+
+    def __init__(self, path):
+        """Ouvrir la grille et son en-tête."""
+        header = _read_header(os.path.splitext(path)[0] + ".hdr")
+        try:
+            columns = int(header["ncols"])
+            rows = int(header["nrows"])
+            self.cell_size = float(header["cellsize"])
+            self.left = float(header.get("xllcorner", header.get("xllcenter", 0)))
+            self.top = float(header.get("yllcorner", header.get("yllcenter", 0))) + rows * self.cell_size
+        except (KeyError, ValueError) as err:
+            raise DemError(f"En-tête incomplet : {err}") from err
+        self.nodata = float(header.get("nodata_value", np.nan))
+
+        if path.lower().endswith(".npy"):
+            self.data = np.load(path, mmap_mode="r")
+        else:
+            byteorder = ">" if header.get("byteorder", "lsbfirst").lower() == "msbfirst" else "<"
+            self.data = np.memmap(path, dtype=f"{byteorder}f4", mode="r", shape=(rows, columns))
+
+        if self.data.shape != (rows, columns):
+            raise DemError(f"Dimensions {self.data.shape} différentes de l'en-tête ({rows}, {columns})")
+
+    def altitudes(self, x, y):
+        """Altitudes aux points (x, y), NaN hors de la grille ou sans donnée."""
+        columns = np.floor((x - self.left) / self.cell_size).astype(np.intp)
+        rows = np.floor((self.top - y) / self.cell_size).astype(np.intp)
+        inside = (
+            (rows >= 0) & (rows < self.data.shape[0])
+            & (columns >= 0) & (columns < self.data.shape[1])
+        )
+
+        altitudes = np.full(np.shape(x), np.nan)
+        altitudes[inside] = self.data[rows[inside], columns[inside]]
+        altitudes[altitudes == self.nodata] = np.nan
+        return altitudes
+
+
+def _read_header(path):
+    """Lit un en-tête ESRI (clé valeur par ligne)."""
+    try:
+        with open(path, encoding="utf-8") as file:
+            return {
+                key.lower(): value
+                for key, value in (line.split(None, 1) for line in file if line.strip())
+            }
+    except OSError as err:
+        raise DemError(f"En-tête introuvable : {path}") from err
+
+
+def _cast_sector(path, x, y, height, azimuths, max_distance):
+    """
+    Lance les rayons d'un secteur d'azimuts et retourne l'élévation de l'horizon.
+    Exécuté dans un processus de calcul, qui ouvre sa propre vue de la grille.
+    """
+    grid = DemGrid(path)
+    observer = grid.altitudes(np.array([x]), np.array([y]))[0]
+    if np.isnan(observer):
+        raise DemError("L'observateur est hors de la grille")
+    eye = observer + height
+
+    # Un échantillon par cellule le long du rayon
+    distances = np.arange(1, int(max_distance / grid.cell_size) + 1) * grid.cell_size
+    drop = distances**2 / (2 * EARTH_RADIUS) * (1 - REFRACTION_COEFFICIENT)
+
+    elevations = np.empty(len(azimuths))
+    for first in range(0, len(azimuths), AZIMUTH_CHUNK):
+        chunk = np.radians(azimuths[first:first + AZIMUTH_CHUNK])[:, None]
+        altitudes = grid.altitudes(
+            x + distances * np.sin(chunk), y + distances * np.cos(chunk)
+        )
+        angles = np.degrees(np.arctan2(altitudes - eye - drop, distances))
+        # Sans relief visible sur le rayon, l'horizon est à 0°
+        elevations[first:first + AZIMUTH_CHUNK] = np.nan_to_num(
+            np.nanmax(np.where(np.isnan(angles), -np.inf, angles), axis=1),
+            neginf=0.0,
+        )
+    return elevations
+
+
+def compute_horizon(
+    path,
+    x,
+    y,
+    height=0.0,
+    resolution=1.0,
+    max_distance=None,
+    max_error=0.0,
+    workers=None,
+):
+    """
+    Calcule le profil d'horizon d'un observateur par lancer de rayons sur la grille.
+
+    x et y sont les coordonnées de l'observateur dans la projection de la
+    grille, height sa hauteur au-dessus du sol (mètres). Les azimuts sont
+    répartis par secteurs entre les processus d'un pool, ou calculés sur
+    place avec un seul processus de calcul. Retourne le profil au
+    format de la configuration, simplifié si max_error (degrés) est positif.
+    Doit être appelé hors de la boucle d'événements.
+    """
+    grid = DemGrid(path)
+    if max_distance is None:
+        # Jusqu'au bord le plus éloigné de la grille
+        max_distance = float(np.hypot(*grid.data.shape)) * grid.cell_size
+    del grid
+
+    azimuths = np.arange(0, 360, resolution)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        # Un pool d'un seul processus n'ajouterait que son démarrage
+        elevations = _cast_sector(path, x, y, height, azimuths, max_distance)
+    else:
+        sectors = np.array_split(azimuths, workers * 4)
+        # Processus démarrés à neuf : l'appelant peut être multithreadé
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            elevations = np.concatenate(list(pool.map(
+                _cast_sector,
+                *zip(*((path, x, y, height, sector, max_distance) for sector in sectors)),
+            )))
+
+    elevations = np.round(elevations, 2)
+    if max_error > 0:
+        keep = simplify_profile(azimuths, elevations, max_error)
+        azimuths = azimuths[keep]
+        elevations = elevations[keep]
+
+    return [
+        {CONF_AZIMUTH: round(azimuth, 3), CONF_ELEVATION: elevation}
+        for azimuth, elevation in zip(azimuths.tolist(), elevations.tolist())
+    ]
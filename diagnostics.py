@@ -0,0 +1,92 @@
+"""Diagnostics pour le composant Sun on Window."""
+from typing import Any, Dict
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import (
+    DOMAIN,
+    CONF_HORIZON_PROFILE,
+    CONF_HORIZON_CHECKSUM,
+    CONF_WINDOWS,
+    EVALUATION_HISTOGRAM_BUCKETS,
+)
+from .ephemeris import POSITION_CACHE
+from .irradiance import irradiance_cache_info
+from .obstruction import mask_cache_info
+from .registry import async_get_registry
+
+
+def _cache_info(info):
+    """Succès, échecs et taux de succès d'un cache, statistiques au format de lru_cache."""
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "hit_rate": round(info.hits / lookups, 4) if lookups else None,
+        "size": info.currsize,
+        "max_size": info.maxsize,
+    }
+
+
+def _performance(coordinator, registry):
+    """Mesures d'exécution du coordinateur d'une entrée."""
+    count = coordinator.evaluation_count
+    table = coordinator.horizon_table
+    site = coordinator.site
+    buckets = [f"<= {bound} ms" for bound in EVALUATION_HISTOGRAM_BUCKETS]
+    buckets.append(f"> {EVALUATION_HISTOGRAM_BUCKETS[-1]} ms")
+
+    return {
+        "evaluation_count": count,
+        "window_count": len(coordinator.batch),
+        "last_evaluation_ms": (
+            None if coordinator.last_evaluation_duration is None
+            else round(coordinator.last_evaluation_duration * 1000, 3)
+        ),
+        "mean_evaluation_ms": (
+            round(coordinator.total_evaluation_duration / count * 1000, 3) if count else None
+        ),
+        "max_evaluation_ms": round(coordinator.max_evaluation_duration * 1000, 3),
+        "evaluation_histogram": dict(zip(buckets, coordinator.evaluation_histogram)),
+        "latency_budget_ms": coordinator.latency_budget,
+        "writes_issued": coordinator.writes_issued,
+        "writes_suppressed": coordinator.writes_suppressed,
+        "horizon_table": None if table is None else {
+            "points": len(table),
+            "bins": table.bin_count,
+            # Part des recherches résolues directement par la case, sans avancée de segment
+            "direct_bin_rate": round(table.direct_bin_rate, 4),
+            "compiled_bytes": table.compiled_size,
+            # Entrées qui partagent cette même table compilée
+            "shared_by": registry.horizon_references(coordinator.config.get(CONF_HORIZON_CHECKSUM)),
+        },
+        "shading_mask_bytes": int(coordinator.batch.masks.masks.nbytes),
+        "group_count": len(coordinator.groups),
+        "sun_samples": {
+            "computed": site.samples_computed,
+            "shared": site.samples_shared,
+            "shared_by": registry.site_references(site),
+        },
+        "caches": {
+            "sun_position": _cache_info(POSITION_CACHE.cache_info()),
+            "shading_mask": _cache_info(mask_cache_info()),
+            "clear_sky_irradiance": _cache_info(irradiance_cache_info()),
+        },
+    }
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> Dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+
+    # Le profil d'horizon est exposé ici, une seule fois par entrée,
+    # plutôt que dans les attributs de chaque capteur
+    table = coordinator.horizon_table
+    return {
+        CONF_HORIZON_PROFILE: [] if table is None else table.profile(),
+        CONF_WINDOWS: coordinator.windows,
+        "performance": _performance(coordinator, async_get_registry(hass)),
+    }
@@ -0,0 +1,294 @@
+"""Évaluation vectorisée de toutes les fenêtres d'une entrée de configuration."""
+from typing import NamedTuple
+
+import numpy as np
+
+from .const import (
+    CONF_START_AZIMUTH,
+    CONF_END_AZIMUTH,
+    CONF_MAX_ELEVATION,
+    CONF_NAME,
+    CONF_TILT,
+    CONF_MAX_INCIDENCE,
+    DEFAULT_MAX_INCIDENCE,
+    CONF_G_VALUE,
+    DEFAULT_G_VALUE,
+)
+from .irradiance import GROUND_ALBEDO, clear_sky_irradiance, glazing_area
+from .obstruction import MaskSet, ShadingGeometry
+
+# Codes d'état compacts par fenêtre, utilisés pour détecter les changements
+CODE_WITHIN_INCIDENCE = 64
+CODE_NOT_OBSTRUCTED = 32
+CODE_IS_ON = 16
+CODE_SUN_UP = 8
+CODE_IN_AZIMUTH_RANGE = 4
+CODE_BELOW_MAX_ELEVATION = 2
+CODE_ABOVE_HORIZON = 1
+
+
+class WindowEvaluation(NamedTuple):
+    """
+    Résultat d'une évaluation par lot.
+
+    Les masques ont la forme (positions..., fenêtres) ; l'élévation de
+    l'horizon a la forme des positions du soleil (NaN sans profil).
+    """
+
+    is_on: np.ndarray
+    sun_up: np.ndarray
+    in_azimuth_range: np.ndarray
+    below_max_elevation: np.ndarray
+    above_horizon: np.ndarray
+    not_obstructed: np.ndarray
+    within_incidence: np.ndarray
+    horizon_elevation: np.ndarray
+
+    def codes(self):
+        """Retourne un code entier par fenêtre résumant l'état et ses raisons."""
+        codes = (
+            self.is_on * CODE_IS_ON
+            + self.in_azimuth_range * CODE_IN_AZIMUTH_RANGE
+            + self.below_max_elevation * CODE_BELOW_MAX_ELEVATION
+            + self.above_horizon * CODE_ABOVE_HORIZON
+            + self.not_obstructed * CODE_NOT_OBSTRUCTED
+            + self.within_incidence * CODE_WITHIN_INCIDENCE
+            + CODE_SUN_UP
+        )
+        return np.where(self.sun_up, codes, 0)
+
+    def result(self, index):
+        """
+        Retourne le dictionnaire des attributs d'état d'une fenêtre, dont la clé "is_on".
+        Réservé aux évaluations d'une seule position du soleil.
+        """
+        if not self.sun_up[index]:
+            return {"is_on": False, "sun_position": "below_horizon"}
+
+        is_on = bool(self.is_on[index])
+        return {
+            "is_on": is_on,
+            "in_azimuth_range": bool(self.in_azimuth_range[index]),
+            "below_max_elevation": bool(self.below_max_elevation[index]),
+            "above_horizon": bool(self.above_horizon[index]),
+            "not_obstructed": bool(self.not_obstructed[index]),
+            "within_incidence": bool(self.within_incidence[index]),
+            "sun_position": "hitting_window" if is_on else "not_hitting_window",
+        }
+
+
+class WindowBatch:
+    """
+    Fenêtres d'une entrée stockées en tableaux plats (structure de tableaux).
+
+    Une seule évaluation compare une ou plusieurs positions du soleil à
+    toutes les fenêtres à la fois, sans boucle Python par fenêtre.
+
+    Les bandes mortes en élévation et en azimut forment une hystérésis :
+    lorsque l'état actuel des fenêtres est fourni, une fenêtre éteinte ne
+    s'allume que si toutes les conditions sont remplies avec cette marge,
+    et une fenêtre allumée ne s'éteint que si l'une d'elles échoue de plus
+    que cette marge.
+
+    Les fenêtres dotées d'une géométrie d'ombrage (débord, joues, polygones)
+    sont en plus testées contre leur masque précalculé, par une lecture de bit.
+
+    Les fenêtres inclinées (tilt) sont en plus testées sur l'angle d'incidence
+    du soleil par rapport à la normale du vitrage. Les fenêtres sans
+    inclinaison gardent le seul modèle par plage d'azimut et élévation maximale.
+    """
+
+    def __init__(self, windows, horizon_table, elevation_deadband=0.0, azimuth_deadband=0.0):
+        """Construire les tableaux à partir de la liste des fenêtres configurées."""
+        self.horizon_table = horizon_table
+        self.elevation_deadband = float(elevation_deadband)
+        self.azimuth_deadband = float(azimuth_deadband)
+        self.names = [window[CONF_NAME] for window in windows]
+        self.index = {name: i for i, name in enumerate(self.names)}
+
+        self.start_azimuth = np.array(
+            [window[CONF_START_AZIMUTH] for window in windows], dtype=float
+        )
+        self.end_azimuth = np.array(
+            [window[CONF_END_AZIMUTH] for window in windows], dtype=float
+        )
+        self.max_elevation = np.array(
+            [window[CONF_MAX_ELEVATION] for window in windows], dtype=float
+        )
+        # Plages qui traversent 0°/360° et largeur de chaque plage
+        self.wraps = self.start_azimuth > self.end_azimuth
+        self.azimuth_width = self.end_azimuth - self.start_azimuth + 360 * self.wraps
+        self.masks = MaskSet(windows)
+        self.geometry = ShadingGeometry(windows)
+
+        # Normale du vitrage en composantes (est, nord, zénith) pour le produit
+        # scalaire avec le soleil ; les fenêtres sans inclinaison sont verticales
+        self.tilted = np.array([window.get(CONF_TILT) is not None for window in windows], dtype=bool)
+        tilt = np.radians(
+            np.array(
+                [90 if window.get(CONF_TILT) is None else window[CONF_TILT] for window in windows],
+                dtype=float,
+            )
+        )
+        facade = np.radians(self.geometry.facade)
+        self.normal = np.stack(
+            [np.sin(tilt) * np.sin(facade), np.sin(tilt) * np.cos(facade), np.cos(tilt)]
+        )
+        self.max_incidence = np.array(
+            [window.get(CONF_MAX_INCIDENCE, DEFAULT_MAX_INCIDENCE) for window in windows],
+            dtype=float,
+        )
+
+        # Apports solaires : surface vitrée × facteur solaire
+        self.solar_aperture = np.array(
+            [glazing_area(window) * window.get(CONF_G_VALUE, DEFAULT_G_VALUE) for window in windows],
+            dtype=float,
+        )
+
+    def __len__(self):
+        """Nombre de fenêtres du lot."""
+        return len(self.names)
+
+    @property
+    def has_deadband(self):
+        """Indique si une hystérésis est configurée."""
+        return bool(self.elevation_deadband or self.azimuth_deadband)
+
+    def evaluate(self, azimuth, elevation, states=None):
+        """
+        Évaluer une ou plusieurs positions du soleil contre toutes les fenêtres.
+        states est l'état actuel de chaque fenêtre pour l'hystérésis (None : aucune).
+        Les masques retournés ont la forme (positions..., fenêtres).
+        """
+        azimuth = np.asarray(azimuth, dtype=float)
+        elevation = np.asarray(elevation, dtype=float)
+
+        if self.horizon_table is None:
+            horizon_elevation = np.full(azimuth.shape, np.nan)
+        else:
+            horizon_elevation = self.horizon_table.elevations_at(azimuth)
+
+        return self._evaluate(
+            azimuth[..., None], elevation[..., None], horizon_elevation[..., None],
+            states=states,
+        )._replace(horizon_elevation=horizon_elevation)
+
+    def sunlit_fraction(self, azimuth, elevation, is_on):
+        """
+        Part éclairée du vitrage (0 à 1) de toutes les fenêtres pour une position
+        du soleil, nulle pour les fenêtres que le soleil n'atteint pas.
+        """
+        fraction = self.geometry.lit_fraction(
+            np.asarray(azimuth, dtype=float)[..., None],
+            np.asarray(elevation, dtype=float)[..., None],
+        )
+        return np.where(is_on, fraction, 0.0)
+
+    def heat_gain(self, azimuth, elevation, is_on, altitude=0.0, sunlit=None):
+        """
+        Apports solaires (W) de toutes les fenêtres pour une position du soleil.
+
+        Le rayonnement par ciel clair ne dépend que de l'élévation : il est
+        calculé une fois, en cache, pour toutes les fenêtres. Le direct est
+        projeté sur chaque vitrage selon l'angle d'incidence et réduit à sa
+        part éclairée (sunlit, recalculée si absente) ; le diffus du ciel et le
+        réfléchi du sol sont isotropes.
+        """
+        direct, diffuse, total = clear_sky_irradiance(float(elevation), altitude)
+        if not total:
+            return np.zeros(len(self))
+
+        cos_incidence = np.clip(self._cos_incidence(azimuth, elevation), 0, None)
+        if sunlit is None:
+            sunlit = self.sunlit_fraction(azimuth, elevation, is_on)
+        tilt_cos = self.normal[2]
+        on_glazing = (
+            direct * cos_incidence * sunlit
+            + diffuse * (1 + tilt_cos) / 2
+            + total * GROUND_ALBEDO * (1 - tilt_cos) / 2
+        )
+        return self.solar_aperture * on_glazing
+
+    def evaluate_aligned(self, azimuth, elevation, indices, states=None):
+        """
+        Évaluer une position du soleil distincte pour chaque fenêtre désignée.
+        azimuth[i] et elevation[i] sont comparés à la fenêtre indices[i], dont
+        l'état actuel pour l'hystérésis est states[i].
+        """
+        azimuth = np.asarray(azimuth, dtype=float)
+        elevation = np.asarray(elevation, dtype=float)
+
+        if self.horizon_table is None:
+            horizon_elevation = np.full(azimuth.shape, np.nan)
+        else:
+            horizon_elevation = self.horizon_table.elevations_at(azimuth)
+
+        return self._evaluate(azimuth, elevation, horizon_elevation, indices, states)
+
+    def _evaluate(self, azimuth, elevation, horizon_elevation, indices=slice(None), states=None):
+        """Évaluer des positions du soleil diffusables contre les tableaux des fenêtres."""
+        # Marges d'hystérésis : positives pour allumer, négatives pour rester allumé
+        if states is None or not self.has_deadband:
+            elevation_margin = azimuth_margin = 0.0
+        else:
+            sign = np.where(states, -1.0, 1.0)
+            elevation_margin = sign * self.elevation_deadband
+            azimuth_margin = sign * self.azimuth_deadband
+
+        # Écart angulaire depuis le début de la plage, ce qui gère le cas où
+        # la plage traverse 0°/360°
+        offset = np.mod(azimuth - self.start_azimuth[indices] - azimuth_margin, 360)
+        in_azimuth_range = offset <= self.azimuth_width[indices] - 2 * azimuth_margin
+
+        below_max_elevation = elevation < self.max_elevation[indices] - elevation_margin
+
+        # Sans profil d'horizon (NaN), le soleil est considéré au-dessus
+        above_horizon = np.isnan(horizon_elevation) | (
+            elevation > horizon_elevation + elevation_margin
+        )
+        above_horizon = np.broadcast_to(above_horizon, in_azimuth_range.shape)
+
+        if self.masks:
+            not_obstructed = ~self.masks.obstructed(azimuth, elevation, indices)
+        else:
+            not_obstructed = np.ones(in_azimuth_range.shape, dtype=bool)
+
+        if self.tilted.any():
+            within_incidence = self._within_incidence(azimuth, elevation, indices, elevation_margin)
+        else:
+            within_incidence = np.ones(in_azimuth_range.shape, dtype=bool)
+
+        sun_up = np.broadcast_to(elevation > elevation_margin, in_azimuth_range.shape)
+        is_on = (
+            sun_up & in_azimuth_range & below_max_elevation & above_horizon
+            & not_obstructed & within_incidence
+        )
+
+        return WindowEvaluation(
+            is_on=is_on,
+            sun_up=sun_up,
+            in_azimuth_range=in_azimuth_range,
+            below_max_elevation=below_max_elevation,
+            above_horizon=above_horizon,
+            not_obstructed=not_obstructed,
+            within_incidence=within_incidence,
+            horizon_elevation=horizon_elevation,
+        )
+
+    def _within_incidence(self, azimuth, elevation, indices, margin):
+        """Angle d'incidence sous le seuil de chaque fenêtre inclinée (toujours vrai sinon)."""
+        cos_incidence = self._cos_incidence(azimuth, elevation, indices)
+        incidence = np.degrees(np.arccos(np.clip(cos_incidence, -1, 1)))
+        return ~self.tilted[indices] | (incidence < self.max_incidence[indices] - margin)
+
+    def _cos_incidence(self, azimuth, elevation, indices=slice(None)):
+        """Cosinus de l'angle d'incidence du soleil sur chaque vitrage."""
+        azimuth = np.radians(azimuth)
+        elevation = np.radians(elevation)
+        east, north, zenith = self.normal[:, indices]
+
+        # cos θ = sin(él) cos(incl) + cos(él) sin(incl) cos(az − az normale)
+        return (
+            np.cos(elevation) * (np.sin(azimuth) * east + np.cos(azimuth) * north)
+            + np.sin(elevation) * zenith
+        )
@@ -0,0 +1,169 @@
+"""Calcul local de la position du soleil (algorithme NOAA), vectorisé."""
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+
+import numpy as np
+
+from .const import DEFAULT_POSITION_CACHE_SIZE
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+def solar_position(latitude, longitude, timestamps):
+    """
+    Calcule l'azimut et l'élévation du soleil pour un tableau d'horodatages.
+
+    Les horodatages sont des secondes POSIX (UTC). L'élévation inclut la
+    réfraction atmosphérique, comme l'entité sun.sun. Entre 1950 et 2050,
+    l'écart avec sun.sun reste inférieur à 0,01° en élévation (soleil levé)
+    et à 0,05° en azimut (hors zénith, où l'azimut n'est pas défini) ; voir
+    tests/test_ephemeris.py.
+    Retourne les tableaux (azimut, élévation) en degrés.
+    """
+    timestamps = np.asarray(timestamps, dtype=float)
+    lat = np.radians(latitude)
+
+    # Siècle julien depuis J2000
+    julian_day = timestamps / 86400 + 2440587.5
+    century = (julian_day - 2451545) / 36525
+
+    # Longitude et anomalie moyennes, excentricité de l'orbite terrestre
+    mean_longitude = np.mod(280.46646 + century * (36000.76983 + century * 0.0003032), 360)
+    mean_anomaly = np.radians(357.52911 + century * (35999.05029 - 0.0001537 * century))
+    eccentricity = 0.016708634 - century * (0.000042037 + 0.0000001267 * century)
+
+    # Longitude vraie puis apparente du soleil
+    center = (
+        np.sin(mean_anomaly) * (1.914602 - century * (0.004817 + 0.000014 * century))
+        + np.sin(2 * mean_anomaly) * (0.019993 - 0.000101 * century)
+        + np.sin(3 * mean_anomaly) * 0.000289
+    )
+    omega = np.radians(125.04 - 1934.136 * century)
+    apparent_longitude = np.radians(mean_longitude + center - 0.00569 - 0.00478 * np.sin(omega))
+
+    # Obliquité de l'écliptique et déclinaison
+    mean_obliquity = 23 + (26 + (21.448 - century * (46.815 + century * (0.00059 - century * 0.001813))) / 60) / 60
+    obliquity = np.radians(mean_obliquity + 0.00256 * np.cos(omega))
+    declination = np.arcsin(np.sin(obliquity) * np.sin(apparent_longitude))
+
+    # Équation du temps (minutes)
+    y = np.tan(obliquity / 2) ** 2
+    mean_longitude = np.radians(mean_longitude)
+    equation_of_time = 4 * np.degrees(
+        y * np.sin(2 * mean_longitude)
+        - 2 * eccentricity * np.sin(mean_anomaly)
+        + 4 * eccentricity * y * np.sin(mean_anomaly) * np.cos(2 * mean_longitude)
+        - 0.5 * y * y * np.sin(4 * mean_longitude)
+        - 1.25 * eccentricity * eccentricity * np.sin(2 * mean_anomaly)
+    )
+
+    # Temps solaire vrai (minutes) et angle horaire
+    true_solar_time = np.mod(np.mod(timestamps, 86400) / 60 + equation_of_time + 4 * longitude, 1440)
+    hour_angle = np.radians(true_solar_time / 4 - 180)
+
+    # Élévation géométrique
+    cos_zenith = np.sin(lat) * np.sin(declination) + np.cos(lat) * np.cos(declination) * np.cos(hour_angle)
+    elevation = 90 - np.degrees(np.arccos(np.clip(cos_zenith, -1, 1)))
+
+    # Azimut compté depuis le nord, dans le sens horaire
+    azimuth = np.mod(
+        np.degrees(
+            np.arctan2(
+                np.sin(hour_angle),
+                np.cos(hour_angle) * np.sin(lat) - np.tan(declination) * np.cos(lat),
+            )
+        )
+        + 180,
+        360,
+    )
+
+    return azimuth, elevation + _refraction(elevation)
+
+
+def _refraction(elevation):
+    """Correction de réfraction atmosphérique NOAA (degrés) pour une élévation géométrique."""
+    elevation = np.asarray(elevation, dtype=float)
+    tan_e = np.tan(np.radians(np.clip(elevation, -89.9, 89.9)))
+    # Toutes les branches sont calculées : ignorer les divisions par zéro écartées
+    with np.errstate(divide="ignore", over="ignore", invalid="ignore"):
+        correction = np.select(
+            [
+                elevation > 85,
+                elevation > 5,
+                elevation > -0.575,
+            ],
+            [
+                0.0,
+                58.1 / tan_e - 0.07 / tan_e**3 + 0.000086 / tan_e**5,
+                1735 + elevation * (-518.2 + elevation * (103.4 + elevation * (-12.79 + elevation * 0.711))),
+            ],
+            -20.772 / tan_e,
+        )
+    return correction / 3600
+
+
+class PositionCache:
+    """
+    Cache LRU borné des positions du soleil par (latitude, longitude, minute),
+    commun à toutes les entrées : des entrées d'un même site ne recalculent pas
+    la même minute. Contrairement à lru_cache, sa taille peut être changée
+    pendant l'exécution.
+    """
+
+    def __init__(self, maxsize):
+        """Initialiser un cache vide."""
+        self.maxsize = maxsize
+        self._positions = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, latitude, longitude, minute):
+        """Position du soleil au début d'une minute POSIX, calculée au premier appel."""
+        key = (latitude, longitude, minute)
+        position = self._positions.get(key)
+        if position is not None:
+            self._positions.move_to_end(key)
+            self.hits += 1
+            return position
+
+        self.misses += 1
+        azimuth, elevation = solar_position(latitude, longitude, minute * 60)
+        position = self._positions[key] = (float(azimuth), float(elevation))
+        if len(self._positions) > self.maxsize:
+            self._positions.popitem(last=False)
+        return position
+
+    def resize(self, maxsize):
+        """Changer la taille maximale, en oubliant les positions les plus anciennes."""
+        self.maxsize = maxsize
+        while len(self._positions) > maxsize:
+            self._positions.popitem(last=False)
+
+    def cache_info(self):
+        """Statistiques au format de lru_cache."""
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._positions))
+
+
+# Cache unique du processus, dimensionné par les entrées de configuration
+POSITION_CACHE = PositionCache(DEFAULT_POSITION_CACHE_SIZE)
+
+
+class SolarEphemeris:
+    """Position du soleil pour un lieu donné, sans dépendre de sun.sun."""
+
+    def __init__(self, latitude, longitude):
+        """Initialiser l'éphéméride pour un lieu."""
+        self.latitude = float(latitude)
+        self.longitude = float(longitude)
+
+    def position(self, when: datetime):
+        """
+        Retourne (azimut, élévation) du soleil à un instant donné.
+        Le résultat est mis en cache par (latitude, longitude, minute).
+        """
+        minute = int(when.timestamp() // 60)
+        return POSITION_CACHE.get(self.latitude, self.longitude, minute)
+
+    def positions(self, timestamps):
+        """Retourne les tableaux (azimut, élévation) pour des horodatages POSIX."""
+        return solar_position(self.latitude, self.longitude, timestamps)
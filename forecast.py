@@ -0,0 +1,174 @@
+"""Prévision des intervalles de soleil sur les fenêtres pour les jours à venir."""
+import base64
+import math
+import zlib
+
+import numpy as np
+
+from .scheduler import find_transitions
+
+# Aujourd'hui et les 7 jours suivants
+FORECAST_DAYS = 8
+DAY = 86400
+
+
+def compute_forecast(batch, ephemeris, start, days=FORECAST_DAYS):
+    """
+    Calcule les intervalles de soleil de chaque fenêtre à partir d'un horodatage POSIX.
+    Retourne, pour chaque fenêtre du lot, la liste des intervalles (début, fin)
+    en horodatages POSIX.
+    """
+    return compute_intervals(batch, ephemeris, start, start + days * DAY)
+
+
+def compute_intervals(batch, ephemeris, start, end):
+    """
+    Calcule les intervalles de soleil de chaque fenêtre entre deux horodatages POSIX.
+
+    La période est traitée jour par jour pour borner la mémoire utilisée par
+    l'évaluation par lot. Un intervalle en cours au début ou à la fin de la
+    période est tronqué à ses bornes.
+    """
+    azimuth, elevation = ephemeris.positions(start)
+    initial = batch.evaluate(azimuth, elevation).is_on
+
+    # Début de l'intervalle en cours pour chaque fenêtre (NaN : pas de soleil)
+    opened = np.where(initial, float(start), np.nan).tolist()
+    intervals = [[] for _ in range(len(batch))]
+
+    # État de chaque fenêtre en fin de journée, pour suivre l'hystérésis d'un jour à l'autre
+    current = initial.copy()
+    day_start = float(start)
+    while day_start < end:
+        transitions = find_transitions(
+            batch, ephemeris, day_start, min(day_start + DAY, end), current.copy()
+        )
+        day_start += DAY
+        _apply_transitions(transitions, current, opened, intervals)
+
+    _close_intervals(opened, intervals, end)
+    return intervals
+
+
+def _apply_transitions(transitions, current, opened, intervals):
+    """
+    Suivre les bascules dans l'ordre du temps : état courant et début de
+    l'intervalle en cours de chaque fenêtre, intervalles refermés.
+    """
+    times, windows, states = transitions
+    for time, window, state in zip(times.tolist(), windows.tolist(), states.tolist()):
+        current[window] = state
+        if state:
+            opened[window] = time
+        elif not math.isnan(opened[window]):
+            intervals[window].append((opened[window], time))
+            opened[window] = math.nan
+
+
+def _close_intervals(opened, intervals, end):
+    """Tronquer à la fin de la période les intervalles encore en cours."""
+    for window, time in enumerate(opened):
+        if not math.isnan(time):
+            intervals[window].append((time, float(end)))
+
+
+def pack_intervals(intervals):
+    """
+    Range les intervalles de toutes les fenêtres dans deux tableaux : les
+    bornes (n × 2) et, par fenêtre, l'indice de son premier intervalle.
+    Bien plus compact qu'une liste de tuples par fenêtre.
+    """
+    counts = [len(window_intervals) for window_intervals in intervals]
+    offsets = np.zeros(len(intervals) + 1, dtype=np.int32)
+    np.cumsum(counts, out=offsets[1:])
+    bounds = np.array(
+        [interval for window_intervals in intervals for interval in window_intervals],
+        dtype=float,
+    ).reshape(-1, 2)
+    return offsets, bounds
+
+
+def compute_packed_day(batch, ephemeris, start, end):
+    """Intervalles de soleil d'une journée, rangés par pack_intervals."""
+    return pack_intervals(compute_intervals(batch, ephemeris, start, end))
+
+
+def compute_packed_days(batch, ephemeris, days):
+    """
+    Intervalles de soleil de journées consécutives (début, fin), rangés par
+    pack_intervals journée par journée. L'état des fenêtres en fin de journée
+    amorce la suivante : avec une bande morte, l'hystérésis ne repart pas à
+    minuit, et merge_packed sur les journées donne les intervalles de
+    compute_intervals sur toute la période.
+    """
+    current = None
+    packed_days = []
+    for start, end in days:
+        if current is None:
+            azimuth, elevation = ephemeris.positions(start)
+            current = batch.evaluate(azimuth, elevation).is_on
+        opened = np.where(current, float(start), np.nan).tolist()
+        intervals = [[] for _ in range(len(batch))]
+        transitions = find_transitions(batch, ephemeris, start, end, current.copy())
+        _apply_transitions(transitions, current, opened, intervals)
+        _close_intervals(opened, intervals, end)
+        packed_days.append(pack_intervals(intervals))
+    return packed_days
+
+
+def merge_packed(days, windows):
+    """
+    Intervalles des fenêtres demandées (indices dans le lot) sur des journées
+    consécutives rangées par pack_intervals. Un intervalle coupé à minuit est
+    recollé à sa suite. Retourne une liste d'intervalles [début, fin] par
+    fenêtre demandée, dans l'ordre des indices.
+    """
+    if not days:
+        return [[] for _ in windows]
+
+    # Toutes les journées à la suite, puis regroupées par fenêtre dans l'ordre chronologique
+    window_ids = np.concatenate([
+        np.repeat(np.arange(len(offsets) - 1), np.diff(offsets)) for offsets, _ in days
+    ])
+    bounds = np.concatenate([day_bounds for _, day_bounds in days])
+    order = np.argsort(window_ids, kind="stable")
+    window_ids = window_ids[order]
+    bounds = bounds[order]
+
+    # Un intervalle prolonge le précédent de la même fenêtre s'il commence à sa fin
+    follows = np.zeros(len(bounds), dtype=bool)
+    follows[1:] = (window_ids[1:] == window_ids[:-1]) & (bounds[1:, 0] == bounds[:-1, 1])
+    first = np.flatnonzero(~follows)
+    last = np.append(first[1:], len(bounds)) - 1
+    merged = np.column_stack([bounds[first, 0], bounds[last, 1]])
+
+    merged_ids = window_ids[first]
+    windows = np.asarray(windows)
+    low = np.searchsorted(merged_ids, windows, side="left")
+    high = np.searchsorted(merged_ids, windows, side="right")
+    return [merged[start:end].tolist() for start, end in zip(low.tolist(), high.tolist())]
+
+
+def encode_packed(packed):
+    """Encode une journée rangée par pack_intervals pour l'enregistrer (zlib, base64)."""
+    offsets, bounds = packed
+    return {
+        "offsets": base64.b64encode(zlib.compress(offsets.astype("<i4").tobytes())).decode(),
+        "bounds": base64.b64encode(zlib.compress(bounds.astype("<f8").tobytes())).decode(),
+    }
+
+
+def decode_packed(data):
+    """
+    Décode une journée enregistrée par encode_packed.
+    Lève ValueError si les données sont illisibles ou incohérentes.
+    """
+    try:
+        offsets = np.frombuffer(zlib.decompress(base64.b64decode(data["offsets"])), dtype="<i4")
+        bounds = np.frombuffer(zlib.decompress(base64.b64decode(data["bounds"])), dtype="<f8")
+    except (KeyError, TypeError, zlib.error) as err:
+        raise ValueError(f"Journée enregistrée illisible : {err}") from err
+
+    if not len(offsets) or len(bounds) % 2 or offsets[-1] * 2 != len(bounds):
+        raise ValueError("Journée enregistrée tronquée")
+    return offsets.astype(np.int32), bounds.reshape(-1, 2)
@@ -0,0 +1,122 @@
+"""Groupes de fenêtres par façade, pièce et étage, tenus à jour aux bascules."""
+import math
+from bisect import bisect_left, bisect_right, insort
+from collections import namedtuple
+
+import numpy as np
+
+from .const import CONF_NAME, GROUP_KINDS
+
+# État publié d'un groupe : fenêtres au soleil, fenêtres du groupe, noms des
+# fenêtres au soleil et prochaine bascule d'une de ses fenêtres (POSIX ou None)
+GroupState = namedtuple(
+    "GroupState", ["sunlit_count", "window_count", "sunlit_windows", "next_transition"]
+)
+
+
+class WindowGroups:
+    """
+    Groupes formés par les façades, pièces et étages des fenêtres d'un lot.
+
+    Une fenêtre appartient au plus à un groupe de chaque sorte. Les fenêtres au
+    soleil de chaque groupe ne sont mises à jour que pour les fenêtres dont
+    l'état publié a basculé, et la prochaine bascule d'un groupe, la plus
+    proche des bascules prévues de ses fenêtres, n'est recherchée qu'une fois
+    la précédente passée ou les bascules replanifiées.
+    """
+
+    def __init__(self, windows):
+        """Relever les groupes des fenêtres, dans l'ordre du lot."""
+        self.keys = []
+        self.index = {}
+        self.names = [window[CONF_NAME] for window in windows]
+        # Groupe de chaque fenêtre pour chaque sorte (-1 : aucun), fenêtres × sortes
+        self.members = np.full((len(windows), len(GROUP_KINDS)), -1, dtype=np.intp)
+        for position, window in enumerate(windows):
+            for column, kind in enumerate(GROUP_KINDS):
+                if not window.get(kind):
+                    continue
+                key = (kind, window[kind])
+                if key not in self.index:
+                    self.index[key] = len(self.keys)
+                    self.keys.append(key)
+                self.members[position, column] = self.index[key]
+
+        self.window_counts = np.bincount(
+            self.members[self.members >= 0], minlength=len(self.keys)
+        )
+        # Noms des fenêtres au soleil de chaque groupe, tenus triés
+        self.sunlit = [[] for _ in self.keys]
+        self._states = np.zeros(len(windows), dtype=bool)
+        # Prochaine bascule de chaque groupe (-inf : à rechercher, inf : aucune prévue)
+        self.next_transitions = np.full(len(self.keys), -np.inf)
+        # Bascules prévues rangées groupe par groupe, et début de chaque groupe
+        self._plan_times = []
+        self._plan_offsets = [0] * (len(self.keys) + 1)
+
+    def __len__(self):
+        """Nombre de groupes."""
+        return len(self.keys)
+
+    def update(self, states):
+        """
+        Reporter les bascules de l'état publié des fenêtres : seules les fenêtres
+        qui ont basculé sont parcourues. Retourne les indices des groupes modifiés.
+        """
+        flipped = np.flatnonzero(states != self._states)
+        if not len(flipped):
+            return set()
+
+        changed = set()
+        for position, row, is_on in zip(
+            flipped.tolist(), self.members[flipped].tolist(), states[flipped].tolist()
+        ):
+            name = self.names[position]
+            for group in row:
+                if group < 0:
+                    continue
+                sunlit = self.sunlit[group]
+                if is_on:
+                    insort(sunlit, name)
+                else:
+                    del sunlit[bisect_left(sunlit, name)]
+                changed.add(group)
+        self._states[flipped] = states[flipped]
+        return changed
+
+    def set_plan(self, times, windows):
+        """
+        Prendre les bascules prévues (triées) et leurs fenêtres, rangées une
+        fois pour toutes groupe par groupe ; tout est à rechercher.
+        """
+        members = self.members[windows]
+        valid = members >= 0
+        groups = members[valid]
+        # Tri stable : les bascules de chaque groupe restent dans l'ordre du temps.
+        # En listes, une recherche par groupe coûte moins qu'un appel NumPy
+        order = np.argsort(groups, kind="stable")
+        self._plan_times = np.broadcast_to(times[:, None], members.shape)[valid][order].tolist()
+        self._plan_offsets = [0, *np.cumsum(np.bincount(groups, minlength=len(self.keys))).tolist()]
+        self.next_transitions[:] = -np.inf
+
+    def advance(self, now):
+        """
+        Rechercher la prochaine bascule des seuls groupes dont la précédente est
+        passée. Retourne les indices des groupes modifiés.
+        """
+        due = np.flatnonzero(self.next_transitions <= now).tolist()
+        for group in due:
+            end = self._plan_offsets[group + 1]
+            position = bisect_right(self._plan_times, now, self._plan_offsets[group], end)
+            self.next_transitions[group] = self._plan_times[position] if position < end else np.inf
+        return set(due)
+
+    def state(self, group):
+        """État publié d'un groupe."""
+        next_transition = float(self.next_transitions[group])
+        return GroupState(
+            len(self.sunlit[group]),
+            int(self.window_counts[group]),
+            list(self.sunlit[group]),
+            next_transition if math.isfinite(next_transition) else None,
+        )
@@ -0,0 +1,194 @@
+"""Import de profils d'horizon depuis des fichiers de relevés."""
+import csv
+import json
+from array import array
+
+import numpy as np
+
+from .const import CONF_AZIMUTH, CONF_ELEVATION
+
+# Noms de colonnes reconnus dans les en-têtes des fichiers CSV
+# (PeakFinder, HeyWhatsThat, exports génériques azimut/élévation)
+AZIMUTH_COLUMNS = ("azimuth", "azimut", "azi", "az", "bearing", "heading")
+ELEVATION_COLUMNS = ("elevation", "élévation", "altitude", "alt", "elev", "el", "angle", "horizon")
+
+CSV_DELIMITERS = ",;\t"
+
+
+class HorizonImportError(Exception):
+    """Erreur d'import d'un fichier d'horizon, identifiée par une clé de traduction."""
+
+    def __init__(self, error_key, line=None):
+        """Initialiser l'erreur avec sa clé et la ligne fautive éventuelle."""
+        super().__init__(error_key if line is None else f"{error_key} (ligne {line})")
+        self.error_key = error_key
+        self.line = line
+
+
+def load_horizon_file(path, max_error=0.0):
+    """
+    Lit un fichier d'horizon et retourne le profil au format de la configuration.
+
+    Les fichiers CSV (ou texte séparé par des tabulations, points-virgules ou
+    espaces) sont lus ligne par ligne ; les fichiers JSON acceptent un objet
+    {azimut: élévation}, une liste de paires [azimut, élévation] ou une liste
+    de points {azimuth, elevation}. Les points sont conservés dans des tableaux
+    compacts, puis le profil est simplifié si max_error (degrés) est positif.
+    Doit être appelé hors de la boucle d'événements.
+    """
+    azimuths = array("d")
+    elevations = array("d")
+
+    if str(path).lower().endswith(".json"):
+        points = _read_json(path)
+    else:
+        points = _read_csv(path)
+
+    for line, azimuth, elevation in points:
+        if not 0 <= azimuth <= 360:
+            raise HorizonImportError("invalid_azimuth_range", line)
+        if not -90 <= elevation <= 90:
+            raise HorizonImportError("invalid_elevation_range", line)
+        azimuths.append(azimuth)
+        elevations.append(elevation)
+
+    if len(azimuths) < 2:
+        raise HorizonImportError("minimum_horizon_points")
+
+    azimuths = np.frombuffer(azimuths, dtype=float)
+    elevations = np.frombuffer(elevations, dtype=float)
+    order = np.argsort(azimuths, kind="stable")
+    azimuths = azimuths[order]
+    elevations = elevations[order]
+
+    if max_error > 0:
+        keep = simplify_profile(azimuths, elevations, max_error)
+        azimuths = azimuths[keep]
+        elevations = elevations[keep]
+
+    return [
+        {CONF_AZIMUTH: azimuth, CONF_ELEVATION: elevation}
+        for azimuth, elevation in zip(azimuths.tolist(), elevations.tolist())
+    ]
+
+
+def _read_csv(path):
+    """Génère les points (ligne, azimut, élévation) d'un fichier CSV, ligne par ligne."""
+    azimuth_column, elevation_column = 0, 1
+    dialect = None
+
+    with open(path, encoding="utf-8-sig", newline="") as file:
+        for number, raw in enumerate(file, start=1):
+            text = raw.strip()
+            if not text or text.startswith("#"):
+                continue
+
+            # Détection du séparateur sur la première ligne utile
+            if dialect is None:
+                dialect = next((d for d in CSV_DELIMITERS if d in text), None) or " "
+            fields = _split(text, dialect)
+
+            try:
+                azimuth = float(fields[azimuth_column])
+                elevation = float(fields[elevation_column])
+            except (ValueError, IndexError):
+                # Ligne d'en-tête : repérer les colonnes par leur nom
+                columns = [field.strip().strip('"').lower() for field in fields]
+                found = _find_columns(columns)
+                if found is None:
+                    raise HorizonImportError("invalid_number_format", number) from None
+                azimuth_column, elevation_column = found
+                continue
+
+            yield number, azimuth, elevation
+
+
+def _split(text, delimiter):
+    """Découpe une ligne selon le séparateur détecté."""
+    if delimiter == " ":
+        return text.split()
+    return next(csv.reader([text], delimiter=delimiter))
+
+
+def _find_columns(columns):
+    """Retourne les indices des colonnes azimut et élévation d'un en-tête, ou None."""
+    azimuth_column = next((i for i, name in enumerate(columns) if name in AZIMUTH_COLUMNS), None)
+    elevation_column = next((i for i, name in enumerate(columns) if name in ELEVATION_COLUMNS), None)
+    if azimuth_column is None or elevation_column is None:
+        return None
+    return azimuth_column, elevation_column
+
+
+def _read_json(path):
+    """Génère les points (ligne, azimut, élévation) d'un fichier JSON."""
+    with open(path, encoding="utf-8") as file:
+        try:
+            data = json.load(file)
+        except json.JSONDecodeError:
+            raise HorizonImportError("invalid_json") from None
+
+    if isinstance(data, dict):
+        items = data.items()
+    elif isinstance(data, list):
+        items = (
+            (point[CONF_AZIMUTH], point[CONF_ELEVATION]) if isinstance(point, dict) else point
+            for point in data
+        )
+    else:
+        raise HorizonImportError("invalid_json_format")
+
+    try:
+        for number, (azimuth, elevation) in enumerate(items, start=1):
+            yield number, float(azimuth), float(elevation)
+    except (KeyError, TypeError, ValueError):
+        raise HorizonImportError("invalid_number_format") from None
+
+
+def simplify_profile(azimuths, elevations, max_error):
+    """
+    Simplifie un profil d'horizon trié en bornant l'erreur d'élévation.
+
+    Variante de Douglas-Peucker où l'erreur est l'écart vertical (en degrés)
+    entre un point retiré et l'interpolation linéaire des points conservés,
+    c'est-à-dire exactement l'erreur commise par la recherche d'horizon.
+    Le profil est traité comme circulaire : le premier point est répété à
+    +360° pour fermer le tour.
+    Retourne les indices triés des points conservés.
+    """
+    count = len(azimuths)
+    closed_azimuths = np.append(azimuths, azimuths[0] + 360)
+    closed_elevations = np.append(elevations, elevations[0])
+
+    keep = np.zeros(count + 1, dtype=bool)
+    keep[0] = keep[count] = True
+
+    # Pile de segments à examiner, sans récursion
+    stack = [(0, count)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+
+        inner = slice(first + 1, last)
+        span = closed_azimuths[last] - closed_azimuths[first]
+        if span == 0:
+            interpolated = np.full(last - first - 1, closed_elevations[first])
+        else:
+            ratio = (closed_azimuths[inner] - closed_azimuths[first]) / span
+            interpolated = closed_elevations[first] + ratio * (
+                closed_elevations[last] - closed_elevations[first]
+            )
+
+        errors = np.abs(closed_elevations[inner] - interpolated)
+        worst = int(np.argmax(errors))
+        if errors[worst] > max_error:
+            split = first + 1 + worst
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+
+    # Un profil d'horizon compte au moins deux points
+    if keep[:count].sum() < 2:
+        keep[count // 2] = True
+
+    return np.flatnonzero(keep[:count])
@@ -0,0 +1,62 @@
+"""Rayonnement solaire par ciel clair et apports de chaleur à travers les vitrages."""
+import math
+from functools import lru_cache
+
+from .const import (
+    CONF_GLAZING_AREA,
+    CONF_WINDOW_HEIGHT,
+    CONF_WINDOW_WIDTH,
+)
+
+# Éclairement hors atmosphère utilisé par le modèle de Meinel (W/m²)
+SOLAR_CONSTANT = 1353.0
+# Part diffuse du ciel clair rapportée au rayonnement direct
+DIFFUSE_RATIO = 0.1
+# Réflectivité du sol pour le rayonnement réfléchi vers les vitrages inclinés
+GROUND_ALBEDO = 0.2
+
+# Rayonnement déjà calculé par élévation du soleil, partagé par toutes les fenêtres
+IRRADIANCE_CACHE_SIZE = 2048
+
+
+def glazing_area(window):
+    """Surface vitrée d'une fenêtre (m²), à défaut hauteur × largeur, 0 si inconnue."""
+    if window.get(CONF_GLAZING_AREA):
+        return float(window[CONF_GLAZING_AREA])
+    return float(window.get(CONF_WINDOW_HEIGHT) or 0) * float(window.get(CONF_WINDOW_WIDTH) or 0)
+
+
+def air_mass(elevation):
+    """Masse d'air relative (Kasten et Young, 1989) pour une élévation en degrés."""
+    return 1 / (
+        math.sin(math.radians(elevation)) + 0.50572 * (elevation + 6.07995) ** -1.6364
+    )
+
+
+def clear_sky_irradiance(elevation, altitude=0.0):
+    """
+    Retourne (direct normal, diffus horizontal, global horizontal) en W/m²
+    par ciel clair, pour une élévation du soleil en degrés et une altitude
+    du site en mètres. Le résultat est mis en cache par centième de degré.
+    """
+    return _clear_sky_irradiance(round(elevation, 2), round(altitude))
+
+
+def irradiance_cache_info():
+    """Statistiques du cache du rayonnement par ciel clair, au format de lru_cache."""
+    return _clear_sky_irradiance.cache_info()
+
+
+@lru_cache(maxsize=IRRADIANCE_CACHE_SIZE)
+def _clear_sky_irradiance(elevation, altitude):
+    """Modèle de Meinel avec correction d'altitude (Laue, 1970)."""
+    if elevation <= 0:
+        return 0.0, 0.0, 0.0
+
+    height = altitude / 1000
+    direct = SOLAR_CONSTANT * (
+        (1 - 0.14 * height) * 0.7 ** (air_mass(elevation) ** 0.678) + 0.14 * height
+    )
+    diffuse = DIFFUSE_RATIO * direct
+    total = direct * math.sin(math.radians(elevation)) + diffuse
+    return direct, diffuse, total
@@ -0,0 +1,207 @@
+"""Masques d'ombrage par fenêtre (débords de toit, balcons, murs voisins)."""
+from functools import lru_cache
+
+import numpy as np
+
+from .const import (
+    CONF_START_AZIMUTH,
+    CONF_END_AZIMUTH,
+    CONF_SURFACE_AZIMUTH,
+    CONF_WINDOW_HEIGHT,
+    CONF_WINDOW_WIDTH,
+    CONF_OVERHANG_DEPTH,
+    CONF_FIN_DEPTH,
+    CONF_OBSTRUCTIONS,
+)
+
+# Résolution du masque : cases de 1° en azimut (0-359) et en élévation (0-89)
+AZIMUTH_BINS = 360
+ELEVATION_BINS = 90
+MASK_BYTES = AZIMUTH_BINS * ELEVATION_BINS // 8
+
+# Masques déjà calculés, partagés entre les rechargements de l'entrée
+MASK_CACHE_SIZE = 1024
+
+
+def surface_azimuth(window):
+    """Azimut de la normale à la façade, par défaut le milieu de la plage d'azimut."""
+    if window.get(CONF_SURFACE_AZIMUTH) is not None:
+        return float(window[CONF_SURFACE_AZIMUTH])
+    start = window[CONF_START_AZIMUTH]
+    width = (window[CONF_END_AZIMUTH] - start) % 360
+    return (start + width / 2) % 360
+
+
+def geometry_key(window):
+    """
+    Clé immuable de la géométrie d'ombrage d'une fenêtre, ou None sans obstruction.
+    Deux fenêtres de même clé partagent le même masque.
+    """
+    overhang = float(window.get(CONF_OVERHANG_DEPTH) or 0)
+    fin = float(window.get(CONF_FIN_DEPTH) or 0)
+    polygons = tuple(
+        tuple((float(azimuth), float(elevation)) for azimuth, elevation in polygon)
+        for polygon in window.get(CONF_OBSTRUCTIONS) or ()
+    )
+    if not overhang and not fin and not polygons:
+        return None
+
+    return (
+        surface_azimuth(window),
+        float(window.get(CONF_WINDOW_HEIGHT) or 0),
+        float(window.get(CONF_WINDOW_WIDTH) or 0),
+        overhang,
+        fin,
+        polygons,
+    )
+
+
+def window_mask(window):
+    """Masque compact (bitset) d'une fenêtre, ou None si rien ne l'ombrage."""
+    key = geometry_key(window)
+    if key is None:
+        return None
+    return _build_mask(key)
+
+
+def mask_cache_info():
+    """Statistiques du cache des masques, au format de lru_cache."""
+    return _build_mask.cache_info()
+
+
+@lru_cache(maxsize=MASK_CACHE_SIZE)
+def _build_mask(key):
+    """
+    Rastérise la géométrie d'ombrage sur la grille azimut × élévation.
+
+    Une case est ombrée quand le soleil en son centre est entièrement masqué
+    par le débord (sa projection couvre toute la hauteur de la fenêtre), par
+    les joues latérales (leur ombre couvre toute la largeur) ou s'il se trouve
+    dans l'un des polygones d'obstruction, exprimés en (azimut, élévation).
+    Retourne les bits empaquetés, ligne par azimut.
+    """
+    facade, height, width, overhang, fin, polygons = key
+
+    azimuth = np.arange(AZIMUTH_BINS)[:, None] + 0.5
+    elevation = np.arange(ELEVATION_BINS)[None, :] + 0.5
+    shaded = np.zeros((AZIMUTH_BINS, ELEVATION_BINS), dtype=bool)
+
+    # Angle du soleil par rapport à la normale, entre -180° et 180°
+    relative = np.radians((azimuth - facade + 180) % 360 - 180)
+    in_front = np.abs(relative) < np.pi / 2
+
+    if overhang and height:
+        # Angle de profil : élévation projetée dans le plan vertical normal à la façade
+        with np.errstate(divide="ignore"):
+            profile = np.tan(np.radians(elevation)) / np.cos(relative)
+        shaded |= in_front & (overhang * profile >= height)
+
+    if fin and width:
+        shaded |= in_front & (fin * np.abs(np.tan(relative)) >= width)
+
+    for polygon in polygons:
+        shaded |= _inside_polygon(azimuth, elevation, polygon)
+
+    return np.packbits(shaded.ravel()).tobytes()
+
+
+def _inside_polygon(azimuth, elevation, polygon):
+    """Cases dont le centre est dans le polygone (règle pair-impair)."""
+    vertices = np.array(polygon, dtype=float)
+    inside = np.zeros(np.broadcast_shapes(azimuth.shape, elevation.shape), dtype=bool)
+
+    # Un polygone qui déborde au-delà de 360° est aussi testé un tour plus tôt
+    for shift in (0, 360):
+        azimuths = azimuth + shift
+        for (az1, el1), (az2, el2) in zip(vertices, np.roll(vertices, -1, axis=0)):
+            crosses = (el1 > elevation) != (el2 > elevation)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                at = az1 + (elevation - el1) * (az2 - az1) / (el2 - el1)
+            inside ^= crosses & (azimuths < at)
+    return inside
+
+
+class MaskSet:
+    """
+    Masques d'ombrage d'un lot de fenêtres, empilés pour une lecture vectorisée.
+
+    Seules les fenêtres obstruées ont une ligne de masque ; les autres pointent
+    vers une dernière ligne vide. Tester une position du soleil revient à lire
+    un bit par fenêtre.
+    """
+
+    def __init__(self, windows):
+        """Construire ou reprendre du cache les masques des fenêtres."""
+        masks = []
+        rows = {}
+        self.rows = np.empty(len(windows), dtype=np.intp)
+        for i, window in enumerate(windows):
+            mask = window_mask(window)
+            if mask is None:
+                self.rows[i] = -1
+                continue
+            # Les fenêtres de même géométrie partagent une ligne
+            if mask not in rows:
+                rows[mask] = len(masks)
+                masks.append(np.frombuffer(mask, dtype=np.uint8))
+            self.rows[i] = rows[mask]
+
+        masks.append(np.zeros(MASK_BYTES, dtype=np.uint8))
+        self.rows[self.rows < 0] = len(masks) - 1
+        self.masks = np.stack(masks)
+
+    def __bool__(self):
+        """Indique si au moins une fenêtre est obstruée."""
+        return len(self.masks) > 1
+
+    def obstructed(self, azimuth, elevation, indices=slice(None)):
+        """Lit le bit d'ombrage de chaque fenêtre pour des positions du soleil diffusables."""
+        azimuth_bin = np.floor(np.mod(azimuth, 360)).astype(np.intp) % AZIMUTH_BINS
+        elevation_bin = np.clip(np.floor(elevation), 0, ELEVATION_BINS - 1).astype(np.intp)
+        bit = azimuth_bin * ELEVATION_BINS + elevation_bin
+        return (self.masks[self.rows[indices], bit >> 3] >> (7 - (bit & 7))) & 1 == 1
+
+
+class ShadingGeometry:
+    """
+    Dimensions des fenêtres et de leurs protections, en tableaux plats.
+
+    Calcule en un seul appel vectorisé la part éclairée du vitrage de toutes
+    les fenêtres : l'ombre du débord couvre une hauteur D·tan(angle de profil),
+    celle des joues une largeur F·|tan(azimut relatif)|. Les fenêtres sans
+    protection sont entièrement éclairées.
+    """
+
+    def __init__(self, windows):
+        """Construire les tableaux à partir de la liste des fenêtres configurées."""
+        self.facade = np.array([surface_azimuth(window) for window in windows], dtype=float)
+        self.height = np.array(
+            [window.get(CONF_WINDOW_HEIGHT) or 0 for window in windows], dtype=float
+        )
+        self.width = np.array(
+            [window.get(CONF_WINDOW_WIDTH) or 0 for window in windows], dtype=float
+        )
+        # Une protection n'est prise en compte qu'avec la dimension qu'elle ombre
+        self.overhang = np.array(
+            [window.get(CONF_OVERHANG_DEPTH) or 0 for window in windows], dtype=float
+        ) * (self.height > 0)
+        self.fin = np.array(
+            [window.get(CONF_FIN_DEPTH) or 0 for window in windows], dtype=float
+        ) * (self.width > 0)
+        self.protected = (self.overhang > 0) | (self.fin > 0)
+        self.height[self.height == 0] = 1.0
+        self.width[self.width == 0] = 1.0
+
+    def lit_fraction(self, azimuth, elevation, indices=slice(None)):
+        """Part éclairée (0 à 1) de chaque fenêtre pour des positions du soleil diffusables."""
+        relative = np.radians(np.mod(azimuth - self.facade[indices] + 180, 360) - 180)
+        cos_relative = np.cos(relative)
+        in_front = cos_relative > 0
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            profile = np.tan(np.radians(elevation)) / cos_relative
+            vertical = 1 - self.overhang[indices] * profile / self.height[indices]
+            horizontal = 1 - self.fin[indices] * np.abs(np.tan(relative)) / self.width[indices]
+
+        fraction = np.where(in_front, np.clip(vertical, 0, 1) * np.clip(horizontal, 0, 1), 0.0)
+        return np.where(self.protected[indices], fraction, 1.0)
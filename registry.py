@@ -0,0 +1,403 @@
+"""
+Ressources partagées par toutes les entrées de configuration du composant.
+
+Chaque entrée peut avoir son propre lieu, à défaut celui de Home Assistant.
+Les entrées d'un même lieu partagent une seule éphéméride et un seul
+échantillon de la position du soleil par instant : le rafraîchissement des
+mesures est cadencé par un minuteur unique du site, et la position calculée
+pour une entrée est réutilisée telle quelle par les suivantes. La taille du
+cache des positions à la minute, commun à tous les sites, est la plus grande
+demandée par les entrées chargées.
+
+Les profils d'horizon compilés sont internés par empreinte de contenu : des
+entrées au même profil partagent la même table. Chaque ressource est comptée
+par référence et libérée quand la dernière entrée qui l'utilise est déchargée.
+
+Les intervalles de soleil de chaque journée sont gardés par (empreinte de la
+configuration, date), dans un cache LRU borné partagé par la prévision et le
+service get_schedule. Les journées de la prévision sont enregistrées dans
+.storage : au démarrage suivant, prévision et bascules du jour sont reprises
+sans calcul.
+"""
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from datetime import timedelta
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DOMAIN,
+    DATA_REGISTRY,
+    CONF_HORIZON_CHECKSUM,
+    CONF_WINDOWS,
+    CONF_LATITUDE,
+    CONF_LONGITUDE,
+    CONF_SITE_ELEVATION,
+    CONF_ELEVATION_DEADBAND,
+    CONF_AZIMUTH_DEADBAND,
+    DEFAULT_ELEVATION_DEADBAND,
+    DEFAULT_AZIMUTH_DEADBAND,
+    DEFAULT_POSITION_CACHE_SIZE,
+    GROUP_KINDS,
+    MEASUREMENT_REFRESH_INTERVAL,
+    SCHEDULE_CACHE_DAYS,
+)
+from .ephemeris import POSITION_CACHE, SolarEphemeris
+from .forecast import (
+    FORECAST_DAYS,
+    compute_packed_day,
+    compute_packed_days,
+    decode_packed,
+    encode_packed,
+)
+from .storage import async_load_horizon_table
+
+_LOGGER = logging.getLogger(__name__)
+
+# Journées de la prévision enregistrées pour le prochain démarrage
+SCHEDULE_STORAGE_VERSION = 1
+SCHEDULE_STORAGE_KEY = f"{DOMAIN}.schedules"
+# Délai d'écriture (secondes) : plusieurs entrées calculées à la suite, une écriture
+SCHEDULE_SAVE_DELAY = 30
+# Version du calcul et du codage des journées : à incrémenter dès que les
+# intervalles d'une même configuration changent, les journées en cache et
+# enregistrées sont alors recalculées
+SCHEDULE_ALGORITHM_VERSION = 2
+
+
+def entry_location(hass: HomeAssistant, config):
+    """(latitude, longitude, altitude) d'une entrée, à défaut ceux de Home Assistant."""
+    return (
+        config.get(CONF_LATITUDE, hass.config.latitude),
+        config.get(CONF_LONGITUDE, hass.config.longitude),
+        config.get(CONF_SITE_ELEVATION, hass.config.elevation),
+    )
+
+
+def schedule_hash(config, site):
+    """
+    Empreinte de tout ce qui détermine les intervalles de soleil d'une entrée :
+    fenêtres, profil d'horizon, hystérésis, lieu, fuseau des journées et
+    version du calcul. Les groupes des fenêtres n'y entrent pas : les regrouper
+    autrement garde les journées en cache.
+    """
+    windows = [
+        {key: value for key, value in window.items() if key not in GROUP_KINDS}
+        for window in config[CONF_WINDOWS]
+    ]
+    content = json.dumps(
+        [
+            windows,
+            config.get(CONF_HORIZON_CHECKSUM),
+            float(config.get(CONF_ELEVATION_DEADBAND, DEFAULT_ELEVATION_DEADBAND)),
+            float(config.get(CONF_AZIMUTH_DEADBAND, DEFAULT_AZIMUTH_DEADBAND)),
+            site.key,
+            str(dt_util.DEFAULT_TIME_ZONE),
+            SCHEDULE_ALGORITHM_VERSION,
+        ],
+        sort_keys=True,
+    )
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def local_days(start_date, end_date):
+    """Journées locales de la période, bornes incluses : (date, début, fin) POSIX."""
+    days = []
+    day = start_date
+    while day <= end_date:
+        following = day + timedelta(days=1)
+        days.append((
+            day.isoformat(),
+            dt_util.start_of_local_day(day).timestamp(),
+            dt_util.start_of_local_day(following).timestamp(),
+        ))
+        day = following
+    return days
+
+
+def _decode_days(stored):
+    """Décoder les journées enregistrées ; les journées illisibles sont ignorées."""
+    days = {}
+    for key, data in stored.items():
+        config_hash, _, day = key.partition("|")
+        try:
+            days[(config_hash, day)] = decode_packed(data)
+        except ValueError as err:
+            _LOGGER.warning("Journée %s ignorée : %s", key, err)
+    return days
+
+
+class SunSite:
+    """Éphéméride d'un lieu et échantillon du soleil partagé par ses entrées."""
+
+    def __init__(self, hass: HomeAssistant, latitude, longitude):
+        """Initialiser le site sans démarrer de minuteur."""
+        self.hass = hass
+        self.key = (float(latitude), float(longitude))
+        self.ephemeris = SolarEphemeris(latitude, longitude)
+        # Dernier échantillon : horodatage POSIX, azimut, élévation
+        self._sample_time = None
+        self._sample = None
+        self._tick_listeners = []
+        self._unsub_tick = None
+        self.samples_computed = 0
+        self.samples_shared = 0
+
+    def position(self, timestamp):
+        """
+        Retourne (azimut, élévation) exacts du soleil à un instant. Les entrées
+        réveillées au même instant réutilisent le même calcul.
+        """
+        if timestamp == self._sample_time:
+            self.samples_shared += 1
+            return self._sample
+        azimuth, elevation = self.ephemeris.positions(timestamp)
+        self._sample_time = timestamp
+        self._sample = (float(azimuth), float(elevation))
+        self.samples_computed += 1
+        return self._sample
+
+    @callback
+    def async_add_tick_listener(self, tick_callback):
+        """
+        Appeler tick_callback(maintenant) à chaque rafraîchissement des mesures.
+        Un seul minuteur sert toutes les entrées du site ; retourne la fonction
+        de retrait.
+        """
+        self._tick_listeners.append(tick_callback)
+        if self._unsub_tick is None:
+            self._unsub_tick = async_track_time_interval(
+                self.hass, self._handle_tick, MEASUREMENT_REFRESH_INTERVAL
+            )
+
+        @callback
+        def _remove():
+            if tick_callback in self._tick_listeners:
+                self._tick_listeners.remove(tick_callback)
+            if not self._tick_listeners and self._unsub_tick is not None:
+                self._unsub_tick()
+                self._unsub_tick = None
+
+        return _remove
+
+    @callback
+    def _handle_tick(self, now):
+        """Un même instant pour toutes les entrées : une seule position calculée."""
+        for tick_callback in list(self._tick_listeners):
+            tick_callback(now)
+
+
+class EngineRegistry:
+    """
+    Registre des ressources partagées, unique pour le processus et rangé dans
+    hass.data[DOMAIN]. Chaque ressource acquise doit être relâchée.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        """Initialiser un registre vide."""
+        self.hass = hass
+        # Empreinte du profil -> [table compilée, références]
+        self._horizons = {}
+        # Chargements en cours, pour ne compiler qu'une fois un profil
+        # demandé par plusieurs entrées démarrées en même temps
+        self._loading = {}
+        # (latitude, longitude) -> [site, références]
+        self._sites = {}
+        # Taille du cache des positions demandée par chaque entrée chargée
+        self._cache_sizes = {}
+        # (empreinte de la configuration, date) -> intervalles rangés de la journée
+        self._schedules = OrderedDict()
+        self._schedule_pending = {}
+        self._schedule_store = Store(hass, SCHEDULE_STORAGE_VERSION, SCHEDULE_STORAGE_KEY)
+        self._schedule_load = None
+        self.schedule_hits = 0
+        self.schedule_misses = 0
+
+    async def async_acquire_horizon(self, data):
+        """
+        Retourne la table compilée du profil référencé par les données d'une
+        entrée, en ne la lisant et compilant qu'à sa première acquisition.
+        """
+        checksum = data.get(CONF_HORIZON_CHECKSUM)
+        interned = self._horizons.get(checksum)
+        if interned is None:
+            task = self._loading.get(checksum)
+            if task is None:
+                task = self._loading[checksum] = self.hass.async_create_task(
+                    async_load_horizon_table(self.hass, data)
+                )
+            try:
+                table = await task
+            finally:
+                self._loading.pop(checksum, None)
+            interned = self._horizons.setdefault(checksum, [table, 0])
+        interned[1] += 1
+        return interned[0]
+
+    @callback
+    def async_release_horizon(self, checksum):
+        """Relâcher une table ; la dernière référence la libère."""
+        interned = self._horizons.get(checksum)
+        if interned is None:
+            return
+        interned[1] -= 1
+        if interned[1] <= 0:
+            del self._horizons[checksum]
+            _LOGGER.debug("Profil d'horizon %s libéré", checksum)
+
+    def horizon_references(self, checksum):
+        """Nombre d'entrées qui partagent la table d'un profil."""
+        interned = self._horizons.get(checksum)
+        return 0 if interned is None else interned[1]
+
+    @callback
+    def async_acquire_site(self, latitude, longitude):
+        """Retourne le site partagé d'un lieu, créé à sa première acquisition."""
+        key = (float(latitude), float(longitude))
+        shared = self._sites.get(key)
+        if shared is None:
+            shared = self._sites[key] = [SunSite(self.hass, latitude, longitude), 0]
+        shared[1] += 1
+        return shared[0]
+
+    @callback
+    def async_release_site(self, site):
+        """Relâcher un site ; la dernière référence le libère."""
+        shared = self._sites.get(site.key)
+        if shared is None or shared[0] is not site:
+            return
+        shared[1] -= 1
+        if shared[1] <= 0:
+            del self._sites[site.key]
+
+    def site_references(self, site):
+        """Nombre d'entrées qui partagent un site."""
+        shared = self._sites.get(site.key)
+        return 0 if shared is None or shared[0] is not site else shared[1]
+
+    @callback
+    def async_set_cache_size(self, entry_id, size):
+        """Enregistrer la taille de cache demandée par une entrée et redimensionner."""
+        self._cache_sizes[entry_id] = size
+        self._async_resize_cache()
+
+    @callback
+    def async_clear_cache_size(self, entry_id):
+        """Oublier la taille demandée par une entrée déchargée et redimensionner."""
+        self._cache_sizes.pop(entry_id, None)
+        self._async_resize_cache()
+
+    @callback
+    def _async_resize_cache(self):
+        """La plus grande taille demandée l'emporte, à défaut la taille par défaut."""
+        POSITION_CACHE.resize(max(self._cache_sizes.values(), default=DEFAULT_POSITION_CACHE_SIZE))
+
+    async def async_load_schedules(self):
+        """Reprendre une seule fois les journées enregistrées au dernier arrêt."""
+        if self._schedule_load is None:
+            self._schedule_load = self.hass.async_create_task(self._async_load_schedules())
+        await self._schedule_load
+
+    async def _async_load_schedules(self):
+        """Lire et décoder hors de la boucle les journées encore à venir."""
+        stored = await self._schedule_store.async_load()
+        if not stored:
+            return
+        today = dt_util.now().date().isoformat()
+        upcoming = {
+            key: data for key, data in stored.get("days", {}).items()
+            if key.partition("|")[2] >= today
+        }
+        days = await self.hass.async_add_executor_job(_decode_days, upcoming)
+        for key, packed in days.items():
+            self._schedules.setdefault(key, packed)
+        _LOGGER.debug("%d journées reprises de %s", len(days), SCHEDULE_STORAGE_KEY)
+
+    @callback
+    def _schedules_to_store(self):
+        """Journées de la prévision, d'aujourd'hui aux jours qu'elle couvre."""
+        today = dt_util.now().date()
+        first = today.isoformat()
+        last = (today + timedelta(days=FORECAST_DAYS - 1)).isoformat()
+        return {
+            "days": {
+                f"{config_hash}|{day}": encode_packed(packed)
+                for (config_hash, day), packed in self._schedules.items()
+                if first <= day <= last
+            },
+        }
+
+    @callback
+    def async_cached_schedule_days(self, config_hash, days):
+        """
+        Journées déjà en cache, sans rien calculer : la suite de journées
+        consécutives depuis la première, éventuellement vide.
+        """
+        packed_days = []
+        for day, _, _ in days:
+            packed = self._schedules.get((config_hash, day))
+            if packed is None:
+                break
+            packed_days.append(packed)
+        return packed_days
+
+    async def async_get_schedule_days(self, config_hash, batch, ephemeris, days):
+        """
+        Retourne les intervalles rangés de chaque journée (date, début, fin),
+        lus dans le cache ou calculés une journée à la fois hors de la boucle
+        d'événements. Une journée déjà en calcul pour un autre appel est attendue.
+
+        Avec une bande morte, une journée dépend de l'état des fenêtres à la
+        fin de la précédente : toute la période est calculée d'un seul tenant,
+        sans passer par le cache.
+        """
+        if batch.has_deadband:
+            return await self.hass.async_add_executor_job(
+                compute_packed_days,
+                batch,
+                ephemeris,
+                [(start, end) for _, start, end in days],
+            )
+
+        packed_days = []
+        for day, start, end in days:
+            key = (config_hash, day)
+            packed = self._schedules.get(key)
+            if packed is not None:
+                self._schedules.move_to_end(key)
+                self.schedule_hits += 1
+                packed_days.append(packed)
+                continue
+
+            self.schedule_misses += 1
+            future = self._schedule_pending.get(key)
+            if future is None:
+                future = self._schedule_pending[key] = self.hass.async_add_executor_job(
+                    compute_packed_day, batch, ephemeris, start, end
+                )
+            try:
+                packed = await future
+            finally:
+                self._schedule_pending.pop(key, None)
+            self._schedules[key] = packed
+            self._schedules.move_to_end(key)
+            while len(self._schedules) > SCHEDULE_CACHE_DAYS:
+                self._schedules.popitem(last=False)
+            self._schedule_store.async_delay_save(self._schedules_to_store, SCHEDULE_SAVE_DELAY)
+            packed_days.append(packed)
+        return packed_days
+
+
+@callback
+def async_get_registry(hass: HomeAssistant):
+    """Retourne le registre du processus, créé au premier appel."""
+    data = hass.data.setdefault(DOMAIN, {})
+    registry = data.get(DATA_REGISTRY)
+    if registry is None:
+        registry = data[DATA_REGISTRY] = EngineRegistry(hass)
+    return registry
@@ -0,0 +1,73 @@
+"""Prédiction des instants de bascule des fenêtres."""
+import numpy as np
+
+# Pas d'échantillonnage de la trajectoire du soleil (secondes)
+SCAN_STEP = 60
+# Précision recherchée sur l'instant de bascule (secondes)
+PRECISION = 1.0
+
+
+def find_transitions(batch, ephemeris, start, end, states=None, step=SCAN_STEP, precision=PRECISION):
+    """
+    Trouve toutes les bascules des fenêtres entre deux horodatages POSIX.
+
+    La trajectoire du soleil est échantillonnée au pas donné et évaluée contre
+    toutes les fenêtres en un seul appel. Chaque changement d'état détecté
+    entre deux échantillons est ensuite affiné par dichotomie, toutes les
+    bascules à la fois, jusqu'à la précision demandée. Un aller-retour plus
+    court que le pas d'échantillonnage (soleil rasant l'horizon) est ignoré.
+
+    Avec une bande morte configurée, l'état le long de la trajectoire suit
+    l'hystérésis du lot depuis states, l'état des fenêtres au début de la
+    période (None : état évalué sans hystérésis au premier échantillon), et
+    la dichotomie applique les mêmes marges que l'échantillonnage.
+
+    Retourne les tableaux (instants, indices des fenêtres, nouveaux états),
+    triés par instant. Chaque instant est le premier où le nouvel état est
+    observé, à la précision près.
+    """
+    times = np.arange(start, end, step, dtype=float)
+    times = np.append(times, float(end))
+    azimuth, elevation = ephemeris.positions(times)
+    if batch.has_deadband:
+        if states is None:
+            states = batch.evaluate(azimuth[0], elevation[0]).is_on
+        is_on = _follow_hysteresis(batch, azimuth, elevation, states)
+    else:
+        is_on = batch.evaluate(azimuth, elevation).is_on
+
+    # Paires (échantillon, fenêtre) où l'état change avant l'échantillon suivant
+    samples, windows = np.nonzero(is_on[1:] != is_on[:-1])
+    low = times[samples]
+    high = times[samples + 1]
+    new_states = is_on[samples + 1, windows]
+
+    # Dichotomie vectorisée : l'ancien état vaut en low, le nouveau en high
+    while len(low) and (high - low).max() > precision:
+        middle = (low + high) / 2
+        azimuth, elevation = ephemeris.positions(middle)
+        reached = batch.evaluate_aligned(
+            azimuth, elevation, windows, ~new_states
+        ).is_on == new_states
+        high = np.where(reached, middle, high)
+        low = np.where(reached, low, middle)
+
+    order = np.argsort(high, kind="stable")
+    return high[order], windows[order], new_states[order]
+
+
+def _follow_hysteresis(batch, azimuth, elevation, states):
+    """
+    Suit l'état des fenêtres le long de la trajectoire avec hystérésis.
+    Une fenêtre s'allume selon les seuils stricts et s'éteint selon les seuils larges.
+    """
+    count = len(batch)
+    strict = batch.evaluate(azimuth, elevation, np.zeros(count, dtype=bool)).is_on
+    loose = batch.evaluate(azimuth, elevation, np.ones(count, dtype=bool)).is_on
+
+    is_on = np.empty_like(strict)
+    current = np.asarray(states, dtype=bool)
+    for sample in range(len(strict)):
+        current = np.where(current, loose[sample], strict[sample])
+        is_on[sample] = current
+    return is_on
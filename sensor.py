@@ -0,0 +1,350 @@
+"""Capteurs de prévision, de part éclairée et d'apports solaires de chaque fenêtre, et des groupes."""
+import logging
+from abc import abstractmethod
+from datetime import datetime
+
+from homeassistant.components.sensor import (
+    RestoreSensor,
+    SensorEntity,
+    SensorDeviceClass,
+    SensorStateClass,
+)
+from homeassistant.const import PERCENTAGE, UnitOfPower
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN, CONF_NAME, GROUP_LABELS, MEASUREMENT_SUNLIT, MEASUREMENT_HEAT_GAIN
+from .irradiance import glazing_area
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up the forecast sensors from a config entry."""
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    entry_id = config_entry.entry_id
+
+    # Capteurs de chaque fenêtre par nom, total des apports solaires de l'entrée
+    # et nombre de fenêtres au soleil de chaque groupe, par (sorte, valeur)
+    entities = {}
+    heat_gain_total = []
+    group_entities = {}
+
+    @callback
+    def _async_update_windows(added, removed, changed):
+        """Créer ou retirer les capteurs des fenêtres ajoutées, supprimées ou modifiées."""
+        registry = er.async_get(hass)
+        obsolete = []
+        new_entities = []
+
+        for name in removed:
+            obsolete.extend(entities.pop(name, []))
+        for window_conf in added:
+            entities[window_conf[CONF_NAME]] = _window_sensors(coordinator, window_conf, entry_id)
+            new_entities.extend(entities[window_conf[CONF_NAME]])
+
+        # Les apports solaires suivent la surface vitrée d'une fenêtre modifiée
+        for window_conf in changed:
+            window_entities = entities[window_conf[CONF_NAME]]
+            heat_gain = [
+                entity for entity in window_entities
+                if isinstance(entity, SunOnWindowHeatGainSensor)
+            ]
+            if glazing_area(window_conf) and not heat_gain:
+                entity = SunOnWindowHeatGainSensor(coordinator, window_conf[CONF_NAME], entry_id)
+                window_entities.append(entity)
+                new_entities.append(entity)
+            elif not glazing_area(window_conf) and heat_gain:
+                window_entities.remove(heat_gain[0])
+                obsolete.append(heat_gain[0])
+
+        # Total des apports solaires de toutes les fenêtres de l'entrée
+        has_heat_gain = any(
+            isinstance(entity, SunOnWindowHeatGainSensor)
+            for window_entities in entities.values()
+            for entity in window_entities
+        )
+        if has_heat_gain and not heat_gain_total:
+            heat_gain_total.append(SunOnWindowHeatGainSensor(coordinator, None, entry_id))
+            new_entities.append(heat_gain_total[0])
+        elif not has_heat_gain and heat_gain_total:
+            obsolete.append(heat_gain_total.pop())
+
+        # Les groupes changent avec les fenêtres
+        for key in [key for key in group_entities if key not in coordinator.groups.index]:
+            obsolete.append(group_entities.pop(key))
+        for key in coordinator.groups.keys:
+            if key not in group_entities:
+                group_entities[key] = SunOnWindowGroupCountSensor(coordinator, key, entry_id)
+                new_entities.append(group_entities[key])
+
+        for entity in obsolete:
+            if entity.entity_id:
+                registry.async_remove(entity.entity_id)
+        if new_entities:
+            async_add_entities(new_entities)
+
+    config_entry.async_on_unload(coordinator.async_add_window_listener(_async_update_windows))
+    _async_update_windows(coordinator.windows, [], [])
+
+
+def _window_sensors(coordinator, window_conf, config_entry_id):
+    """Créer les capteurs de prévision et de mesure d'une fenêtre configurée."""
+    name = window_conf[CONF_NAME]
+    entities = [
+        SunOnWindowNextStartSensor(coordinator, name, config_entry_id),
+        SunOnWindowNextEndSensor(coordinator, name, config_entry_id),
+        SunOnWindowSunlitSensor(coordinator, name, config_entry_id),
+    ]
+    # Les apports solaires demandent la surface vitrée de la fenêtre
+    if glazing_area(window_conf):
+        entities.append(SunOnWindowHeatGainSensor(coordinator, name, config_entry_id))
+    return entities
+
+
+class SunOnWindowForecastSensor(RestoreSensor):
+    """
+    Base des capteurs calculés à partir de la prévision d'une fenêtre. Tant que
+    la prévision n'est ni en cache ni calculée, la dernière valeur est reprise
+    si elle est encore à venir.
+    """
+
+    _attr_has_entity_name = True
+    _attr_device_class = SensorDeviceClass.TIMESTAMP
+    _attr_should_poll = False
+
+    def __init__(self, coordinator, name, config_entry_id, key):
+        """Initialiser le capteur."""
+        self._coordinator = coordinator
+        self._name = name
+        self._attr_unique_id = f"{config_entry_id}_{name}_{key}"
+        # Intervalles de la dernière écriture (None : jamais écrit)
+        self._intervals = None
+        self._registered = False
+
+    async def async_added_to_hass(self):
+        """Appelé lorsque l'entité est ajoutée à Home Assistant."""
+        self.async_on_remove(
+            self._coordinator.async_add_forecast_listener(
+                self._name, self._handle_forecast_update
+            )
+        )
+        last = None
+        if self._name not in self._coordinator.forecast:
+            last = await self.async_get_last_sensor_data()
+
+        # La valeur initiale est écrite par Home Assistant à la fin de l'ajout
+        if self._name in self._coordinator.forecast:
+            self._handle_forecast_update()
+        elif (
+            last is not None
+            and isinstance(last.native_value, datetime)
+            and last.native_value > dt_util.utcnow()
+        ):
+            self._attr_native_value = last.native_value
+        self._registered = True
+
+    @callback
+    def _handle_forecast_update(self):
+        """Recalculer la valeur à partir de la prévision en cache."""
+        intervals = self._coordinator.forecast.get(self._name, [])
+        now = dt_util.utcnow()
+        value = self._value_from_intervals(intervals, now)
+        # Rien à écrire si ni la valeur ni les intervalles prévus n'ont changé,
+        # par exemple quand la prévision est recalculée pour d'autres fenêtres
+        if intervals == self._intervals and value == self._attr_native_value:
+            return
+
+        self._intervals = intervals
+        self._attr_native_value = value
+        self._update_attributes(intervals)
+        if self._registered:
+            self.async_write_ha_state()
+
+    @abstractmethod
+    def _value_from_intervals(self, intervals, now):
+        """Retourne la valeur du capteur pour les intervalles prévus."""
+
+    def _update_attributes(self, intervals):
+        """Mettre à jour les attributs à partir des intervalles prévus."""
+
+
+class SunOnWindowNextStartSensor(SunOnWindowForecastSensor):
+    """Prochain début de soleil sur une fenêtre, avec la liste des intervalles prévus."""
+
+    # La liste des intervalles est disponible dans l'état courant uniquement
+    _unrecorded_attributes = frozenset({"intervals"})
+
+    def __init__(self, coordinator, name, config_entry_id):
+        """Initialiser le capteur."""
+        super().__init__(coordinator, name, config_entry_id, "next_start")
+
+    @property
+    def name(self):
+        """Retourne le nom du capteur."""
+        return f"Prochain soleil sur {self._name}"
+
+    def _value_from_intervals(self, intervals, now):
+        """Début du premier intervalle qui n'a pas encore commencé."""
+        for start, _ in intervals:
+            if start > now:
+                return start
+        return None
+
+    def _update_attributes(self, intervals):
+        """Liste compacte des intervalles prévus : [[début, fin], ...]."""
+        self._attr_extra_state_attributes = {
+            "intervals": [
+                [start.isoformat(timespec="seconds"), end.isoformat(timespec="seconds")]
+                for start, end in intervals
+            ],
+        }
+
+
+class SunOnWindowNextEndSensor(SunOnWindowForecastSensor):
+    """Prochaine fin de soleil sur une fenêtre."""
+
+    def __init__(self, coordinator, name, config_entry_id):
+        """Initialiser le capteur."""
+        super().__init__(coordinator, name, config_entry_id, "next_end")
+
+    @property
+    def name(self):
+        """Retourne le nom du capteur."""
+        return f"Fin du soleil sur {self._name}"
+
+    def _value_from_intervals(self, intervals, now):
+        """Fin de l'intervalle en cours, ou du prochain intervalle."""
+        for _, end in intervals:
+            if end > now:
+                return end
+        return None
+
+
+class SunOnWindowMeasurementSensor(SensorEntity):
+    """Base des mesures continues calculées par le coordinateur pour toutes les fenêtres."""
+
+    _attr_has_entity_name = True
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_should_poll = False
+
+    def __init__(self, coordinator, name, config_entry_id, measurement):
+        """Initialiser le capteur."""
+        self._coordinator = coordinator
+        self._name = name
+        self._measurement = measurement
+        self._registered = False
+        if name is None:
+            self._attr_unique_id = f"{config_entry_id}_{measurement}_total"
+        else:
+            self._attr_unique_id = f"{config_entry_id}_{name}_{measurement}"
+
+    @property
+    def window_name(self):
+        """Retourne le nom de la fenêtre mesurée (None pour le total de l'entrée)."""
+        return self._name
+
+    @property
+    def measurement(self):
+        """Retourne la clé de la mesure publiée par le coordinateur."""
+        return self._measurement
+
+    async def async_added_to_hass(self):
+        """Appelé lorsque l'entité est ajoutée à Home Assistant."""
+        # Le coordinateur calcule toutes les fenêtres en un appel et pousse la
+        # valeur initiale, écrite par Home Assistant à la fin de l'ajout
+        self.async_on_remove(self._coordinator.async_register_measurement(self))
+        self._registered = True
+
+    @callback
+    def async_update_measurement(self, value):
+        """Appliquer la valeur calculée par le coordinateur."""
+        self._attr_native_value = value
+        if self._registered:
+            self.async_write_ha_state()
+
+
+class SunOnWindowSunlitSensor(SunOnWindowMeasurementSensor):
+    """Part éclairée du vitrage d'une fenêtre, en pourcentage."""
+
+    _attr_native_unit_of_measurement = PERCENTAGE
+
+    def __init__(self, coordinator, name, config_entry_id):
+        """Initialiser le capteur."""
+        super().__init__(coordinator, name, config_entry_id, MEASUREMENT_SUNLIT)
+
+    @property
+    def name(self):
+        """Retourne le nom du capteur."""
+        return f"Part ensoleillée de {self._name}"
+
+
+class SunOnWindowHeatGainSensor(SunOnWindowMeasurementSensor):
+    """Apports solaires par ciel clair à travers le vitrage d'une fenêtre."""
+
+    _attr_device_class = SensorDeviceClass.POWER
+    _attr_native_unit_of_measurement = UnitOfPower.WATT
+
+    def __init__(self, coordinator, name, config_entry_id):
+        """Initialiser le capteur."""
+        super().__init__(coordinator, name, config_entry_id, MEASUREMENT_HEAT_GAIN)
+
+    @property
+    def name(self):
+        """Retourne le nom du capteur."""
+        if self._name is None:
+            return "Apports solaires totaux"
+        return f"Apports solaires de {self._name}"
+
+
+class SunOnWindowGroupCountSensor(SensorEntity):
+    """Nombre de fenêtres d'un groupe sur lesquelles le soleil tape."""
+
+    _attr_has_entity_name = True
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_should_poll = False
+
+    def __init__(self, coordinator, group_key, config_entry_id):
+        """Initialiser le capteur."""
+        self._coordinator = coordinator
+        self._group_key = group_key
+        self._state = None
+        self._registered = False
+        kind, value = group_key
+        self._attr_unique_id = f"{config_entry_id}_group_{kind}_{value}_sunlit_count"
+
+    @property
+    def name(self):
+        """Retourne le nom du capteur."""
+        kind, value = self._group_key
+        return f"Fenêtres au soleil sur {GROUP_LABELS[kind]} {value}"
+
+    @property
+    def group_key(self):
+        """Retourne la sorte et la valeur du groupe mesuré."""
+        return self._group_key
+
+    async def async_added_to_hass(self):
+        """Appelé lorsque l'entité est ajoutée à Home Assistant."""
+        self.async_on_remove(self._coordinator.async_register_group(self))
+        self._registered = True
+
+    @callback
+    def async_update_group(self, state):
+        """Appliquer l'état du groupe tenu à jour par le coordinateur."""
+        # La prochaine bascule seule ne change pas le nombre de fenêtres au soleil
+        if self._state is not None and state[:2] == self._state[:2]:
+            return
+
+        self._state = state
+        self._attr_native_value = state.sunlit_count
+        self._attr_extra_state_attributes = {"window_count": state.window_count}
+        if self._registered:
+            self.async_write_ha_state()
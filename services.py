@@ -0,0 +1,128 @@
+"""Services du composant Sun on Window."""
+from datetime import datetime
+
+import voluptuous as vol
+
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import ServiceValidationError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DOMAIN,
+    CONF_WINDOWS,
+    SERVICE_GET_SCHEDULE,
+    ATTR_CONFIG_ENTRY_ID,
+    ATTR_START_DATE,
+    ATTR_END_DATE,
+    SCHEDULE_MAX_DAYS,
+)
+from .forecast import merge_packed
+from .registry import async_get_registry, local_days
+
+GET_SCHEDULE_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+    vol.Required(ATTR_START_DATE): cv.date,
+    vol.Optional(ATTR_END_DATE): cv.date,
+    vol.Optional(CONF_WINDOWS): vol.All(cv.ensure_list, [cv.string]),
+})
+
+
+def _format_schedule(packed_days, batch, names, time_zone):
+    """
+    Intervalles fusionnés des fenêtres nommées, en dates et heures locales
+    ISO 8601. Exécuté hors de la boucle d'événements : une année de milliers
+    de fenêtres représente des centaines de milliers d'intervalles.
+    """
+    merged = merge_packed(packed_days, [batch.index[name] for name in names])
+    return {
+        name: [
+            {
+                "start": datetime.fromtimestamp(start, time_zone).isoformat(),
+                "end": datetime.fromtimestamp(end, time_zone).isoformat(),
+            }
+            for start, end in intervals
+        ]
+        for name, intervals in zip(names, merged)
+    }
+
+
+@callback
+def async_setup_services(hass: HomeAssistant):
+    """Register the services of the integration."""
+
+    async def async_get_schedule(call: ServiceCall) -> ServiceResponse:
+        """Return the merged sun intervals of each window over a date range."""
+        start_date = call.data[ATTR_START_DATE]
+        end_date = call.data.get(ATTR_END_DATE, start_date)
+        if end_date < start_date:
+            raise ServiceValidationError("La date de fin précède la date de début")
+        if (end_date - start_date).days >= SCHEDULE_MAX_DAYS:
+            raise ServiceValidationError(
+                f"La période ne peut pas dépasser {SCHEDULE_MAX_DAYS} jours"
+            )
+
+        coordinators = hass.data.get(DOMAIN, {})
+        entries = [
+            entry for entry in hass.config_entries.async_entries(DOMAIN)
+            if entry.entry_id in coordinators
+        ]
+        if ATTR_CONFIG_ENTRY_ID in call.data:
+            entries = [
+                entry for entry in entries if entry.entry_id == call.data[ATTR_CONFIG_ENTRY_ID]
+            ]
+            if not entries:
+                raise ServiceValidationError(
+                    f"Entrée {call.data[ATTR_CONFIG_ENTRY_ID]} introuvable ou non chargée"
+                )
+
+        requested = set(call.data.get(CONF_WINDOWS, []))
+        if requested:
+            known = {
+                name for entry in entries for name in coordinators[entry.entry_id].batch.names
+            }
+            unknown = sorted(requested - known)
+            if unknown:
+                raise ServiceValidationError(f"Fenêtres inconnues : {', '.join(unknown)}")
+
+        days = local_days(start_date, end_date)
+        registry = async_get_registry(hass)
+        schedules = {}
+        for entry in entries:
+            coordinator = coordinators[entry.entry_id]
+            # Lot figé pour l'appel : une modification de la configuration
+            # pendant le calcul ne mélange pas deux lots
+            batch = coordinator.batch
+            names = [name for name in batch.names if not requested or name in requested]
+            if not names:
+                continue
+
+            packed_days = await registry.async_get_schedule_days(
+                coordinator.schedule_hash, batch, coordinator.ephemeris, days
+            )
+            schedules[entry.entry_id] = {
+                "title": entry.title,
+                CONF_WINDOWS: await hass.async_add_executor_job(
+                    _format_schedule, packed_days, batch, names, dt_util.DEFAULT_TIME_ZONE
+                ),
+            }
+
+        return {
+            ATTR_START_DATE: start_date.isoformat(),
+            ATTR_END_DATE: end_date.isoformat(),
+            "entries": schedules,
+        }
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_SCHEDULE,
+        async_get_schedule,
+        schema=GET_SCHEDULE_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
@@ -0,0 +1,299 @@
+"""
+Simulation annuelle hors ligne de l'ensoleillement des fenêtres.
+
+Utilisable sans Home Assistant installé : lancé comme script, le module
+charge les modules de calcul du composant sans exécuter son __init__, qui
+importe Home Assistant. Depuis le dossier de configuration :
+
+    python custom_components/sun_on_window/simulate.py .storage/core.config_entries \
+        --latitude 46.52 --longitude 6.63 --timezone Europe/Zurich \
+        --step 60 --output soleil.csv --heatmap carte.csv
+
+Avec Home Assistant installé, python -m custom_components.sun_on_window.simulate
+fonctionne aussi.
+
+Le fichier de configuration est soit le registre des entrées de Home
+Assistant (.storage/core.config_entries), dont le profil d'horizon est lu
+dans le fichier .storage qu'il référence, soit un fichier JSON contenant
+directement horizon_profile et windows. L'année est découpée en journées
+réparties entre les processus d'un pool ; chaque journée est évaluée en un
+seul appel vectorisé et écrite dès qu'elle est prête, sans jamais garder la
+matrice complète instants × fenêtres en mémoire.
+
+Les bandes mortes et la durée minimale entre bascules ne sont pas simulées.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import types
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+if not __package__:
+    # Lancé comme script : paquet nu à la place du composant, pour que les
+    # imports relatifs n'exécutent pas le __init__ qui importe Home Assistant
+    _directory = os.path.dirname(os.path.abspath(__file__))
+    __package__ = os.path.basename(_directory)
+    if __package__ not in sys.modules:
+        _bare = sys.modules[__package__] = types.ModuleType(__package__)
+        _bare.__path__ = [_directory]
+
+from .const import DOMAIN, CONF_HORIZON_PROFILE, CONF_HORIZON_STORE, CONF_WINDOWS
+from .engine import WindowBatch
+from .ephemeris import solar_position
+from .horizon import HorizonTable, profile_points, unpack_profile
+
+# Lot et position du site de chaque processus de calcul
+_worker = {}
+
+
+def load_config(path, entry_id=None):
+    """Retourne (profil d'horizon, fenêtres) d'un fichier de configuration."""
+    with open(path, encoding="utf-8") as file:
+        data = json.load(file)
+
+    # Registre des entrées de Home Assistant
+    entries = data.get("data", {}).get("entries") if isinstance(data.get("data"), dict) else None
+    if entries is not None:
+        entries = [
+            entry for entry in entries
+            if entry.get("domain") == DOMAIN
+            and (entry_id is None or entry.get("entry_id") == entry_id)
+        ]
+        if not entries:
+            raise ValueError(f"Aucune entrée {DOMAIN} dans {path}")
+        data = entries[0]["data"]
+
+    # Profil enregistré à côté du registre, sous forme compacte
+    if CONF_HORIZON_STORE in data:
+        with open(os.path.join(os.path.dirname(path), data[CONF_HORIZON_STORE]), encoding="utf-8") as file:
+            return profile_points(*unpack_profile(json.load(file)["data"])), data[CONF_WINDOWS]
+
+    return data[CONF_HORIZON_PROFILE], data[CONF_WINDOWS]
+
+
+def year_days(year, timezone):
+    """Liste des journées locales de l'année : (début, fin) en secondes POSIX et mois."""
+    days = []
+    day = datetime(year, 1, 1, tzinfo=timezone)
+    while day.year == year:
+        following = datetime.combine(day.date() + timedelta(days=1), day.timetz())
+        days.append((day.timestamp(), following.timestamp(), day.month))
+        day = following
+    return days
+
+
+def _init_worker(horizon_profile, windows, latitude, longitude, timezone):
+    """Construire une seule fois le lot de fenêtres de chaque processus."""
+    _worker["batch"] = WindowBatch(windows, HorizonTable.from_profile(horizon_profile))
+    _worker["site"] = (latitude, longitude)
+    _worker["timezone"] = ZoneInfo(timezone)
+
+
+def simulate_day(start, end, step):
+    """
+    Évalue toutes les fenêtres sur une journée, dans un processus de calcul.
+    Retourne les horodatages, les états (instants × fenêtres) et les heures de
+    soleil par heure locale (24 × fenêtres).
+    """
+    timestamps = np.arange(start, end, step)
+    azimuth, elevation = solar_position(*_worker["site"], timestamps)
+    is_on = _worker["batch"].evaluate(azimuth, elevation).is_on
+
+    hours = _local_hours(timestamps, _worker["timezone"])
+    hourly = np.zeros((24, is_on.shape[1]))
+    np.add.at(hourly, hours, is_on * (step / 3600))
+    return timestamps, is_on, hourly
+
+
+def _local_hours(timestamps, timezone):
+    """Heure locale de chaque horodatage, en tenant compte des changements d'heure."""
+    first = timezone.utcoffset(datetime.fromtimestamp(timestamps[0], timezone))
+    last = timezone.utcoffset(datetime.fromtimestamp(timestamps[-1], timezone))
+    if first == last:
+        offsets = first.total_seconds()
+    else:
+        offsets = np.array([
+            timezone.utcoffset(datetime.fromtimestamp(ts, timezone)).total_seconds()
+            for ts in timestamps.tolist()
+        ])
+    return ((timestamps + offsets) // 3600 % 24).astype(int)
+
+
+class CsvWriter:
+    """Écriture en flux d'une ligne par instant : time,fenêtre1,fenêtre2,... en 0/1."""
+
+    def __init__(self, path, names, total):
+        """Ouvrir le fichier et écrire l'en-tête."""
+        self._file = open(path, "wb")
+        # Noms libres : en-tête écrit par le module csv, qui les met entre guillemets
+        header = io.StringIO()
+        csv.writer(header, lineterminator="\n").writerow(["time", *names])
+        self._file.write(header.getvalue().encode())
+
+    def write(self, timestamps, is_on):
+        """Écrire une journée sans boucle Python par ligne."""
+        times = np.datetime_as_string(timestamps.astype("datetime64[s]"), timezone="UTC")
+        rows = np.empty((len(timestamps), 21 + 2 * is_on.shape[1]), dtype=np.uint8)
+        rows[:, :20] = np.frombuffer(times.astype("S20").tobytes(), dtype=np.uint8).reshape(-1, 20)
+        rows[:, 20::2] = ord(",")
+        rows[:, 21::2] = is_on + ord("0")
+        rows[:, -1] = ord("\n")
+        self._file.write(rows.tobytes())
+
+    def close(self):
+        """Fermer le fichier."""
+        self._file.close()
+
+
+class ColumnarWriter:
+    """
+    Écriture en flux dans un tableau .npy booléen (instants × fenêtres) rangé par
+    colonnes, mappé en mémoire : chaque fenêtre est contiguë sur le disque.
+    Les horodatages sont écrits à côté, dans un fichier .times.npy.
+    """
+
+    def __init__(self, path, names, total):
+        """Créer les fichiers à leur taille finale."""
+        self._states = np.lib.format.open_memmap(
+            path, mode="w+", dtype=bool, shape=(total, len(names)), fortran_order=True
+        )
+        self._times = np.lib.format.open_memmap(
+            os.path.splitext(path)[0] + ".times.npy", mode="w+", dtype=np.int64, shape=(total,)
+        )
+        self._position = 0
+
+    def write(self, timestamps, is_on):
+        """Écrire une journée à la suite des précédentes."""
+        end = self._position + len(timestamps)
+        self._states[self._position:end] = is_on
+        self._times[self._position:end] = timestamps
+        self._position = end
+
+    def close(self):
+        """Vider les fichiers sur le disque."""
+        self._states.flush()
+        self._times.flush()
+        del self._states, self._times
+
+
+def simulate_year(
+    horizon_profile,
+    windows,
+    latitude,
+    longitude,
+    year,
+    step=60,
+    timezone="UTC",
+    writer=None,
+    workers=None,
+):
+    """
+    Simule une année complète et retourne la carte des heures de soleil
+    (mois × heure locale × fenêtres). Les états de chaque instant sont passés
+    au fil de l'eau à writer.write(horodatages, états), dans l'ordre.
+    """
+    days = year_days(year, ZoneInfo(timezone))
+    heatmap = np.zeros((12, 24, len(windows)))
+    workers = workers or os.cpu_count() or 1
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(horizon_profile, windows, latitude, longitude, timezone),
+    ) as pool:
+        # Quelques journées d'avance seulement, pour borner la mémoire
+        # quand l'écriture est plus lente que le calcul
+        pending = deque()
+        for start, end, month in days:
+            pending.append((month, pool.submit(simulate_day, start, end, step)))
+            if len(pending) > 2 * workers:
+                _collect(*pending.popleft(), heatmap, writer)
+        while pending:
+            _collect(*pending.popleft(), heatmap, writer)
+
+    return heatmap
+
+
+def _collect(month, future, heatmap, writer):
+    """Ajouter une journée calculée à la carte et l'écrire."""
+    timestamps, is_on, hourly = future.result()
+    heatmap[month - 1] += hourly
+    if writer is not None:
+        writer.write(timestamps, is_on)
+
+
+def main(argv=None):
+    """Point d'entrée de la ligne de commande."""
+    parser = argparse.ArgumentParser(
+        prog="python -m custom_components.sun_on_window.simulate",
+        description="Simulation annuelle de l'ensoleillement des fenêtres.",
+    )
+    parser.add_argument("config", help="core.config_entries ou JSON avec horizon_profile et windows")
+    parser.add_argument("--entry-id", help="entrée à simuler dans core.config_entries")
+    parser.add_argument("--latitude", type=float, required=True)
+    parser.add_argument("--longitude", type=float, required=True)
+    parser.add_argument("--year", type=int, default=datetime.now().year)
+    parser.add_argument("--step", type=int, default=60, help="pas en secondes (60 minimum)")
+    parser.add_argument("--timezone", default="UTC", help="fuseau des heures de la carte")
+    parser.add_argument("--output", help="états par instant : .csv ou .npy (par colonnes)")
+    parser.add_argument("--heatmap", help="heures de soleil par fenêtre, mois et heure (CSV)")
+    parser.add_argument("--workers", type=int, help="nombre de processus")
+    args = parser.parse_args(argv)
+
+    if args.step < 60:
+        parser.error("le pas minimal est de 60 secondes")
+
+    horizon_profile, windows = load_config(args.config, args.entry_id)
+    names = [window["name"] for window in windows]
+
+    writer = None
+    if args.output:
+        total = sum(
+            len(range(0, int(end - start), args.step))
+            for start, end, _ in year_days(args.year, ZoneInfo(args.timezone))
+        )
+        writer_class = ColumnarWriter if args.output.endswith(".npy") else CsvWriter
+        writer = writer_class(args.output, names, total)
+
+    try:
+        heatmap = simulate_year(
+            horizon_profile,
+            windows,
+            args.latitude,
+            args.longitude,
+            args.year,
+            args.step,
+            args.timezone,
+            writer,
+            args.workers,
+        )
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if args.heatmap:
+        with open(args.heatmap, "w", encoding="utf-8", newline="") as file:
+            rows = csv.writer(file, lineterminator="\n")
+            rows.writerow(["window", "month", *(f"h{hour:02d}" for hour in range(24))])
+            for index, name in enumerate(names):
+                for month in range(12):
+                    rows.writerow(
+                        [name, month + 1, *(f"{value:.2f}" for value in heatmap[month, :, index])]
+                    )
+
+    # Résumé : heures de soleil annuelles par fenêtre
+    for name, hours in zip(names, heatmap.sum(axis=(0, 1))):
+        print(f"{name}\t{hours:.1f} h")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
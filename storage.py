@@ -0,0 +1,83 @@
+"""Enregistrement des profils d'horizon hors des entrées de configuration."""
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, CONF_HORIZON_STORE, CONF_HORIZON_CHECKSUM
+from .horizon import HorizonTable, pack_profile, profile_summary
+
+STORAGE_VERSION = 1
+
+
+class HorizonStorageError(Exception):
+    """Profil d'horizon enregistré absent ou corrompu."""
+
+
+def horizon_storage_key(checksum):
+    """
+    Clé du fichier d'un profil dans .storage, dérivée de son contenu :
+    des entrées au même profil partagent le même fichier.
+    """
+    return f"{DOMAIN}.horizon_{checksum[:16]}"
+
+
+async def async_save_horizon(hass: HomeAssistant, horizon_profile):
+    """
+    Encode et enregistre un profil d'horizon.
+    Retourne la référence à conserver dans les données de l'entrée.
+    """
+    packed = await hass.async_add_executor_job(pack_profile, horizon_profile)
+    key = horizon_storage_key(packed["checksum"])
+    await Store(hass, STORAGE_VERSION, key).async_save(packed)
+    return {CONF_HORIZON_STORE: key, CONF_HORIZON_CHECKSUM: packed["checksum"]}
+
+
+async def _async_load_packed(hass: HomeAssistant, data):
+    """Lire le profil compact référencé par les données d'une entrée."""
+    packed = await Store(hass, STORAGE_VERSION, data[CONF_HORIZON_STORE]).async_load()
+    if packed is None:
+        raise HorizonStorageError(f"Profil d'horizon {data[CONF_HORIZON_STORE]} introuvable")
+    if packed.get("checksum") != data.get(CONF_HORIZON_CHECKSUM):
+        raise HorizonStorageError(
+            f"Le profil d'horizon {data[CONF_HORIZON_STORE]} ne correspond pas à l'entrée"
+        )
+    return packed
+
+
+async def async_load_horizon_table(hass: HomeAssistant, data):
+    """Lire et compiler hors de la boucle d'événements le profil d'horizon d'une entrée."""
+    packed = await _async_load_packed(hass, data)
+    try:
+        return await hass.async_add_executor_job(HorizonTable.from_packed, packed)
+    except ValueError as err:
+        raise HorizonStorageError(str(err)) from err
+
+
+async def async_load_horizon_summary(hass: HomeAssistant, data):
+    """
+    Lire le résumé du profil d'horizon d'une entrée, sans construire la liste
+    de ses points : nombre de points, plages, somme de contrôle.
+    """
+    packed = await _async_load_packed(hass, data)
+    try:
+        return await hass.async_add_executor_job(profile_summary, packed)
+    except ValueError as err:
+        raise HorizonStorageError(str(err)) from err
+
+
+async def async_summarize_horizon(hass: HomeAssistant, horizon_profile):
+    """Résumé d'un profil d'horizon pas encore enregistré, calculé hors de la boucle."""
+    return await hass.async_add_executor_job(_summarize_profile, horizon_profile)
+
+
+def _summarize_profile(horizon_profile):
+    """Encoder un profil pour en tirer le résumé et sa somme de contrôle."""
+    return profile_summary(pack_profile(horizon_profile))
+
+
+async def async_release_horizon(hass: HomeAssistant, key, entry: ConfigEntry = None):
+    """Supprimer un profil enregistré qu'aucune autre entrée ne référence plus."""
+    for other in hass.config_entries.async_entries(DOMAIN):
+        if other is not entry and other.data.get(CONF_HORIZON_STORE) == key:
+            return
+    await Store(hass, STORAGE_VERSION, key).async_remove()
@@ -0,0 +1 @@
+"""Tests du composant Sun on Window."""
@@ -0,0 +1,53 @@
+"""Comparaison de l'éphéméride locale avec astral, utilisé par l'entité sun.sun."""
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+from astral import Observer
+from astral.sun import azimuth, elevation
+
+from ..ephemeris import solar_position
+
+# Écarts maximaux tolérés avec sun.sun, en degrés
+ELEVATION_TOLERANCE = 0.01
+AZIMUTH_TOLERANCE = 0.05
+
+SITES = [
+    (-66.0, 140.0),
+    (-33.9, 151.2),
+    (0.0, -78.5),
+    (23.4, 90.4),
+    (46.52, 6.63),
+    (60.2, 24.9),
+    (69.6, -122.4),
+]
+
+
+def _timestamps(count=400, seed=0):
+    """Instants répartis de 1950 à 2050, à toutes les heures du jour."""
+    start = datetime(1950, 1, 1, tzinfo=timezone.utc).timestamp()
+    end = datetime(2050, 1, 1, tzinfo=timezone.utc).timestamp()
+    return np.random.default_rng(seed).uniform(start, end, count)
+
+
+@pytest.mark.parametrize(("latitude", "longitude"), SITES)
+def test_position_matches_sun_entity(latitude, longitude):
+    """Azimut et élévation à la tolérance près, soleil levé ou tout juste couché."""
+    timestamps = _timestamps()
+    azimuths, elevations = solar_position(latitude, longitude, timestamps)
+
+    observer = Observer(latitude, longitude)
+    compared = 0
+    for timestamp, computed_azimuth, computed_elevation in zip(
+        timestamps.tolist(), azimuths.tolist(), elevations.tolist()
+    ):
+        when = datetime.fromtimestamp(timestamp, timezone.utc)
+        expected_elevation = elevation(observer, when)
+        # Sous l'horizon, la réfraction diffère ; au zénith, l'azimut n'est pas défini
+        if not -1 <= expected_elevation <= 85:
+            continue
+        compared += 1
+        assert abs(computed_elevation - expected_elevation) <= ELEVATION_TOLERANCE
+        azimuth_error = (computed_azimuth - azimuth(observer, when) + 180) % 360 - 180
+        assert abs(azimuth_error) <= AZIMUTH_TOLERANCE
+    assert compared > 50
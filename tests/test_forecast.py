@@ -0,0 +1,105 @@
+"""Tests de la prévision rangée journée par journée."""
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from ..engine import WindowBatch
+from ..ephemeris import SolarEphemeris
+from ..forecast import (
+    compute_intervals,
+    compute_packed_day,
+    compute_packed_days,
+    decode_packed,
+    encode_packed,
+    merge_packed,
+    pack_intervals,
+)
+from ..horizon import HorizonTable
+
+START = datetime(2024, 6, 21, 0, 0, tzinfo=timezone.utc).timestamp()
+DAY = 86400
+
+# Soleil de minuit à Tromsø : à minuit UTC, le soleil au nord est sous
+# l'horizon de 5° mais dans la bande morte de 2°
+WINDOWS = [
+    {"name": "nord", "start_azimuth": 300.0, "end_azimuth": 60.0, "max_elevation": 60.0},
+    {"name": "sud", "start_azimuth": 135.0, "end_azimuth": 225.0, "max_elevation": 45.0},
+]
+PROFILE = [{"azimuth": float(azimuth), "elevation": 5.0} for azimuth in range(0, 360, 10)]
+
+
+def _as_lists(intervals):
+    return [[list(interval) for interval in window] for window in intervals]
+
+
+def test_packed_days_follow_hysteresis_across_midnight():
+    """Deux journées rangées puis fusionnées donnent le calcul d'un seul tenant."""
+    batch = WindowBatch(WINDOWS, HorizonTable.from_profile(PROFILE), 2.0, 2.0)
+    ephemeris = SolarEphemeris(69.65, 18.96)
+    days = [(START, START + DAY), (START + DAY, START + 2 * DAY)]
+
+    continuous = _as_lists(compute_intervals(batch, ephemeris, START, START + 2 * DAY))
+    packed = merge_packed(compute_packed_days(batch, ephemeris, days), range(len(batch)))
+    assert packed == continuous
+
+    # Journées calculées chacune de leur côté : l'hystérésis repart à minuit
+    separate = merge_packed(
+        [compute_packed_day(batch, ephemeris, start, end) for start, end in days],
+        range(len(batch)),
+    )
+    assert separate != continuous
+
+
+def test_merge_joins_intervals_at_midnight():
+    """Un intervalle coupé à minuit est recollé ; deux intervalles disjoints non."""
+    midnight = START + DAY
+    days = [
+        pack_intervals([[(START + 100, midnight)], [(START + 200, START + 300)], []]),
+        pack_intervals([[(midnight, midnight + 50)], [(midnight + 10, midnight + 20)], []]),
+    ]
+    assert merge_packed(days, [0, 1, 2]) == [
+        [[START + 100, midnight + 50]],
+        [[START + 200, START + 300], [midnight + 10, midnight + 20]],
+        [],
+    ]
+    # Fenêtres demandées dans un autre ordre
+    assert merge_packed(days, [2, 0]) == [[], [[START + 100, midnight + 50]]]
+    assert merge_packed([], [0, 1]) == [[], []]
+
+
+def test_merge_matches_continuous_run():
+    """Sans bande morte, les journées calculées séparément se recollent aussi."""
+    batch = WindowBatch(WINDOWS, HorizonTable.from_profile(PROFILE))
+    ephemeris = SolarEphemeris(69.65, 18.96)
+    days = [(START + day * DAY, START + (day + 1) * DAY) for day in range(3)]
+
+    continuous = _as_lists(compute_intervals(batch, ephemeris, START, START + 3 * DAY))
+    separate = [compute_packed_day(batch, ephemeris, start, end) for start, end in days]
+    assert merge_packed(separate, range(len(batch))) == continuous
+
+
+def test_encode_round_trip():
+    """Une journée encodée est relue à l'identique."""
+    offsets, bounds = pack_intervals([[(1.5, 2.5), (3.0, 4.0)], [], [(5.0, 6.25)]])
+    decoded_offsets, decoded_bounds = decode_packed(encode_packed((offsets, bounds)))
+    assert decoded_offsets.tolist() == offsets.tolist()
+    assert np.array_equal(decoded_bounds, bounds)
+
+
+def test_decode_rejects_truncated_data():
+    """Données tronquées, altérées ou incomplètes : ValueError, jamais de tableaux faux."""
+    data = encode_packed(pack_intervals([[(1.5, 2.5), (3.0, 4.0)], [(5.0, 6.0)]]))
+    shorter = encode_packed(pack_intervals([[(1.5, 2.5)], [(5.0, 6.0)]]))
+    empty = encode_packed((np.zeros(0, dtype=np.int32), np.zeros((0, 2))))
+
+    for broken in (
+        {"offsets": data["offsets"]},
+        dict(data, bounds=data["bounds"][:-4]),
+        dict(data, bounds="pas du base64 !"),
+        dict(data, bounds=None),
+        dict(data, bounds=shorter["bounds"]),
+        dict(data, offsets=empty["offsets"]),
+    ):
+        with pytest.raises(ValueError):
+            decode_packed(broken)
@@ -0,0 +1,146 @@
+"""Tests de la table d'horizon compilée et du profil compact enregistré."""
+import numpy as np
+import pytest
+
+from ..const import CONF_AZIMUTH, CONF_ELEVATION
+from ..horizon import PACKED_SCALE, HorizonTable, pack_profile, profile_summary, unpack_profile
+
+# Écart maximal toléré avec l'interpolation d'origine, en degrés
+TOLERANCE = 1e-9
+
+PROFILES = [
+    # Deux points : un seul segment et le segment de bouclage
+    [{CONF_AZIMUTH: 90.0, CONF_ELEVATION: 3.0}, {CONF_AZIMUTH: 270.0, CONF_ELEVATION: 8.0}],
+    # Premier point loin de 0° et dernier loin de 360° : bouclage sur un grand écart
+    [
+        {CONF_AZIMUTH: 40.0, CONF_ELEVATION: 12.0},
+        {CONF_AZIMUTH: 130.0, CONF_ELEVATION: 2.0},
+        {CONF_AZIMUTH: 200.0, CONF_ELEVATION: 6.5},
+        {CONF_AZIMUTH: 300.0, CONF_ELEVATION: -1.0},
+    ],
+    # Points à 0° et 360°, non triés
+    [
+        {CONF_AZIMUTH: 360.0, CONF_ELEVATION: 4.0},
+        {CONF_AZIMUTH: 180.0, CONF_ELEVATION: 10.0},
+        {CONF_AZIMUTH: 0.0, CONF_ELEVATION: 4.0},
+        {CONF_AZIMUTH: 90.0, CONF_ELEVATION: 3.0},
+    ],
+]
+
+
+def _reference_elevation(horizon_profile, current_azimuth):
+    """Interpolation linéaire d'origine, point par point, azimut dans [0, 360[."""
+    sorted_profile = sorted(horizon_profile, key=lambda x: x[CONF_AZIMUTH])
+    for i in range(len(sorted_profile)):
+        if sorted_profile[i][CONF_AZIMUTH] > current_azimuth:
+            if i == 0:
+                point1 = sorted_profile[-1]
+                point1_azimuth = point1[CONF_AZIMUTH] - 360
+                point2 = sorted_profile[0]
+            else:
+                point1 = sorted_profile[i - 1]
+                point1_azimuth = point1[CONF_AZIMUTH]
+                point2 = sorted_profile[i]
+            point2_azimuth = point2[CONF_AZIMUTH]
+            if point2_azimuth == point1_azimuth:
+                return point1[CONF_ELEVATION]
+            ratio = (current_azimuth - point1_azimuth) / (point2_azimuth - point1_azimuth)
+            return point1[CONF_ELEVATION] + ratio * (point2[CONF_ELEVATION] - point1[CONF_ELEVATION])
+
+    point1 = sorted_profile[-1]
+    point2 = sorted_profile[0]
+    ratio = (current_azimuth - point1[CONF_AZIMUTH]) / (
+        point2[CONF_AZIMUTH] + 360 - point1[CONF_AZIMUTH]
+    )
+    return point1[CONF_ELEVATION] + ratio * (point2[CONF_ELEVATION] - point1[CONF_ELEVATION])
+
+
+def _random_profile(count, seed=0):
+    """Profil irrégulier de count points, élévations aléatoires."""
+    rng = np.random.default_rng(seed)
+    azimuths = np.sort(rng.choice(np.arange(0, 360, 0.1), count, replace=False))
+    return [
+        {CONF_AZIMUTH: float(azimuth), CONF_ELEVATION: float(elevation)}
+        for azimuth, elevation in zip(azimuths, rng.uniform(-2, 20, count))
+    ]
+
+
+@pytest.mark.parametrize(
+    "horizon_profile", PROFILES + [_random_profile(50), _random_profile(3000, seed=1)]
+)
+def test_table_matches_reference(horizon_profile):
+    """Même élévation que l'interpolation d'origine, y compris autour de 0°/360°."""
+    table = HorizonTable.from_profile(horizon_profile)
+    azimuths = np.concatenate([
+        np.random.default_rng(2).uniform(0, 360, 2000),
+        [point[CONF_AZIMUTH] % 360 for point in horizon_profile],
+        [0.0, 1e-9, 359.999999, np.nextafter(360.0, 0)],
+    ])
+
+    expected = np.array([_reference_elevation(horizon_profile, a) for a in azimuths])
+    scalar = np.array([table.elevation_at(float(a)) for a in azimuths])
+    assert np.abs(scalar - expected).max() <= TOLERANCE
+    assert np.abs(table.elevations_at(azimuths) - expected).max() <= TOLERANCE
+
+
+def test_azimuth_wraps_around():
+    """Un azimut hors de [0, 360[ est ramené dans le tour."""
+    table = HorizonTable.from_profile(PROFILES[1])
+    for azimuth in (-30.0, 10.0, 350.0):
+        for turns in (-2, 1, 3):
+            assert table.elevation_at(azimuth + 360 * turns) == pytest.approx(
+                table.elevation_at(azimuth % 360), abs=TOLERANCE
+            )
+
+
+def test_too_few_points():
+    """Moins de deux points : pas de table, comme l'interpolation d'origine."""
+    assert HorizonTable.from_profile([]) is None
+    assert HorizonTable.from_profile(PROFILES[0][:1]) is None
+
+
+def test_pack_round_trip():
+    """Profil compact relu à l'identique, au cent-millième de degré près, trié."""
+    horizon_profile = _random_profile(3000, seed=3)
+    packed = pack_profile(horizon_profile[::-1])
+    azimuths, elevations = unpack_profile(packed)
+
+    assert packed["count"] == len(horizon_profile)
+    assert np.all(np.diff(azimuths) > 0)
+    expected = np.array([[p[CONF_AZIMUTH], p[CONF_ELEVATION]] for p in horizon_profile])
+    assert np.abs(azimuths - expected[:, 0]).max() <= 0.5 / PACKED_SCALE
+    assert np.abs(elevations - expected[:, 1]).max() <= 0.5 / PACKED_SCALE
+
+    # Même contenu, même somme de contrôle ; la table relue est la même
+    assert pack_profile(horizon_profile)["checksum"] == packed["checksum"]
+    table = HorizonTable.from_packed(packed)
+    assert len(table) == len(horizon_profile)
+
+
+def test_packed_checksum_detects_changes():
+    """Un point modifié change la somme de contrôle ; des données altérées sont refusées."""
+    horizon_profile = _random_profile(50)
+    packed = pack_profile(horizon_profile)
+    changed = [dict(point) for point in horizon_profile]
+    changed[10][CONF_ELEVATION] += 0.001
+    assert pack_profile(changed)["checksum"] != packed["checksum"]
+
+    with pytest.raises(ValueError):
+        unpack_profile(dict(packed, elevation=pack_profile(changed)["elevation"]))
+    with pytest.raises(ValueError):
+        unpack_profile(dict(packed, count=packed["count"] - 1))
+    with pytest.raises(ValueError):
+        unpack_profile(dict(packed, azimuth=packed["azimuth"][:-8]))
+
+
+def test_profile_summary():
+    """Le résumé décrit le profil sans en lister les points."""
+    packed = pack_profile(PROFILES[1])
+    assert profile_summary(packed) == {
+        "count": 4,
+        "azimuth_min": 40.0,
+        "azimuth_max": 300.0,
+        "elevation_min": -1.0,
+        "elevation_max": 12.0,
+        "checksum": packed["checksum"],
+    }
@@ -0,0 +1,70 @@
+"""Tests de l'import et de la simplification des profils d'horizon."""
+import numpy as np
+import pytest
+
+from ..const import CONF_AZIMUTH, CONF_ELEVATION
+from ..horizon import HorizonTable
+from ..horizon_import import load_horizon_file, simplify_profile
+
+
+def _survey(count=3600, seed=0):
+    """Relevé régulier et bruité : collines, falaise et points dispersés."""
+    rng = np.random.default_rng(seed)
+    azimuths = np.linspace(0, 360, count, endpoint=False)
+    elevations = (
+        6 + 4 * np.sin(np.radians(3 * azimuths))
+        + np.where((azimuths > 100) & (azimuths < 110), 15, 0)
+        + rng.normal(0, 0.3, count)
+    )
+    return azimuths, elevations
+
+
+@pytest.mark.parametrize("max_error", [0.05, 0.5, 2.0])
+def test_simplified_profile_error_is_bounded(max_error):
+    """Aucun point retiré ne s'écarte du profil simplifié de plus de max_error."""
+    azimuths, elevations = _survey()
+    keep = simplify_profile(azimuths, elevations, max_error)
+
+    assert len(keep) < len(azimuths)
+    assert np.all(np.diff(keep) > 0)
+    table = HorizonTable(azimuths[keep], elevations[keep])
+    assert np.abs(table.elevations_at(azimuths) - elevations).max() <= max_error + 1e-9
+
+
+def test_simplification_closes_the_turn():
+    """Les points entre le dernier gardé et 360° sont bornés par le bouclage."""
+    azimuths, elevations = _survey(seed=1)
+    keep = simplify_profile(azimuths, elevations, 0.5)
+    wrapped = azimuths > azimuths[keep[-1]]
+
+    table = HorizonTable(azimuths[keep], elevations[keep])
+    errors = np.abs(table.elevations_at(azimuths[wrapped]) - elevations[wrapped])
+    assert errors.max() <= 0.5 + 1e-9
+
+
+def test_collinear_points_are_dropped():
+    """Sans erreur tolérée, seuls les points alignés disparaissent."""
+    azimuths = np.arange(0, 360, 10, dtype=float)
+    elevations = np.where(azimuths < 180, azimuths / 10, 36 - azimuths / 10)
+    keep = simplify_profile(azimuths, elevations, 0.0)
+    assert azimuths[keep].tolist() == [0.0, 180.0]
+
+
+def test_file_import_simplifies(tmp_path):
+    """L'import d'un fichier applique la simplification demandée."""
+    azimuths, elevations = _survey()
+    path = tmp_path / "horizon.csv"
+    path.write_text(
+        "azimuth,elevation\n"
+        + "".join(f"{a},{e}\n" for a, e in zip(azimuths.tolist(), elevations.tolist())),
+        encoding="utf-8",
+    )
+
+    full = load_horizon_file(str(path))
+    simplified = load_horizon_file(str(path), max_error=0.5)
+    assert len(full) == len(azimuths)
+    assert 2 <= len(simplified) < len(full)
+
+    table = HorizonTable.from_profile(simplified)
+    profile = np.array([[point[CONF_AZIMUTH], point[CONF_ELEVATION]] for point in full])
+    assert np.abs(table.elevations_at(profile[:, 0]) - profile[:, 1]).max() <= 0.5 + 1e-9
@@ -0,0 +1,63 @@
+"""Migration des entrées de configuration jusqu'à la version courante."""
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from .. import async_migrate_entry
+from ..config_flow import SunOnWindowConfigFlow
+from ..const import (
+    CONF_ATTRIBUTE_REFRESH,
+    CONF_AZIMUTH,
+    CONF_ELEVATION,
+    CONF_HORIZON_CHECKSUM,
+    CONF_HORIZON_PROFILE,
+    CONF_HORIZON_STORE,
+    CONF_WINDOWS,
+    DOMAIN,
+)
+from ..horizon import pack_profile
+from ..storage import async_load_horizon_summary
+
+PROFILE = [
+    {CONF_AZIMUTH: 0.0, CONF_ELEVATION: 5.0},
+    {CONF_AZIMUTH: 90.0, CONF_ELEVATION: 2.0},
+    {CONF_AZIMUTH: 270.0, CONF_ELEVATION: 10.0},
+]
+WINDOWS = [{"name": "sud", "start_azimuth": 135.0, "end_azimuth": 225.0, "max_elevation": 45.0}]
+
+
+async def test_migrate_v1_to_current(hass, hass_storage):
+    """Version 1 : le profil part dans le stockage, scan_interval devient attribute_refresh."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        version=1,
+        data={CONF_HORIZON_PROFILE: PROFILE, CONF_WINDOWS: WINDOWS, "scan_interval": 5},
+    )
+    entry.add_to_hass(hass)
+
+    assert await async_migrate_entry(hass, entry)
+    assert entry.version == SunOnWindowConfigFlow.VERSION == 3
+    assert CONF_HORIZON_PROFILE not in entry.data
+    assert "scan_interval" not in entry.data
+    assert entry.data[CONF_ATTRIBUTE_REFRESH] == 5
+    assert entry.data[CONF_WINDOWS] == WINDOWS
+
+    # Le profil enregistré est celui de l'entrée, référencé par son empreinte
+    checksum = pack_profile(PROFILE)["checksum"]
+    assert entry.data[CONF_HORIZON_CHECKSUM] == checksum
+    assert entry.data[CONF_HORIZON_STORE] in hass_storage
+    summary = await async_load_horizon_summary(hass, entry.data)
+    assert summary["count"] == len(PROFILE) and summary["checksum"] == checksum
+
+
+async def test_migrate_v2_keeps_store(hass):
+    """Version 2 : seule la clé du rafraîchissement des attributs change."""
+    data = {
+        CONF_HORIZON_STORE: "sun_on_window.horizon_0123456789abcdef",
+        CONF_HORIZON_CHECKSUM: "0123456789abcdef",
+        CONF_WINDOWS: WINDOWS,
+    }
+    entry = MockConfigEntry(domain=DOMAIN, version=2, data=data)
+    entry.add_to_hass(hass)
+
+    assert await async_migrate_entry(hass, entry)
+    assert entry.version == 3
+    assert entry.data == data
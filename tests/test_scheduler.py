@@ -0,0 +1,40 @@
+"""Tests de la prédiction des bascules."""
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from ..engine import WindowBatch
+from ..ephemeris import SolarEphemeris
+from ..horizon import HorizonTable
+from ..scheduler import PRECISION, SCAN_STEP, find_transitions
+
+START = datetime(2024, 6, 21, 0, 0, tzinfo=timezone.utc).timestamp()
+DAY = 86400
+
+WINDOWS = [
+    {"name": "est", "start_azimuth": 45.0, "end_azimuth": 135.0, "max_elevation": 60.0},
+    {"name": "sud", "start_azimuth": 135.0, "end_azimuth": 225.0, "max_elevation": 45.0},
+    {"name": "ouest", "start_azimuth": 225.0, "end_azimuth": 315.0, "max_elevation": 60.0},
+]
+PROFILE = [{"azimuth": float(azimuth), "elevation": 5.0} for azimuth in range(0, 360, 10)]
+
+
+@pytest.mark.parametrize("deadband", [0.0, 3.0])
+def test_transitions_are_refined_with_deadband(deadband):
+    """Les bascules sont affinées à la précision près, avec ou sans bande morte."""
+    batch = WindowBatch(WINDOWS, HorizonTable.from_profile(PROFILE), deadband, deadband)
+    ephemeris = SolarEphemeris(46.52, 6.63)
+    times, windows, states = find_transitions(batch, ephemeris, START, START + DAY)
+
+    assert len(times)
+    # Pas toutes sur la grille d'échantillonnage
+    assert not np.all(np.mod(times - START, SCAN_STEP) == 0)
+
+    # Juste avant la bascule, l'ancien état tient encore selon les marges de l'hystérésis
+    for time, window, state in zip(times.tolist(), windows.tolist(), states.tolist()):
+        before = ephemeris.positions(np.array([time - PRECISION]))
+        after = ephemeris.positions(np.array([time]))
+        old = np.array([not state])
+        assert batch.evaluate_aligned(*before, np.array([window]), old).is_on[0] == (not state)
+        assert batch.evaluate_aligned(*after, np.array([window]), old).is_on[0] == state
@@ -0,0 +1,67 @@
+"""Tests de la saisie et de l'import des fenêtres."""
+import pytest
+import voluptuous as vol
+
+from ..config_flow import WINDOW_GEOMETRY_SCHEMA, WINDOW_RANGE_SCHEMA, SunOnWindowConfigFlow
+from ..const import CONF_NAME, CONF_WINDOWS_FILE
+from ..window_import import (
+    NUMERIC_FIELDS,
+    WindowImportError,
+    load_windows_file,
+    window_from_input,
+    window_input_given,
+)
+
+FORM_SCHEMA = vol.Schema({**WINDOW_RANGE_SCHEMA, **WINDOW_GEOMETRY_SCHEMA})
+
+
+@pytest.mark.parametrize("key", sorted(NUMERIC_FIELDS))
+def test_form_and_file_share_bounds(key, tmp_path):
+    """Formulaire et import acceptent les mêmes bornes et refusent au-delà."""
+    low, high = NUMERIC_FIELDS[key]
+    for value in (low, high):
+        user_input = FORM_SCHEMA({key: value})
+        window, _ = window_from_input({CONF_NAME: "w", **user_input})
+        assert window[key] == value
+
+    path = tmp_path / "windows.csv"
+    for value in (low - 1, high + 1):
+        with pytest.raises(vol.Invalid):
+            FORM_SCHEMA({key: value})
+
+        path.write_text(
+            f"name,start_azimuth,end_azimuth,max_elevation,{key}\nw,90,180,60,{value}\n",
+            encoding="utf-8",
+        )
+        with pytest.raises(WindowImportError) as err:
+            load_windows_file(str(path))
+        assert err.value.error_key == "invalid_window_value"
+        assert err.value.line == 2
+
+
+def test_window_input_given():
+    """Un champ de fenêtre renseigné compte, un champ vide ou absent non."""
+    assert not window_input_given({})
+    assert not window_input_given({CONF_WINDOWS_FILE: "/config/w.csv", CONF_NAME: ""})
+    assert window_input_given({CONF_NAME: "salon"})
+    assert window_input_given({"max_elevation": 0.0})
+    assert window_input_given({"room": "salon"})
+
+
+async def test_file_with_window_fields_is_rejected(hass, tmp_path):
+    """Un fichier et une fenêtre saisie ensemble sont refusés, sans rien importer."""
+    path = tmp_path / "windows.csv"
+    path.write_text("name,start_azimuth,end_azimuth,max_elevation\nw,90,180,60\n", encoding="utf-8")
+    hass.config.allowlist_external_dirs = {str(tmp_path)}
+
+    flow = SunOnWindowConfigFlow()
+    flow.hass = hass
+    result = await flow.async_step_window(
+        {CONF_WINDOWS_FILE: str(path), CONF_NAME: "salon", "start_azimuth": 90.0}
+    )
+    assert result["errors"] == {"base": "file_with_window_fields"}
+    assert not flow._windows
+
+    result = await flow.async_step_window({CONF_WINDOWS_FILE: str(path)})
+    assert not result["errors"]
+    assert list(flow._windows) == ["w"]
@@ -0,0 +1,252 @@
+"""Import de fenêtres en masse depuis des fichiers CSV ou JSON."""
+import csv
+import json
+from typing import Any, Dict
+
+from .const import (
+    CONF_NAME,
+    CONF_START_AZIMUTH,
+    CONF_END_AZIMUTH,
+    CONF_MAX_ELEVATION,
+    CONF_SURFACE_AZIMUTH,
+    CONF_WINDOW_HEIGHT,
+    CONF_WINDOW_WIDTH,
+    CONF_OVERHANG_DEPTH,
+    CONF_FIN_DEPTH,
+    CONF_OBSTRUCTIONS,
+    CONF_TILT,
+    CONF_MAX_INCIDENCE,
+    CONF_GLAZING_AREA,
+    CONF_G_VALUE,
+    GROUP_KINDS,
+)
+
+# Champs numériques d'une fenêtre et leurs bornes : colonnes reconnues à
+# l'import, et champs des formulaires construits à partir de cette table
+NUMERIC_FIELDS = {
+    CONF_START_AZIMUTH: (0, 360),
+    CONF_END_AZIMUTH: (0, 360),
+    CONF_MAX_ELEVATION: (0, 90),
+    CONF_SURFACE_AZIMUTH: (0, 360),
+    CONF_WINDOW_HEIGHT: (0, 100),
+    CONF_WINDOW_WIDTH: (0, 100),
+    CONF_OVERHANG_DEPTH: (0, 100),
+    CONF_FIN_DEPTH: (0, 100),
+    CONF_TILT: (0, 180),
+    CONF_MAX_INCIDENCE: (0, 90),
+    CONF_GLAZING_AREA: (0, 1000),
+    CONF_G_VALUE: (0, 1),
+}
+
+# Champs d'une fenêtre saisis dans un formulaire
+WINDOW_FIELDS = (CONF_NAME, *NUMERIC_FIELDS, CONF_OBSTRUCTIONS, *GROUP_KINDS)
+
+CSV_DELIMITERS = ",;\t"
+
+
+class WindowImportError(Exception):
+    """Erreur d'import d'un fichier de fenêtres, identifiée par une clé de traduction."""
+
+    def __init__(self, error_key, line=None):
+        """Initialiser l'erreur avec sa clé et la ligne (ou la fenêtre) fautive éventuelle."""
+        super().__init__(error_key if line is None else f"{error_key} (ligne {line})")
+        self.error_key = error_key
+        self.line = line
+
+
+def window_input_given(user_input: Dict[str, Any]) -> bool:
+    """Check whether a form carries any window field."""
+    return any(user_input.get(key) not in (None, "") for key in WINDOW_FIELDS)
+
+
+def window_input_complete(user_input: Dict[str, Any]) -> bool:
+    """Check that a form describes a window: a range for facades, a tilt for inclined ones."""
+    if CONF_NAME not in user_input:
+        return False
+    if user_input.get(CONF_TILT) is not None:
+        return True
+    return all(k in user_input for k in [CONF_START_AZIMUTH, CONF_END_AZIMUTH, CONF_MAX_ELEVATION])
+
+
+def window_from_input(user_input: Dict[str, Any]):
+    """Build a window from a form, with its optional shading geometry. Return (window, errors)."""
+    # Une fenêtre inclinée sans plage d'azimut voit tout le ciel, limité par l'incidence
+    window = {
+        CONF_NAME: user_input[CONF_NAME],
+        CONF_START_AZIMUTH: user_input.get(CONF_START_AZIMUTH, 0.0),
+        CONF_END_AZIMUTH: user_input.get(CONF_END_AZIMUTH, 360.0),
+        CONF_MAX_ELEVATION: user_input.get(CONF_MAX_ELEVATION, 90.0),
+    }
+    errors = {}
+
+    for key in (
+        CONF_SURFACE_AZIMUTH,
+        CONF_WINDOW_HEIGHT,
+        CONF_WINDOW_WIDTH,
+        CONF_OVERHANG_DEPTH,
+        CONF_FIN_DEPTH,
+        CONF_TILT,
+        CONF_MAX_INCIDENCE,
+        CONF_GLAZING_AREA,
+        CONF_G_VALUE,
+    ):
+        if user_input.get(key) is not None:
+            window[key] = user_input[key]
+
+    # Un débord ombre selon la hauteur de la fenêtre, des joues selon sa largeur
+    if window.get(CONF_OVERHANG_DEPTH) and not window.get(CONF_WINDOW_HEIGHT):
+        errors[CONF_WINDOW_HEIGHT] = "window_size_required"
+    if window.get(CONF_FIN_DEPTH) and not window.get(CONF_WINDOW_WIDTH):
+        errors[CONF_WINDOW_WIDTH] = "window_size_required"
+    # L'orientation d'un vitrage incliné (non horizontal) sans plage d'azimut doit être donnée
+    if (
+        window.get(CONF_TILT) not in (None, 0, 180)
+        and CONF_START_AZIMUTH not in user_input
+        and CONF_SURFACE_AZIMUTH not in window
+    ):
+        errors[CONF_SURFACE_AZIMUTH] = "surface_azimuth_required"
+
+    # Groupes de la fenêtre : façade, pièce et étage
+    for kind in GROUP_KINDS:
+        if user_input.get(kind):
+            window[kind] = str(user_input[kind]).strip()
+
+    # Polygones d'obstruction : [[[azimut, élévation], ...], ...]
+    if user_input.get(CONF_OBSTRUCTIONS):
+        try:
+            polygons = json.loads(user_input[CONF_OBSTRUCTIONS])
+            if not isinstance(polygons, list) or not all(
+                isinstance(polygon, list)
+                and len(polygon) >= 3
+                and all(
+                    isinstance(point, list)
+                    and len(point) == 2
+                    and all(isinstance(value, (int, float)) for value in point)
+                    for point in polygon
+                )
+                for polygon in polygons
+            ):
+                errors[CONF_OBSTRUCTIONS] = "invalid_obstructions"
+            else:
+                window[CONF_OBSTRUCTIONS] = polygons
+        except json.JSONDecodeError:
+            errors[CONF_OBSTRUCTIONS] = "invalid_json"
+
+    return window, errors
+
+
+def upsert_windows(windows: Dict[str, Dict[str, Any]], imported):
+    """
+    Ajoute ou remplace des fenêtres par nom, dans un dictionnaire nom -> fenêtre.
+    Une fenêtre existante garde sa place ; les nouvelles sont ajoutées à la fin.
+    Retourne le nombre de fenêtres ajoutées.
+    """
+    added = 0
+    for window in imported:
+        added += window[CONF_NAME] not in windows
+        windows[window[CONF_NAME]] = window
+    return added
+
+
+def load_windows_file(path):
+    """
+    Lit un fichier de fenêtres et retourne les fenêtres validées, dans l'ordre.
+
+    Les fichiers CSV (séparés par des virgules, points-virgules ou tabulations)
+    commencent par un en-tête dont les colonnes portent les noms des champs de
+    la configuration (name, start_azimuth, end_azimuth, max_elevation, tilt,
+    window_height, facade, room, floor...) ; une cellule vide laisse le champ
+    absent et la colonne obstructions contient les polygones en JSON. Les fichiers JSON contiennent
+    une liste d'objets de mêmes clés, ou un objet {"windows": [...]}.
+    Chaque fenêtre est validée comme dans les formulaires ; une fenêtre nommée
+    plusieurs fois remplace la précédente. Doit être appelé hors de la boucle
+    d'événements.
+    """
+    if str(path).lower().endswith(".json"):
+        rows = _read_json(path)
+    else:
+        rows = _read_csv(path)
+
+    windows = {}
+    for line, row in rows:
+        user_input = _parse_row(row, line)
+        if not window_input_complete(user_input):
+            raise WindowImportError("incomplete_window", line)
+        window, errors = window_from_input(user_input)
+        if errors:
+            raise WindowImportError(next(iter(errors.values())), line)
+        windows[window[CONF_NAME]] = window
+
+    if not windows:
+        raise WindowImportError("no_windows")
+    return list(windows.values())
+
+
+def _parse_row(row, line):
+    """Convertit les valeurs d'une ligne en champs de formulaire typés et bornés."""
+    user_input = {}
+    for key, value in row.items():
+        if value is None or value == "":
+            continue
+        if key == CONF_NAME or key in GROUP_KINDS:
+            user_input[key] = str(value).strip()
+        elif key == CONF_OBSTRUCTIONS:
+            # Polygones en JSON dans un CSV, ou déjà en liste dans un fichier JSON
+            user_input[key] = value if isinstance(value, str) else json.dumps(value)
+        elif key in NUMERIC_FIELDS:
+            try:
+                number = float(value)
+            except (TypeError, ValueError):
+                raise WindowImportError("invalid_number_format", line) from None
+            low, high = NUMERIC_FIELDS[key]
+            if not low <= number <= high:
+                raise WindowImportError("invalid_window_value", line)
+            user_input[key] = number
+    return user_input
+
+
+def _read_csv(path):
+    """Génère les lignes (numéro, {colonne: valeur}) d'un fichier CSV à en-tête."""
+    columns = None
+    dialect = None
+
+    with open(path, encoding="utf-8-sig", newline="") as file:
+        for number, raw in enumerate(file, start=1):
+            text = raw.strip()
+            if not text or text.startswith("#"):
+                continue
+
+            # Détection du séparateur sur la première ligne utile
+            if dialect is None:
+                dialect = next((d for d in CSV_DELIMITERS if d in text), ",")
+            fields = next(csv.reader([text], delimiter=dialect))
+
+            if columns is None:
+                columns = [field.strip().lower() for field in fields]
+                if CONF_NAME not in columns:
+                    raise WindowImportError("invalid_window_file", number)
+                continue
+
+            yield number, dict(zip(columns, (field.strip() for field in fields)))
+
+    if columns is None:
+        raise WindowImportError("invalid_window_file")
+
+
+def _read_json(path):
+    """Génère les fenêtres (numéro, objet) d'un fichier JSON."""
+    with open(path, encoding="utf-8") as file:
+        try:
+            data = json.load(file)
+        except json.JSONDecodeError:
+            raise WindowImportError("invalid_json") from None
+
+    if isinstance(data, dict):
+        data = data.get("windows")
+    if not isinstance(data, list):
+        raise WindowImportError("invalid_json_format")
+
+    for number, window in enumerate(data, start=1):
+        if not isinstance(window, dict):
+            raise WindowImportError("invalid_json_format", number)
+        yield number, window